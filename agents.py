@@ -0,0 +1,371 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+from autogen import AssistantAgent, GroupChat, GroupChatManager, OpenAIWrapper, UserProxyAgent
+
+from async_llm import AsyncLLMClient, StreamedReply
+from completion_cache import CompletionCache
+from context_policy import ContextPolicy
+from json_logging import get_logger
+from metrics import (LLM_CALLS, LLM_FIRST_TOKEN_SECONDS, LLM_SECONDS, LLM_STREAM_EARLY_STOPS, LLM_TOKENS,
+                     SPEAKER_SELECTION_SECONDS)
+from prefetch import Prefetcher, activate
+from retry_policy import RetryPolicy
+from sia_prompts import PromptLibrary
+from sop_engine import SOPEngine
+from template_renderer import DEFAULT_LOCALE, TemplateRenderer
+from token_count import count_message_tokens, count_text_tokens
+from tool_registry import is_function_call
+
+# --------------------------
+# autogen agents for one SIA conversation
+# --------------------------
+# Kept apart from main.py so that importing the tools, caches and executor
+# pipeline does not import autogen; main.build_agents() loads this module on
+# first use.
+
+logger = get_logger(__name__)
+
+# One autogen client per distinct llm_config, shared by every session's SIA
+_sync_clients: Dict[str, OpenAIWrapper] = {}
+_sync_clients_lock = threading.Lock()
+
+
+def _shared_sync_client(llm_config: dict) -> OpenAIWrapper:
+    key = json.dumps(llm_config, sort_keys=True, default=str)
+    with _sync_clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = _sync_clients[key] = OpenAIWrapper(**llm_config)
+    return client
+
+
+# --------------------------
+# Function Call Execution via FunctionExecutor
+# --------------------------
+class FunctionExecutorAgent(UserProxyAgent):
+    def __init__(self, *args, execute: Callable[[str, RetryPolicy], str],
+                 a_execute: Callable[[str, RetryPolicy], Awaitable[str]], retry_policy: RetryPolicy, **kwargs):
+        """execute / a_execute run one FUNCTION_CALL message (main.execute_function_call and its async twin)"""
+        super().__init__(*args, **kwargs)
+        self.execute = execute
+        self.a_execute = a_execute
+        self.retry_policy = retry_policy
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.calls = 0
+        self.busy_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {"executor_calls": self.calls, "executor_seconds": round(self.busy_seconds, 6)}
+
+    def generate_reply(self, messages=None, sender=None, **kwargs):
+        if messages is None:
+            messages = self._oai_messages[sender]
+        logger.debug("FunctionExecutor received %d messages from %s", len(messages), sender.name)
+
+        # We only check SIA's last message for function calls
+        sia_msgs = [m for m in messages if m.get("name") == "SIA"]
+        if not sia_msgs:
+            return None
+
+        last_msg = sia_msgs[-1].get("content", "")
+
+        # Strict regex to detect function call
+        if is_function_call(last_msg):
+            start = time.perf_counter()
+            try:
+                return {"content": self.execute(last_msg, self.retry_policy)}
+            finally:
+                self.calls += 1
+                self.busy_seconds += time.perf_counter() - start
+        else:
+            logger.warning("FunctionExecutor found no valid function call in SIA's last message")
+            return None
+
+    async def a_generate_reply(self, messages=None, sender=None, **kwargs):
+        if messages is None:
+            messages = self._oai_messages[sender]
+        sia_msgs = [m for m in messages if m.get("name") == "SIA"]
+        if not sia_msgs:
+            return None
+        last_msg = sia_msgs[-1].get("content", "")
+        if not is_function_call(last_msg):
+            return None
+        start = time.perf_counter()
+        try:
+            return {"content": await self.a_execute(last_msg, self.retry_policy)}
+        finally:
+            self.calls += 1
+            self.busy_seconds += time.perf_counter() - start
+
+
+# --------------------------
+# SIA Agent: SOP table first, LLM only for free text
+# --------------------------
+class SIAAgent(AssistantAgent):
+    def __init__(self, *args, context_policy: Optional[ContextPolicy] = None,
+                 prompts: Optional[PromptLibrary] = None, llm_client: Optional[AsyncLLMClient] = None,
+                 completion_cache: Optional[CompletionCache] = None,
+                 renderer: Optional[TemplateRenderer] = None, locale: str = DEFAULT_LOCALE,
+                 stream: bool = True, prefetcher: Optional[Prefetcher] = None, **kwargs):
+        """
+        stream:     read async LLM replies as a stream; text for the seller goes to on_text as it arrives
+        prefetcher: starts the lookups the SOP will need next, between turns (see speculate)
+        """
+        super().__init__(*args, **kwargs)
+        self.llm_client = llm_client
+        self.stream = stream
+        self.prefetcher = prefetcher
+        self.on_text: Optional[Callable[[str], None]] = None
+        self.completion_cache = completion_cache
+        self.sop_engine = SOPEngine(renderer=renderer, locale=locale)
+        self.context_policy = context_policy or ContextPolicy()
+        self.prompts = prompts
+        self.reset_stats()
+
+    def _validate_llm_config(self, llm_config):
+        # Defer autogen's OpenAIWrapper until a sync LLM call needs it (and then
+        # share it across sessions); the async path goes through llm_client.
+        super()._validate_llm_config(False)
+        self.llm_config = self.DEFAULT_CONFIG if llm_config is None else llm_config
+
+    def _ensure_client(self):
+        if self.client is None and self.llm_config:
+            self.client = _shared_sync_client(self.llm_config)
+
+    def reset_stats(self):
+        self.sop_engine.reset()
+        self.context_stats = {"prompt_tokens_full": 0, "prompt_tokens_sent": 0, "system_prompt_tokens": 0,
+                              "llm_seconds": 0.0, "llm_first_token_seconds": 0.0, "stream_early_stops": 0,
+                              "completion_cache_hits": 0}
+        self.system_prompt_tokens_by_intent = {}
+        self._last_prompt_tokens = 0
+        if self.prefetcher is not None:
+            self.prefetcher.reset_stats()
+
+    def stats(self) -> dict:
+        return {**self.sop_engine.stats(), **self.context_stats,
+                **(self.prefetcher.stats() if self.prefetcher is not None else {}),
+                "system_prompt_tokens_by_intent": dict(self.system_prompt_tokens_by_intent)}
+
+    def end_session(self):
+        """Discard prefetched lookups the conversation never used (counted as wasted)"""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+
+    def _activate_prefetcher(self):
+        # The executor runs in this context and takes its lookups from this
+        # session's prefetcher
+        activate(self.prefetcher)
+
+    def speculate(self, messages: list):
+        """Prefetch what the SOP will need next (speaker selection calls this between turns)"""
+        if self.prefetcher is not None:
+            self.prefetcher.observe(messages)
+
+    def _scope_system_message(self, messages: list) -> str:
+        """Switch to the prompt module for the conversation's intent; returns the intent label"""
+        if self.prompts is None:
+            return "unified"
+        intent = self.prompts.detect_intent(messages)
+        prompt = self.prompts.system_message(intent)
+        if prompt != self.system_message:
+            self.update_system_message(prompt)
+        return intent or "unified"
+
+    def _llm_messages(self, messages: list) -> list:
+        """Compact the history for one LLM call and record the token saving"""
+        intent = self._scope_system_message(messages)
+        compacted, facts = self.context_policy.compact(messages)
+        system_tokens = count_text_tokens(self.system_message)
+        full = count_message_tokens(self._oai_system_message + messages)
+        sent = count_message_tokens(self._oai_system_message + compacted)
+        self.context_stats["prompt_tokens_full"] += full
+        self.context_stats["prompt_tokens_sent"] += sent
+        self._last_prompt_tokens = sent
+        self.context_stats["system_prompt_tokens"] += system_tokens
+        self.system_prompt_tokens_by_intent[intent] = self.system_prompt_tokens_by_intent.get(intent, 0) + system_tokens
+        logger.info("SIA LLM call context", extra={"data": {
+            "intent": intent,
+            "messages_full": len(messages),
+            "messages_sent": len(compacted),
+            "system_prompt_tokens": system_tokens,
+            "prompt_tokens_full": full,
+            "prompt_tokens_sent": sent
+        }})
+        return compacted
+
+    def _cached_completion(self, compacted: list, model: str):
+        """(cached reply or None, key to store the fresh reply under or None)
+
+        model: what will answer this turn, so replies from different models
+        (or router tiers) never share an entry
+        """
+        if self.completion_cache is None:
+            return None, None
+        reply, key = self.completion_cache.lookup(model, self.system_message, compacted)
+        if reply is not None:
+            self.context_stats["completion_cache_hits"] += 1
+            logger.debug("SIA completion served from cache")
+        return reply, key
+
+    def _record_llm_call(self, compacted: list, start: float, reply):
+        elapsed = time.perf_counter() - start
+        self.context_stats["llm_seconds"] += elapsed
+        LLM_SECONDS.labels(self.name).observe(elapsed)
+        LLM_CALLS.labels(self.name, "llm").inc()
+        LLM_TOKENS.labels(self.name, "prompt").inc(self._last_prompt_tokens)
+        if isinstance(reply, dict):
+            reply = reply.get("content")
+        if isinstance(reply, str):
+            LLM_TOKENS.labels(self.name, "completion").inc(count_text_tokens(reply))
+
+    def _record_stream(self, streamed: StreamedReply):
+        if streamed.first_token_seconds is not None:
+            self.context_stats["llm_first_token_seconds"] += streamed.first_token_seconds
+            LLM_FIRST_TOKEN_SECONDS.labels(self.name).observe(streamed.first_token_seconds)
+        if streamed.stopped_early:
+            self.context_stats["stream_early_stops"] += 1
+            LLM_STREAM_EARLY_STOPS.labels(self.name, streamed.kind).inc()
+
+    def _store_completion(self, key, reply):
+        if key is not None and isinstance(reply, str) and reply:
+            self.completion_cache.store(key, reply)
+
+    def generate_reply(self, messages=None, sender=None, **kwargs):
+        if messages is None:
+            messages = self._oai_messages[sender]
+        self._activate_prefetcher()
+        reply = self.sop_engine.next_reply(messages)
+        if reply is not None:
+            logger.debug("SOP engine answered without LLM: %s", reply)
+            LLM_CALLS.labels(self.name, "sop").inc()
+            return reply
+        logger.debug("SOP engine has no rule for this turn, calling LLM")
+        compacted = self._llm_messages(messages)
+        reply, key = self._cached_completion(compacted, self.llm_config["config_list"][0].get("model", ""))
+        if reply is not None:
+            LLM_CALLS.labels(self.name, "completion_cache").inc()
+            return reply
+        self._ensure_client()
+        start = time.perf_counter()
+        try:
+            reply = super().generate_reply(messages=compacted, sender=sender, **kwargs)
+        finally:
+            self._record_llm_call(compacted, start, reply)
+        self._store_completion(key, reply)
+        return reply
+
+    async def a_generate_reply(self, messages=None, sender=None, **kwargs):
+        if messages is None:
+            messages = self._oai_messages[sender]
+        self._activate_prefetcher()
+        # Templates for blocked listings look up block reasons and overrides in the seller API
+        reply = await asyncio.to_thread(self.sop_engine.next_reply, messages)
+        if reply is not None:
+            LLM_CALLS.labels(self.name, "sop").inc()
+            return reply
+        if not self.llm_config or self.llm_client is None:
+            self._ensure_client()
+            return await super().a_generate_reply(messages=messages, sender=sender, **kwargs)
+        params = {k: v for k, v in self.llm_config.items() if k in ("temperature", "max_tokens")}
+        compacted = self._llm_messages(messages)
+        reply, key = self._cached_completion(compacted, self.llm_client.model_for(compacted))
+        if reply is not None:
+            LLM_CALLS.labels(self.name, "completion_cache").inc()
+            return reply
+        start = time.perf_counter()
+        reply = None
+        try:
+            if self.stream:
+                streamed = await self.llm_client.stream(self._oai_system_message + compacted,
+                                                        on_text=self.on_text, **params)
+                self._record_stream(streamed)
+                reply = streamed.content
+            else:
+                reply = await self.llm_client.complete(self._oai_system_message + compacted, **params)
+        finally:
+            self._record_llm_call(compacted, start, reply)
+        self._store_completion(key, reply)
+        return reply
+
+
+# --------------------------
+# Custom Speaker Selection
+# --------------------------
+class CustomGroupChat(GroupChat):
+    def select_speaker(self, last_speaker, selector):
+        return _timed_selection(last_speaker, self)
+
+    async def a_select_speaker(self, last_speaker, selector):
+        return _timed_selection(last_speaker, self)
+
+
+def _timed_selection(last_speaker, groupchat):
+    start = time.perf_counter()
+    speaker = speaker_selection_func(last_speaker, groupchat)
+    SPEAKER_SELECTION_SECONDS.labels(speaker.name if speaker is not None else "none").observe(
+        time.perf_counter() - start)
+    return speaker
+
+
+def _speculate(groupchat, messages: list):
+    sia = next(agent for agent in groupchat.agents if agent.name == "SIA")
+    if isinstance(sia, SIAAgent):
+        sia.speculate(messages)
+
+
+def speaker_selection_func(last_speaker, groupchat):
+    messages = groupchat.messages
+    if not messages:
+        return next(agent for agent in groupchat.agents if agent.name == "SIA")
+
+    last_msg = messages[-1]
+    content = last_msg.get("content", "")
+    sender = last_msg.get("name", "")
+
+    # Check for termination condition: message ends with TERMINATE
+    if content.rstrip().endswith("TERMINATE"):
+        logger.debug("termination condition met, ending chat")
+        return None
+
+    logger.debug("last speaker was %s: %.50s", sender, content)
+
+    # If SIA just output a function call => next is FunctionExecutor
+    if sender == "SIA" and is_function_call(content):
+        logger.debug("SIA issued function call -> FunctionExecutor")
+        return next(agent for agent in groupchat.agents if agent.name == "FunctionExecutor")
+
+    # If SIA just gave a normal prompt => next is User
+    if sender == "SIA" and "FUNCTION_CALL:" not in content:
+        logger.debug("SIA sent a prompt -> User")
+        _speculate(groupchat, messages)  # overlaps the seller's think time
+        return next(agent for agent in groupchat.agents if agent.name == "User")
+
+    # If FunctionExecutor just returned a result => back to SIA
+    if sender == "FunctionExecutor":
+        logger.debug("FunctionExecutor returned result -> SIA")
+        return next(agent for agent in groupchat.agents if agent.name == "SIA")
+
+    # If the last speaker is User => SIA responds
+    if sender == "User":
+        logger.debug("User sent a message -> SIA")
+        _speculate(groupchat, messages)  # overlaps the lookup SIA makes for this message
+        return next(agent for agent in groupchat.agents if agent.name == "SIA")
+
+    logger.debug("default fallback -> User")
+    return next(agent for agent in groupchat.agents if agent.name == "User")
+
+
+class ChatAgents(NamedTuple):
+    user_agent: UserProxyAgent
+    sia: SIAAgent
+    function_executor: FunctionExecutorAgent
+    coordinator: AssistantAgent
+    groupchat: CustomGroupChat
+    manager: GroupChatManager
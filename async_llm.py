@@ -0,0 +1,149 @@
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from json_logging import get_logger
+from metrics import LLM_ENDPOINT_FALLBACKS
+from reply_stream import TEXT, ReplyScanner
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Awaitable chat completions
+# --------------------------
+# autogen's a_generate_oai_reply runs the sync client on the default thread
+# pool, which caps concurrent LLM calls at a few dozen. This client awaits the
+# HTTP request on the event loop and shares one connection pool per endpoint
+# across every session in the process.
+#
+# stream() reads the completion as server-sent chunks: the first token's
+# arrival is timed separately from the whole reply, user-facing text is handed
+# to on_text as it comes in, and the stream is dropped as soon as
+# reply_stream.ReplyScanner has settled how the reply will be routed.
+
+MESSAGE_FIELDS = ("role", "content", "name")
+
+
+class StreamedReply(NamedTuple):
+    content: str
+    first_token_seconds: Optional[float]  # None if the model sent no text
+    seconds: float
+    chunks: int
+    kind: Optional[str]  # reply_stream.FUNCTION_CALL / TEXT
+    stopped_early: bool  # routing was settled mid-stream and the rest was not read
+
+
+class AsyncLLMClient:
+    def __init__(self, config_list: List[Dict[str, Any]], timeout: float = 120, max_retries: Optional[int] = None,
+                 name: str = "default"):
+        """
+        config_list: endpoints in order of preference; a failed or timed-out call moves on to the next
+        timeout:     seconds per request before it counts as failed
+        max_retries: the openai client's own retries per endpoint (None: its default)
+        name:        label for the sia_llm_endpoint_fallbacks_total metric
+        """
+        self.config_list = config_list
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.name = name
+        self.fallbacks = 0
+        self._clients: Dict[int, Any] = {}
+
+    def model_for(self, messages: List[dict]) -> str:
+        """The model that will answer messages (the preferred endpoint's)"""
+        return self.config_list[0].get("model", "")
+
+    def _client(self, index: int):
+        client = self._clients.get(index)
+        if client is None:
+            # Imported here so processes that never reach the LLM skip loading openai
+            from openai import AsyncAzureOpenAI, AsyncOpenAI
+            config = self.config_list[index]
+            options = {"timeout": self.timeout}
+            if self.max_retries is not None:
+                options["max_retries"] = self.max_retries
+            if config.get("api_type") == "azure":
+                client = AsyncAzureOpenAI(
+                    api_key=config.get("api_key"),
+                    azure_endpoint=config.get("base_url"),
+                    api_version=config.get("api_version"),
+                    **options
+                )
+            else:
+                client = AsyncOpenAI(
+                    api_key=config.get("api_key"),
+                    base_url=config.get("base_url"),
+                    **options
+                )
+            self._clients[index] = client
+        return client
+
+    def _fell_back(self, index: int, error: Exception):
+        if index + 1 < len(self.config_list):
+            self.fallbacks += 1
+            LLM_ENDPOINT_FALLBACKS.labels(self.name).inc()
+            logger.warning("LLM endpoint %s failed (%s), trying %s", self.config_list[index]["model"],
+                           type(error).__name__, self.config_list[index + 1]["model"])
+
+    @staticmethod
+    def _payload(messages: List[dict]) -> List[dict]:
+        return [{k: m[k] for k in MESSAGE_FIELDS if m.get(k) is not None} for m in messages]
+
+    async def complete(self, messages: List[dict], **params) -> Optional[str]:
+        """Return the first choice's content, trying each config in order"""
+        payload = self._payload(messages)
+        last_error = None
+        for index, config in enumerate(self.config_list):
+            try:
+                response = await self._client(index).chat.completions.create(
+                    model=config["model"], messages=payload, **params
+                )
+                return response.choices[0].message.content
+            except Exception as e:
+                last_error = e
+                self._fell_back(index, e)
+        raise last_error
+
+    async def stream(self, messages: List[dict], on_text: Optional[Callable[[str], None]] = None,
+                     **params) -> StreamedReply:
+        """Stream the first choice, trying each config in order until one produces a token.
+
+        on_text receives the seller-visible text as it arrives (never any part
+        of a FUNCTION_CALL).
+        """
+        payload = self._payload(messages)
+        last_error = None
+        for index, config in enumerate(self.config_list):
+            start = time.perf_counter()
+            scanner = ReplyScanner()
+            first_token = None
+            try:
+                response = await self._client(index).chat.completions.create(
+                    model=config["model"], messages=payload, stream=True, **params
+                )
+                try:
+                    async for chunk in response:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if not delta:
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        visible = scanner.feed(delta)
+                        if visible and on_text is not None:
+                            on_text(visible)
+                        if scanner.complete:
+                            break
+                    visible = scanner.finish()
+                    if visible and on_text is not None:
+                        on_text(visible)
+                finally:
+                    await response.close()
+            except Exception as e:
+                # Text already shown to the seller cannot be taken back
+                if scanner.kind == TEXT:
+                    raise
+                last_error = e
+                self._fell_back(index, e)
+                continue
+            return StreamedReply(scanner.reply, first_token, time.perf_counter() - start, scanner.chunks,
+                                 scanner.kind, scanner.complete)
+        raise last_error
@@ -0,0 +1,279 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from json_logging import get_logger
+from seller_api import ENDPOINTS, SellerAPIError
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Single-flight coalescing and per-endpoint circuit breakers
+# --------------------------
+# Sessions asking about the same hot listing, account or brand request at the
+# same moment share one in-flight backend call (the leader's result is handed
+# to every waiter). Each endpoint has a breaker over a sliding window of its
+# recent outcomes: once enough of them fail it opens and calls fail fast with
+# CircuitOpenError until open_seconds pass; then a single trial call decides
+# whether it closes again.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Endpoints that only read, and so may share one in-flight call
+READ_ONLY_ENDPOINTS = frozenset(name for name, (method, _) in ENDPOINTS.items() if method == "GET") | frozenset(
+    {"get_listing_status_batch", "get_block_reason_batch", "get_override_status_batch", "check_brand_approval_batch",
+     "get_listing_diagnostics"})
+
+
+class CircuitOpenError(SellerAPIError):
+    """Raised instead of calling an endpoint whose breaker is open"""
+
+    def __init__(self, endpoint: str):
+        super().__init__(endpoint, "circuit open, backend unhealthy")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """fn() once per key among concurrent callers; the others wait for its outcome"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    async def a_do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async do(): concurrent tasks on one event loop share a single await of fn()"""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = self._tasks[key] = loop.create_task(fn())
+        self.leaders += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_ratio: float = 0.5, min_calls: int = 20, window: int = 50,
+                 open_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        failure_ratio: share of failed calls in the window that opens the breaker
+        min_calls:     calls the window must hold before the ratio is trusted
+        window:        most recent outcomes considered
+        open_seconds:  how long to fail fast before letting a trial call through
+        """
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes: "deque[bool]" = deque(maxlen=window)
+        self._failures = 0
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if ok:
+                    self._close()
+                else:
+                    self._open()
+                return
+            if len(self._outcomes) == self._outcomes.maxlen and not self._outcomes[0]:
+                self._failures -= 1
+            self._outcomes.append(ok)
+            self._failures += not ok
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and self._failures >= self.failure_ratio * len(self._outcomes)):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._trial_running = False
+        self.times_opened += 1
+        logger.warning("circuit opened for %s", self.name,
+                       extra={"data": {"endpoint": self.name, "failures": self._failures, "window": len(self._outcomes)}})
+
+    def _close(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self._trial_running = False
+        logger.info("circuit closed for %s", self.name, extra={"data": {"endpoint": self.name}})
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._failures = 0
+            self._trial_running = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self._failures,
+                "window": len(self._outcomes),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class BackendGuard:
+    def __init__(self, **breaker_options):
+        """breaker_options: CircuitBreaker keyword arguments, applied to every endpoint"""
+        self.breaker_options = breaker_options
+        self.flight = SingleFlight()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(endpoint, CircuitBreaker(endpoint, **self.breaker_options))
+        return breaker
+
+    def call(self, endpoint: str, key: Optional[Hashable], fn: Callable[[], Any],
+             failed: Callable[[Any], bool] = lambda result: False) -> Any:
+        """fn() behind endpoint's breaker, coalesced with identical in-flight calls unless key is None.
+
+        Exceptions and results for which failed(result) is true count against the breaker.
+        """
+        breaker = self.breaker(endpoint)
+
+        def guarded():
+            if not breaker.allow():
+                raise CircuitOpenError(endpoint)
+            try:
+                result = fn()
+            except Exception:
+                breaker.record(False)
+                raise
+            breaker.record(not failed(result))
+            return result
+
+        return guarded() if key is None else self.flight.do((endpoint, key), guarded)
+
+    async def a_call(self, endpoint: str, key: Optional[Hashable], fn: Callable[[], Awaitable[Any]],
+                     failed: Callable[[Any], bool] = lambda result: False) -> Any:
+        breaker = self.breaker(endpoint)
+
+        async def guarded():
+            if not breaker.allow():
+                raise CircuitOpenError(endpoint)
+            try:
+                result = await fn()
+            except Exception:
+                breaker.record(False)
+                raise
+            breaker.record(not failed(result))
+            return result
+
+        return await (guarded() if key is None else self.flight.a_do((endpoint, key), guarded))
+
+    def reset(self):
+        for breaker in list(self._breakers.values()):
+            breaker.reset()
+
+    def stats(self) -> dict:
+        return {
+            **self.flight.stats(),
+            "breakers": {name: breaker.stats() for name, breaker in sorted(self._breakers.items())},
+        }
+
+
+def _call_key(params: Dict[str, Any]) -> Hashable:
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+
+class GuardedTransport:
+    """Wraps a seller_api transport: read-only calls are coalesced, every endpoint has a breaker"""
+
+    def __init__(self, transport, guard: Optional[BackendGuard] = None):
+        self.transport = transport
+        self.guard = guard or BackendGuard()
+
+    @property
+    def backend(self):
+        return getattr(self.transport, "backend", None)
+
+    def call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        key = _call_key(params) if endpoint in READ_ONLY_ENDPOINTS else None
+        return self.guard.call(endpoint, key, lambda: self.transport.call(endpoint, params))
+
+    async def a_call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        key = _call_key(params) if endpoint in READ_ONLY_ENDPOINTS else None
+        return await self.guard.a_call(endpoint, key, lambda: self.transport.a_call(endpoint, params))
+
+    def stats(self) -> dict:
+        return self.guard.stats()
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
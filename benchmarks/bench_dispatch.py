@@ -0,0 +1,51 @@
+import argparse
+import time
+
+import main
+
+# --------------------------
+# Micro-benchmark: parse + validate + dispatch per FUNCTION_CALL
+# --------------------------
+# Run from the repo root:  python -m benchmarks.bench_dispatch
+# Logging is left unconfigured, so debug records cost only the level check.
+
+SAMPLE_CALLS = [
+    'FUNCTION_CALL:get_user_status{"user_id": "1234"}',
+    'FUNCTION_CALL:get_listing_status{"listing_id": "FSN123456789012"}',
+    'FUNCTION_CALL:get_brand_approval_status{"request_id": "BR-3"}',
+    'FUNCTION_CALL:create_support_ticket{"user_id": "1234", "listing_id": "FSN123456789012", "reason": "Reactivation requested"}',
+    'FUNCTION_CALL:get_listing_diagnostics{"listing_ids": ["1001", "1002", "1003", "1004"]}',
+]
+
+
+def _time_per_call(fn, message: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(message)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(iterations: int = 20000) -> dict:
+    results = {}
+    for message in SAMPLE_CALLS:
+        func_name = message.split(":", 1)[1].split("{", 1)[0]
+        parse_us = _time_per_call(main.tools.parse, message, iterations)
+        spec, kwargs = main.tools.parse(message)
+        dispatch_us = _time_per_call(lambda _: main.tools.dispatch(spec.name, kwargs), message, iterations)
+        end_to_end_us = _time_per_call(main.execute_function_call, message, iterations // 10 or 1)
+        results[func_name] = {
+            "parse_validate_us": round(parse_us, 2),
+            "dispatch_us": round(dispatch_us, 2),
+            "execute_function_call_us": round(end_to_end_us, 2),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call cost of FUNCTION_CALL parse, validation and dispatch")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    print("µs per call")
+    print(f"{'function':<36}{'parse+validate':>16}{'dispatch':>12}{'execute':>14}")
+    for name, timing in run(args.iterations).items():
+        print(f"{name:<36}{timing['parse_validate_us']:>16}{timing['dispatch_us']:>12}{timing['execute_function_call_us']:>14}")
@@ -0,0 +1,98 @@
+import argparse
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from intake import Intake, analyze
+
+# --------------------------
+# Intake throughput
+# --------------------------
+# A seeded corpus of seller openers (IDs in varied phrasings, plus free text
+# with no IDs) is run through intake.analyze. Reports messages per second,
+# microseconds per message and how many expected IDs and intents were found.
+#
+# Run from the repo root:  python -m benchmarks.bench_intake --size 200000
+
+LISTING_OPENERS = [
+    "listing {fsn} is blocked, my seller id is {user}",
+    "Hi, seller ID: {user}. My product {fsn} is not visible",
+    "my listing id is {listing} and user id {user}, why is it inactive?",
+    "account number is {user} and listing id is {listing}",
+    "{fsn} not showing up on the site. seller {user}",
+    "I need help with my listing",
+    "why is my listing blocked?",
+]
+BRAND_OPENERS = [
+    "What is the status of my brand request {request}?",
+    "brand approval request id {request_number} pending for user {user}",
+    "{request} still not approved, is there an update on my brand?",
+    "I need help with my brand approval",
+]
+
+
+def _fsn(rng: random.Random) -> str:
+    return "FSN" + "".join(rng.choice("0123456789") for _ in range(12))
+
+
+def build_corpus(size: int, seed: int = 7) -> List[Tuple[str, Intake]]:
+    """(opener, the Intake analyze() should return) pairs"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        brand = rng.random() < 0.3
+        template = rng.choice(BRAND_OPENERS if brand else LISTING_OPENERS)
+        values = {
+            "user": str(rng.randint(1000, 99999)),
+            "fsn": _fsn(rng),
+            "listing": str(rng.randint(1000, 99999)),
+            "request_number": str(rng.randint(1000, 99999)),
+        }
+        values["request"] = f"BR-{values['request_number']}"
+        text = template.format(**values)
+        expected = Intake(
+            intent="brand" if brand else "listing",
+            user_id=values["user"] if "{user}" in template else None,
+            listing_id=(values["fsn"] if "{fsn}" in template
+                        else values["listing"] if "{listing}" in template else None),
+            request_id=(values["request"] if "{request}" in template
+                        else values["request_number"] if "{request_number}" in template else None),
+        )
+        corpus.append((text, expected))
+    return corpus
+
+
+def run(size: int = 100000, seed: int = 7) -> dict:
+    corpus = build_corpus(size, seed)
+    texts = [text for text, _ in corpus]
+    start = time.perf_counter()
+    results = [analyze(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    expected_ids = found_ids = intents = 0
+    for (_, expected), result in zip(corpus, results):
+        ids = expected.ids()
+        expected_ids += len(ids)
+        found_ids += sum(result.ids().get(field) == value for field, value in ids.items())
+        intents += result.intent == expected.intent
+    return {
+        "messages": size,
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(size / elapsed),
+        "us_per_message": round(elapsed / size * 1e6, 2),
+        "id_recall": round(found_ids / expected_ids, 4) if expected_ids else 1.0,
+        "intent_accuracy": round(intents / size, 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the local intent classifier and ID extractor")
+    parser.add_argument("--size", type=int, default=100000, help="openers in the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--min-recall", type=float, default=0.99, help="exit non-zero below this ID recall")
+    args = parser.parse_args()
+
+    result = run(args.size, args.seed)
+    for metric, value in result.items():
+        print(f"{metric:<22}{value:>14}")
+    sys.exit(0 if result["id_recall"] >= args.min_recall else 1)
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import main
+from benchmarks.stub_llm import ASK_USER_ID, StubLLM
+from model_router import FREE_TEXT, REISSUE, TOOL_RESULT, ModelRouter, ModelTier
+
+# --------------------------
+# Tiered model routing against local stub endpoints
+# --------------------------
+# Three stub models stand in for the deployments: the cheap tier's primary
+# writes some function calls with invalid JSON and stalls on some requests,
+# the cheap tier's fallback endpoint is well behaved, and the strong tier
+# always answers correctly. A mix of SIA turns (free seller text, tool results,
+# re-issues after a rejected call) goes through ModelRouter with main's
+# validate_reply, and the router's per-tier report is printed.
+#
+# By default every turn class starts on the cheap tier, so malformed replies
+# escalate; --routes config uses main.MODEL_ROUTES instead.
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_routing --turns 300 --malformed 0.2 --stall 0.05
+
+TURNS = {
+    FREE_TEXT: [
+        {"role": "user", "name": "User", "content": "I need help with my listing"},
+        {"role": "assistant", "name": "SIA", "content": ASK_USER_ID},
+        {"role": "user", "name": "User", "content": "12345"},
+    ],
+    TOOL_RESULT: [
+        {"role": "user", "name": "User", "content": "I need help with my listing"},
+        {"role": "assistant", "name": "SIA", "content": 'FUNCTION_CALL:get_user_status{"user_id": "12345"}'},
+        {"role": "user", "name": "FunctionExecutor",
+         "content": json.dumps({"status": "active", "user_id": "12345", "attempts": 1})},
+    ],
+    REISSUE: [
+        {"role": "user", "name": "User", "content": "12345"},
+        {"role": "assistant", "name": "SIA", "content": "FUNCTION_CALL:get_user_status{'user_id': '12345'}"},
+        {"role": "user", "name": "FunctionExecutor",
+         "content": json.dumps({"status": "error", "message": "❌ [execute_function_call] INVALID JSON"})},
+    ],
+}
+
+
+async def run_turns(router: ModelRouter, turns: int, concurrency: int, stream: bool) -> float:
+    mix = iter(list(itertools.islice(itertools.cycle(TURNS.values()), turns)))
+    system = {"role": "system", "content": main.SIA_SYSTEM_MESSAGE}
+
+    async def seller():
+        for messages in mix:
+            if stream:
+                await router.stream([system] + messages, on_text=lambda text: None)
+            else:
+                await router.complete([system] + messages)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(seller() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-tier latency, cost and escalation rate of the model router")
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--malformed", type=float, default=0.2,
+                        help="share of the cheap endpoint's function calls with invalid JSON")
+    parser.add_argument("--stall", type=float, default=0.05, help="share of the cheap endpoint's requests that hang")
+    parser.add_argument("--timeout", type=float, default=0.5, help="cheap tier's per-endpoint timeout")
+    parser.add_argument("--routes", choices=("cheap", "config"), default="cheap")
+    parser.add_argument("--no-stream", action="store_true")
+    args = parser.parse_args()
+
+    with StubLLM(model="stub-mini", malformed=args.malformed, stall=args.stall, stall_seconds=args.timeout * 4) \
+            as mini, StubLLM(model="stub-mini-fallback") as mini_fallback, \
+            StubLLM(model="stub-full", latency=0.005) as full:
+        tiers = [
+            ModelTier("mini", mini.config_list() + mini_fallback.config_list(),
+                      prompt_cost=0.00015, completion_cost=0.0006, timeout=args.timeout),
+            ModelTier("full", full.config_list(), prompt_cost=0.0025, completion_cost=0.01),
+        ]
+        # Same tier names as main.MODEL_TIERS
+        routes = {turn: "mini" for turn in TURNS} if args.routes == "cheap" else dict(main.MODEL_ROUTES)
+        router = ModelRouter(tiers, routes, validate=main.validate_reply)
+        elapsed = asyncio.run(run_turns(router, args.turns, args.concurrency, not args.no_stream))
+
+    report = router.stats()
+    print(f"routes {routes}; turns {report['turns']}; {elapsed:.2f}s")
+    print(f"{'tier':>6}{'calls':>7}{'ok':>6}{'invalid':>8}{'error':>7}{'esc%':>7}{'fallbk':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'cost $':>10}")
+    for name, t in report["tiers"].items():
+        print(f"{name:>6}{t['calls']:>7}{t['ok']:>6}{t['invalid']:>8}{t['error']:>7}"
+              f"{t['escalation_rate'] * 100:>7.1f}{t['endpoint_fallbacks']:>8}"
+              f"{t['p50_ms']:>9}{t['p95_ms']:>9}{t['cost_usd']:>10.4f}")
+    total = sum(t["cost_usd"] for t in report["tiers"].values())
+    print(f"total cost ${total:.4f} for {args.turns} turns")
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import main
+from benchmarks.scenarios import SCENARIOS, Scenario, ScriptedUserAgent
+from benchmarks.stub_llm import StubLLM
+from retry_policy import RetryPolicy
+
+# --------------------------
+# Offline scenario replay
+# --------------------------
+# Drives the real agents (build_agents: SIA, FunctionExecutorAgent,
+# CustomGroupChat, GroupChatManager) through every scripted scenario against
+# the local stub model, and records what each conversation costs.
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_scenarios                    # compare with the baseline
+#   python -m benchmarks.bench_scenarios --save-baseline    # record a new baseline
+#
+# Backoff delays are zeroed so wall time measures the pipeline, not the sleeps;
+# retries themselves still happen. The completion cache is off so every LLM
+# turn is counted.
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "scenario_baseline.json")
+COUNTED_METRICS = ("rounds", "llm_calls", "prompt_tokens", "completion_tokens")
+NO_WAIT_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0.0, jitter=0.0)
+
+
+def run_scenario(scenario: Scenario, llm: StubLLM) -> Dict[str, float]:
+    main.result_cache.clear()
+    main.backend_guard.reset()
+    llm.reset()
+    agents = main.build_agents(
+        user_agent=ScriptedUserAgent(scenario.inputs),
+        retry_policy=NO_WAIT_RETRY_POLICY,
+        silent=True,
+        llm_config=llm.llm_config(),
+        completion_cache=None
+    )
+    start = time.perf_counter()
+    agents.user_agent.initiate_chat(agents.manager, message=scenario.opening, clear_history=True, silent=True)
+    wall = time.perf_counter() - start
+    agents.sia.end_session()
+    usage = llm.stats()
+    return {
+        "rounds": len(agents.groupchat.messages),
+        "llm_calls": usage["calls"],
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "wall_time_ms": round(wall * 1000, 2),
+        "last_message": agents.groupchat.messages[-1].get("content"),
+    }
+
+
+def run(repeat: int = 3) -> Dict[str, dict]:
+    """Per-scenario metrics; wall time is the best of `repeat` runs"""
+    results = {}
+    with StubLLM() as llm:
+        for scenario in SCENARIOS:
+            runs = [run_scenario(scenario, llm) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["wall_time_ms"])
+            results[scenario.name] = best
+    return results
+
+
+def find_regressions(results: Dict[str, dict], baseline: Dict[str, dict],
+                     wall_tolerance: float = 0.25, wall_floor_ms: float = 5.0) -> List[str]:
+    """Metrics that got worse than the baseline.
+
+    Counted metrics may not increase at all; wall time is noisy, so it is
+    flagged only when it grows by more than wall_tolerance (relative) and by
+    more than wall_floor_ms.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in COUNTED_METRICS:
+            if current[metric] > before[metric]:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {current[metric]}")
+        slower = current["wall_time_ms"] - before["wall_time_ms"]
+        if slower > before["wall_time_ms"] * wall_tolerance and slower > wall_floor_ms:
+            regressions.append(f"{name}: wall_time_ms {before['wall_time_ms']} -> {current['wall_time_ms']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay scripted seller scenarios against a local stub LLM")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--wall-tolerance", type=float, default=0.25)
+    parser.add_argument("--wall-floor-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(f"{'scenario':<32}{'rounds':>8}{'llm':>6}{'prompt':>9}{'compl':>7}{'wall ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<32}{r['rounds']:>8}{r['llm_calls']:>6}{r['prompt_tokens']:>9}"
+              f"{r['completion_tokens']:>7}{r['wall_time_ms']:>10}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.wall_tolerance, args.wall_floor_ms)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("no regressions against baseline")
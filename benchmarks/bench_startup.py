@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# --------------------------
+# Cold-start budget
+# --------------------------
+# Each sample runs in a fresh interpreter, as a new worker would:
+#   import_ms      - `import main`
+#   first_turn_ms  - import + build_agents() + SIA's first reply to the opening
+#                    message (one LLM call against the local stub model)
+# Exits non-zero when the median of either passes its budget.
+#
+# Run from the repo root:  python -m benchmarks.bench_startup
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = 300
+FIRST_TURN_BUDGET_MS = 3000
+
+
+def _child():
+    from benchmarks.stub_llm import StubLLM
+
+    with StubLLM() as llm:
+        start = time.perf_counter()
+        import main
+        imported = time.perf_counter()
+
+        from benchmarks.scenarios import LISTING_OPENING, ScriptedUserAgent
+
+        first_turn = []
+
+        class FirstTurnUser(ScriptedUserAgent):
+            def get_human_input(self, prompt: str) -> str:
+                first_turn.append(time.perf_counter())
+                return "exit"
+
+        agents = main.build_agents(user_agent=FirstTurnUser([]), silent=True,
+                                   llm_config=llm.llm_config(), completion_cache=None)
+        agents.user_agent.initiate_chat(agents.manager, message=LISTING_OPENING, clear_history=True, silent=True)
+    print(json.dumps({
+        "import_ms": round((imported - start) * 1000, 2),
+        "first_turn_ms": round((first_turn[0] - start) * 1000, 2),
+    }))
+
+
+def sample() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(samples: int = 5) -> dict:
+    """Median import and time-to-first-turn over fresh interpreters"""
+    runs = [sample() for _ in range(samples)]
+    return {metric: round(statistics.median(r[metric] for r in runs), 2) for metric in ("import_ms", "first_turn_ms")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-turn of a fresh worker")
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--first-turn-budget-ms", type=float, default=FIRST_TURN_BUDGET_MS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        sys.exit(0)
+
+    result = run(args.samples)
+    budgets = {"import_ms": args.import_budget_ms, "first_turn_ms": args.first_turn_budget_ms}
+    over = False
+    for metric, value in result.items():
+        status = "ok" if value <= budgets[metric] else "OVER BUDGET"
+        over |= value > budgets[metric]
+        print(f"{metric:<15}{value:>10} ms   budget {budgets[metric]:>8} ms   {status}")
+    sys.exit(1 if over else 0)
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import List
+
+from async_llm import AsyncLLMClient
+from benchmarks.bench_scenarios import NO_WAIT_RETRY_POLICY
+from benchmarks.load_test import _latency_summary
+from benchmarks.scenarios import SCENARIOS, Scenario
+from benchmarks.stub_llm import StubLLM
+from worker_pool import WorkerPool
+
+# --------------------------
+# Worker pool scaling
+# --------------------------
+# Scripted sellers connect to the worker pool's dispatcher over TCP (the
+# production path: dispatcher -> worker process -> SessionServer) and run the
+# benchmark scenarios. The same load is repeated for each worker count, and
+# throughput is compared with the single-worker run; on an idle machine with
+# as many cores as workers the speedup should stay close to the worker count.
+#
+# Run from the repo root:
+#   python -m benchmarks.bench_workers --workers 1,2,4 --sessions 400 --concurrency 64
+
+
+def _default_worker_counts() -> str:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    return ",".join(map(str, counts))
+
+
+async def run_seller_session(port: int, scenario: Scenario) -> float:
+    """One conversation through the dispatcher; returns its wall time"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((scenario.opening + "\n").encode())
+    inputs = list(scenario.inputs)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "delta" in message:
+                continue
+            if message.get("done"):
+                break
+            writer.write(((inputs.pop(0) if inputs else "exit") + "\n").encode())
+            await writer.drain()
+    finally:
+        writer.close()
+    return time.perf_counter() - start
+
+
+async def run_load(port: int, sessions: int, concurrency: int) -> dict:
+    plan = iter(list(itertools.islice(itertools.cycle(SCENARIOS), sessions)))
+    times: List[float] = []
+
+    async def seller():
+        for scenario in plan:
+            times.append(await run_seller_session(port, scenario))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(seller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"sessions": len(times), "elapsed_s": round(elapsed, 3),
+            "sessions_per_s": round(len(times) / elapsed, 2), "end_to_end": _latency_summary(times)}
+
+
+def run(workers: int, llm: StubLLM, sessions: int, concurrency: int) -> dict:
+    agent_options = {
+        "llm_config": llm.llm_config(),
+        "llm_client": AsyncLLMClient(llm.config_list()),
+        "retry_policy": NO_WAIT_RETRY_POLICY,
+        "completion_cache": None,
+    }
+    with WorkerPool(workers, store_path=None, agent_options=agent_options) as pool:
+
+        async def drive():
+            server = await pool.start_dispatcher(port=0)
+            async with server:
+                report = await run_load(server.sockets[0].getsockname()[1], sessions, concurrency)
+                # Let the dispatcher finish relaying the connections the sellers just closed
+                while any(w.live for w in pool.workers):
+                    await asyncio.sleep(0.01)
+                return report
+
+        report = asyncio.run(drive())
+        report["rebalanced"] = pool.rebalanced
+    report["workers"] = workers
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session throughput of the worker pool by worker count")
+    parser.add_argument("--workers", default=_default_worker_counts(), help="comma-separated worker counts")
+    parser.add_argument("--sessions", type=int, default=300, help="conversations per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="sellers connected at once")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds injected per LLM call")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'sessions':>9}{'sess/s':>9}{'e2e p50':>10}{'p95':>10}{'speedup':>9}"
+          f"{'efficiency':>11}{'rebalanced':>11}")
+    baseline = None
+    with StubLLM(latency=args.llm_latency) as llm:
+        for count in [int(c) for c in args.workers.split(",")]:
+            r = run(count, llm, args.sessions, args.concurrency)
+            baseline = baseline or r["sessions_per_s"] / r["workers"]
+            speedup = r["sessions_per_s"] / baseline
+            print(f"{r['workers']:>8}{r['sessions']:>9}{r['sessions_per_s']:>9}"
+                  f"{r['end_to_end']['p50_ms']:>10}{r['end_to_end']['p95_ms']:>10}"
+                  f"{speedup:>9.2f}{speedup / r['workers']:>11.0%}{r['rebalanced']:>11}")
+    print(f"({os.cpu_count()} CPUs)")
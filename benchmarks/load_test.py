@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Dict, List, Optional
+
+import main
+from async_llm import AsyncLLMClient
+from completion_cache import CompletionCache
+from benchmarks.bench_scenarios import NO_WAIT_RETRY_POLICY
+from benchmarks.scenarios import SCENARIOS, Scenario, ScriptedUserAgent
+from benchmarks.stub_llm import StubLLM
+
+# --------------------------
+# Concurrent load generator
+# --------------------------
+# N scripted sellers run the async chat path at once against the local stub
+# model (with injected latency standing in for the real LLM). Reports
+# throughput, end-to-end and per-turn latency percentiles, and how much of
+# the time went to the LLM versus the FunctionExecutor (and, when streaming,
+# how much of the LLM time passed before the first token). With --ramp,
+# concurrency doubles until throughput stops growing.
+#
+# Run from the repo root:
+#   python -m benchmarks.load_test --concurrency 50 --llm-latency 0.3
+#   python -m benchmarks.load_test --ramp --llm-latency 0.3
+
+
+class TimedScriptedUser(ScriptedUserAgent):
+    """Scripted seller that also times each turn: seller message -> next reply shown"""
+
+    def __init__(self, inputs: List[str]):
+        super().__init__(inputs)
+        self.turn_latencies: List[float] = []
+        self.turn_started = time.perf_counter()
+
+    async def a_get_human_input(self, prompt: str) -> str:
+        self.turn_latencies.append(time.perf_counter() - self.turn_started)
+        answer = self.get_human_input(prompt)
+        self.turn_started = time.perf_counter()
+        return answer
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {f"p{p}_ms": round(percentile(values, p) * 1000, 2) for p in (50, 95, 99)}
+
+
+async def run_session(scenario: Scenario, llm_config: dict, llm_client: AsyncLLMClient,
+                      completion_cache: Optional[CompletionCache] = None, stream: bool = True) -> dict:
+    user = TimedScriptedUser(scenario.inputs)
+    agents = main.build_agents(user_agent=user, retry_policy=NO_WAIT_RETRY_POLICY, silent=True,
+                               llm_config=llm_config, llm_client=llm_client, completion_cache=completion_cache,
+                               stream=stream)
+    start = time.perf_counter()
+    user.turn_started = start
+    await agents.user_agent.a_initiate_chat(agents.manager, message=scenario.opening,
+                                            clear_history=True, silent=True)
+    end = time.perf_counter()
+    agents.sia.end_session()
+    if agents.groupchat.messages and agents.groupchat.messages[-1].get("name") != "User":
+        user.turn_latencies.append(end - user.turn_started)
+    return {
+        "seconds": end - start,
+        "turns": user.turn_latencies,
+        "llm_seconds": agents.sia.stats()["llm_seconds"],
+        "llm_first_token_seconds": agents.sia.stats()["llm_first_token_seconds"],
+        "executor_seconds": agents.function_executor.stats()["executor_seconds"],
+    }
+
+
+async def run_load(concurrency: int, sessions_per_seller: int, llm: StubLLM,
+                   completion_cache: Optional[CompletionCache] = None, stream: bool = True) -> dict:
+    """concurrency sellers, each running sessions_per_seller scenarios back to back"""
+    llm_config = llm.llm_config()
+    llm_client = AsyncLLMClient(llm.config_list())
+    scenarios = itertools.cycle(SCENARIOS)
+    plans = [[next(scenarios) for _ in range(sessions_per_seller)] for _ in range(concurrency)]
+
+    async def seller(plan: List[Scenario]) -> List[dict]:
+        return [await run_session(scenario, llm_config, llm_client, completion_cache, stream) for scenario in plan]
+
+    start = time.perf_counter()
+    sessions = [s for results in await asyncio.gather(*(seller(plan) for plan in plans)) for s in results]
+    elapsed = time.perf_counter() - start
+
+    llm_seconds = sum(s["llm_seconds"] for s in sessions)
+    first_token_seconds = sum(s["llm_first_token_seconds"] for s in sessions)
+    executor_seconds = sum(s["executor_seconds"] for s in sessions)
+    busy = sum(s["seconds"] for s in sessions)
+    return {
+        "concurrency": concurrency,
+        "sessions": len(sessions),
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(len(sessions) / elapsed, 2),
+        "end_to_end": _latency_summary([s["seconds"] for s in sessions]),
+        "per_turn": _latency_summary([t for s in sessions for t in s["turns"]]),
+        "llm_share": round(llm_seconds / busy, 3) if busy else 0.0,
+        "executor_share": round(executor_seconds / busy, 3) if busy else 0.0,
+        # How much of the LLM wait a streaming seller spends before seeing the first token
+        "first_token_share": round(first_token_seconds / llm_seconds, 3) if stream and llm_seconds else None,
+    }
+
+
+async def ramp(llm: StubLLM, sessions_per_seller: int, start: int = 1, max_concurrency: int = 1024,
+               min_gain: float = 0.05, completion_cache: Optional[CompletionCache] = None,
+               stream: bool = True) -> List[dict]:
+    """Double concurrency until throughput grows by less than min_gain (relative)"""
+    reports = []
+    concurrency = start
+    while concurrency <= max_concurrency:
+        report = await run_load(concurrency, sessions_per_seller, llm, completion_cache, stream)
+        reports.append(report)
+        _print_report(report)
+        if len(reports) > 1 and report["sessions_per_s"] < reports[-2]["sessions_per_s"] * (1 + min_gain):
+            break
+        concurrency *= 2
+    return reports
+
+
+def _print_header():
+    print(f"{'conc':>5}{'sessions':>9}{'sess/s':>9}{'e2e p50':>10}{'p95':>10}{'p99':>10}"
+          f"{'turn p50':>10}{'p95':>10}{'p99':>10}{'llm%':>7}{'exec%':>7}{'ttft%':>7}")
+
+
+def _print_report(r: dict):
+    e2e, turn = r["end_to_end"], r["per_turn"]
+    print(f"{r['concurrency']:>5}{r['sessions']:>9}{r['sessions_per_s']:>9}"
+          f"{e2e['p50_ms']:>10}{e2e['p95_ms']:>10}{e2e['p99_ms']:>10}"
+          f"{turn['p50_ms']:>10}{turn['p95_ms']:>10}{turn['p99_ms']:>10}"
+          f"{r['llm_share'] * 100:>7.1f}{r['executor_share'] * 100:>7.1f}"
+          f"{'-' if r['first_token_share'] is None else format(r['first_token_share'] * 100, '.1f'):>7}")
+
+
+async def _main(args):
+    completion_cache = CompletionCache(":memory:") if args.completion_cache else None
+    stream = not args.no_stream
+    with StubLLM(latency=args.llm_latency, token_latency=args.token_latency) as llm:
+        _print_header()
+        if args.ramp:
+            reports = await ramp(llm, args.sessions_per_seller, max_concurrency=args.max_concurrency,
+                                 min_gain=args.min_gain, completion_cache=completion_cache, stream=stream)
+            best = max(reports, key=lambda r: r["sessions_per_s"])
+            print(f"peak throughput {best['sessions_per_s']} sessions/s at concurrency {best['concurrency']}")
+        else:
+            _print_report(await run_load(args.concurrency, args.sessions_per_seller, llm, completion_cache, stream))
+        if completion_cache is not None:
+            print(f"completion cache: {completion_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent scripted sellers against a local stub LLM")
+    parser.add_argument("--concurrency", type=int, default=10, help="sellers running at once")
+    parser.add_argument("--sessions-per-seller", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds injected per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.02,
+                        help="seconds between streamed chunks from the stub LLM")
+    parser.add_argument("--no-stream", action="store_true", help="wait for whole completions instead of streaming")
+    parser.add_argument("--ramp", action="store_true", help="double concurrency until throughput plateaus")
+    parser.add_argument("--max-concurrency", type=int, default=1024)
+    parser.add_argument("--completion-cache", action="store_true",
+                        help="share an in-memory completion cache between sessions")
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help="relative throughput gain below which the ramp stops")
+    asyncio.run(_main(parser.parse_args()))
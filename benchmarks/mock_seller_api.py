@@ -0,0 +1,184 @@
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from seller_api import ENDPOINTS, GZIP_MIN_BYTES, SellerAPIError, SimulatedSellerAPI
+
+# --------------------------
+# Local seller API over HTTP
+# --------------------------
+# Serves seller_api.SimulatedSellerAPI on the paths in seller_api.ENDPOINTS, so
+# HTTPTransport can be exercised end to end without the real backend. Each
+# request can be delayed (latency) and can fail with a 503 (error_rate, seeded
+# so runs are reproducible). gzip request bodies are accepted; responses are
+# gzipped when the client accepts it and they are large enough.
+#
+#   with MockSellerAPI(latency=0.02, error_rate=0.05) as api:
+#       handler = FlipkartAPIHandler(transport=HTTPTransport(api.base_url))
+#       ...
+#       api.stats()  # {"requests": ..., "errors": ..., "by_endpoint": {...}}
+#
+# Or standalone:  python -m benchmarks.mock_seller_api --port 8780
+#                 SELLER_API_URL=http://127.0.0.1:8780 python main.py
+
+
+def _route(path: str) -> Pattern:
+    return re.compile("^" + re.sub(r"\\\{(\w+)\\\}", r"(?P<\1>[^/]+)", re.escape(path)) + "$")
+
+
+ROUTES: List[Tuple[str, str, Pattern]] = [(method, name, _route(path)) for name, (method, path) in ENDPOINTS.items()]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_MockServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        for route_method, endpoint, pattern in ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            self._send(404, {"error": f"no route for {method} {url.path}"})
+            return
+
+        mock = self.server.mock
+        if mock.latency:
+            time.sleep(mock.latency)
+        if mock.should_fail():
+            mock.record(endpoint, error=True)
+            self._send(503, {"error": "simulated backend failure", "endpoint": endpoint})
+            return
+
+        params = {k: unquote(v) for k, v in match.groupdict().items()}
+        params.update(parse_qsl(url.query))
+        if body:
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            params.update(json.loads(body))
+        try:
+            result = mock.backend.handle(endpoint, params)
+        except (SellerAPIError, TypeError) as e:
+            mock.record(endpoint, error=True)
+            self._send(getattr(e, "status", None) or 400, {"error": str(e), "endpoint": endpoint})
+            return
+        mock.record(endpoint)
+        self._send(200, result)
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if len(data) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, mock: "MockSellerAPI"):
+        super().__init__(address, _Handler)
+        self.mock = mock
+
+
+class MockSellerAPI:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 test_responses: Optional[Dict[str, str]] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        latency:    seconds added to every request
+        error_rate: fraction of requests answered with HTTP 503
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.backend = SimulatedSellerAPI(test_responses)
+        self._random = random.Random(seed)
+        self._address = (host, port)
+        self._server: Optional[_MockServer] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def start(self) -> "MockSellerAPI":
+        self._server = _MockServer(self._address, self)
+        threading.Thread(target=self._server.serve_forever, name="mock-seller-api", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockSellerAPI":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def record(self, endpoint: str, error: bool = False):
+        with self._lock:
+            self._requests += 1
+            self._errors += error
+            self._by_endpoint[endpoint] = self._by_endpoint.get(endpoint, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._requests = 0
+            self._errors = 0
+            self._by_endpoint: Dict[str, int] = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self._requests, "errors": self._errors, "by_endpoint": dict(self._by_endpoint)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the simulated seller API over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    api = MockSellerAPI(args.latency, args.error_rate, args.seed, host=args.host, port=args.port).start()
+    print(f"mock seller API on {api.base_url}  (latency {args.latency}s, error rate {args.error_rate})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
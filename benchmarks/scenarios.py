@@ -0,0 +1,60 @@
+from typing import List, NamedTuple
+
+from autogen import UserProxyAgent
+
+# --------------------------
+# Scripted seller conversations
+# --------------------------
+# One scenario per branch of the simulated backend in main.py:
+#   user IDs:     1... active, 2... onboarding, 5... flaky (retries exhausted), other on_hold
+#   listing IDs:  ...1 inactive, ...2 blocked, ...3 archived, ...4 rfa, other active, 5... flaky
+#   brand IDs:    ...1 approved, ...2 in progress (<=72h), other disapproved (>72h, ticket)
+# The opener_* scenarios state their IDs up front, the way sellers often do.
+
+LISTING_OPENING = "I need help with my listing"
+BRAND_OPENING = "I need help with my brand approval"
+
+
+class Scenario(NamedTuple):
+    name: str
+    opening: str
+    inputs: List[str]
+
+
+SCENARIOS = [
+    Scenario("user_active_listing_active", LISTING_OPENING, ["1001", "1000"]),
+    Scenario("user_active_listing_inactive", LISTING_OPENING, ["1001", "1001"]),
+    Scenario("user_active_listing_blocked", LISTING_OPENING, ["1001", "1002"]),
+    Scenario("user_active_listing_archived", LISTING_OPENING, ["1001", "1003"]),
+    Scenario("user_active_listing_rfa", LISTING_OPENING, ["1001", "1004"]),
+    Scenario("user_active_listing_flaky", LISTING_OPENING, ["1001", "5000"]),
+    Scenario("user_onboarding", LISTING_OPENING, ["2001"]),
+    Scenario("user_flaky_listing_active", LISTING_OPENING, ["5001", "1000"]),
+    Scenario("user_on_hold_listing_blocked", LISTING_OPENING, ["7001", "1002"]),
+    Scenario("brand_approved", BRAND_OPENING, ["BR-1001"]),
+    Scenario("brand_in_progress", BRAND_OPENING, ["BR-1002"]),
+    Scenario("brand_disapproved_ticket", BRAND_OPENING, ["BR-1003"]),
+    Scenario("opener_ids_listing_blocked", "listing FSN123456789012 is blocked, my seller id is 1234", []),
+    Scenario("opener_user_id_only", "My listing is not visible, seller id 1001", ["1003"]),
+    Scenario("opener_listing_id_only", "My listing 1002 is not visible", ["1001"]),
+    Scenario("opener_brand_request_id", "What is the status of my brand request BR-1002?", []),
+]
+
+
+class ScriptedUserAgent(UserProxyAgent):
+    """The User agent, answering from a script instead of stdin ("exit" once it runs out)"""
+
+    def __init__(self, inputs: List[str]):
+        super().__init__(
+            name="User",
+            human_input_mode="ALWAYS",
+            system_message="You are a human user interacting with the support system.",
+            code_execution_config=False
+        )
+        self.inputs = list(inputs)
+
+    def get_human_input(self, prompt: str) -> str:
+        return self.inputs.pop(0) if self.inputs else "exit"
+
+    async def a_get_human_input(self, prompt: str) -> str:
+        return self.get_human_input(prompt)
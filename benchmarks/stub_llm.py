@@ -0,0 +1,238 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from token_count import count_message_tokens, count_text_tokens
+
+# --------------------------
+# Deterministic local stand-in for the chat completions endpoint
+# --------------------------
+# Speaks just enough of the OpenAI HTTP API (POST .../chat/completions) for
+# autogen's client and AsyncLLMClient to talk to it unchanged. Replies are
+# scripted from the conversation so far, the way SIA is expected to answer the
+# turns the SOP engine leaves to the LLM. Token usage is counted with
+# token_count, so runs are reproducible. Requests with "stream": true get the
+# reply as server-sent chat.completion.chunk events, one word per chunk,
+# token_latency seconds apart.
+#
+# For the model router: `malformed` is the share of FUNCTION_CALL replies
+# written with single-quoted (invalid) JSON, and `stall` the share of
+# requests that hang for stall_seconds, as a timed-out endpoint would. Both
+# are spread evenly over the request sequence, so runs stay reproducible.
+#
+#   with StubLLM(latency=0.05) as llm:
+#       agents = main.build_agents(llm_config=llm.llm_config())
+#       ...
+#       llm.stats()  # {"calls": ..., "prompt_tokens": ..., "completion_tokens": ...}
+
+MODEL = "gpt-4o-mini"
+
+ASK_USER_ID = "Please share your user ID."
+ASK_BRAND_REQUEST_ID = "Please share your brand request ID."
+CHUNK_PATTERN = re.compile(r"\s*\S+")
+ID_PATTERN = re.compile(r"^\s*([A-Za-z]{0,4}-?\d+)\s*$")
+BRAND_REQUEST_PATTERN = re.compile(r"^\s*BR-?\w+\s*$", re.IGNORECASE)
+
+
+def scripted_reply(messages: List[dict]) -> str:
+    """SIA's answer to a turn the SOP engine handed to the LLM"""
+    turns = [m for m in messages if m.get("role") != "system"]
+    last = (turns[-1].get("content") or "") if turns else ""
+    asked = " ".join(m.get("content") or "" for m in turns if m.get("role") == "assistant")
+
+    if BRAND_REQUEST_PATTERN.match(last) or (ID_PATTERN.match(last) and ASK_BRAND_REQUEST_ID in asked):
+        return 'FUNCTION_CALL:get_brand_approval_status{"request_id": "%s"}' % last.strip()
+    if ID_PATTERN.match(last):
+        if "listing ID" in asked:
+            return 'FUNCTION_CALL:get_listing_status{"listing_id": "%s"}' % last.strip()
+        return 'FUNCTION_CALL:get_user_status{"user_id": "%s"}' % last.strip()
+    if re.search(r"\bbrand\b", last, re.IGNORECASE) and not re.search(r"\blisting\b", last, re.IGNORECASE):
+        return ASK_BRAND_REQUEST_ID
+    return ASK_USER_ID
+
+
+def _every(rate: float, n: int) -> bool:
+    """True for an evenly spread `rate` share of n = 1, 2, 3, ..."""
+    return int(n * rate) != int((n - 1) * rate)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # keep-alive clients would otherwise wait on delayed ACKs
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        stub = self.server.stub
+        request = stub.next_request()
+        if _every(stub.stall, request):
+            time.sleep(stub.stall_seconds)
+        if stub.latency:
+            time.sleep(stub.latency)
+        content = scripted_reply(messages)
+        if content.startswith("FUNCTION_CALL:") and _every(stub.malformed, request):
+            content = content.replace('"', "'")
+        prompt_tokens = count_message_tokens(messages)
+        completion_tokens = count_text_tokens(content)
+        stub.record(prompt_tokens, completion_tokens)
+        if body.get("stream"):
+            self._stream(body.get("model", MODEL), content, stub.token_latency)
+            return
+        if stub.token_latency:
+            # The same generation time a stream would take, delivered at once
+            time.sleep(stub.token_latency * max(0, len(CHUNK_PATTERN.findall(content)) - 1))
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", MODEL),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out on a stalled request
+            self.close_connection = True
+
+    def _stream(self, model: str, content: str, token_latency: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        created = int(time.time())
+
+        def event(data: str):
+            line = f"data: {data}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+            return json.dumps({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            })
+
+        try:
+            event(chunk({"role": "assistant", "content": ""}))
+            for i, piece in enumerate(CHUNK_PATTERN.findall(content)):
+                if i and token_latency:
+                    time.sleep(token_latency)
+                event(chunk({"content": piece}))
+            event(chunk({}, "stop"))
+            event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading once it had what it needed
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open hundreds of connections at once
+
+    def __init__(self, address, stub: "StubLLM"):
+        super().__init__(address, _Handler)
+        self.stub = stub
+
+
+class StubLLM:
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 model: str = MODEL, malformed: float = 0.0, stall: float = 0.0, stall_seconds: float = 30.0):
+        """
+        latency:       seconds before every completion (or its first streamed token)
+        token_latency: seconds per generated word after the first (streamed chunks arrive this far apart)
+        model:         model name in config_list()
+        malformed:     share of FUNCTION_CALL replies sent with invalid JSON
+        stall:         share of requests held for stall_seconds before answering
+        """
+        self.latency = latency
+        self.token_latency = token_latency
+        self.model = model
+        self.malformed = malformed
+        self.stall = stall
+        self.stall_seconds = stall_seconds
+        self._address = (host, port)
+        self._server: Optional[_StubServer] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def start(self) -> "StubLLM":
+        self._server = _StubServer(self._address, self)
+        threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubLLM":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def config_list(self) -> List[dict]:
+        return [{"model": self.model, "api_key": "stub", "base_url": self.base_url}]
+
+    def llm_config(self) -> dict:
+        """llm_config for build_agents; autogen's disk cache is off so every call reaches the stub"""
+        return {"config_list": self.config_list(), "cache_seed": None}
+
+    def next_request(self) -> int:
+        with self._lock:
+            self._requests += 1
+            return self._requests
+
+    def record(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self._calls += 1
+            self._prompt_tokens += prompt_tokens
+            self._completion_tokens += completion_tokens
+
+    def reset(self):
+        with self._lock:
+            self._requests = 0
+            self._calls = 0
+            self._prompt_tokens = 0
+            self._completion_tokens = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens
+            }
@@ -0,0 +1,275 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, NamedTuple, Optional
+
+import main
+from json_logging import configure_logging, get_logger
+from retry_policy import RetryPolicy
+from sop_engine import ASKED_FOR, LISTING_ID_PROMPT, SOPEngine, format_function_call, parse_function_call
+from template_renderer import DEFAULT_LOCALE
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Headless bulk triage of seller cases
+# --------------------------
+# Each case (user_id, listing_id and/or request_id) is run through the SOP as
+# a scripted conversation with no LLM: SOPEngine decides every step, the calls
+# go through main.execute_function_call (same tools, retries, caches, circuit
+# breakers and ticket store as the chat), and a SIA prompt for an ID is
+# answered from the case. The terminal template text becomes the result; a
+# turn the SOP cannot decide marks the case needs_review.
+#
+# Cases are read lazily and run on a bounded thread pool; results are written
+# in input order as soon as every earlier case has finished, so memory stays
+# at most `window` cases whatever the input size. Because output is ordered,
+# --resume only has to count the records already written and skip that many
+# input cases (a record cut short by a crash is truncated first).
+#
+#   python bulk_triage.py cases.csv results.jsonl --workers 16
+#   python bulk_triage.py cases.jsonl results.csv --resume
+
+CASE_FIELDS = ("user_id", "listing_id", "request_id")
+RESULT_FIELDS = ("index", "case_id", "flow", "user_id", "listing_id", "request_id", "outcome", "ticket_id",
+                 "reply", "calls", "seconds", "error")
+# Record terminators: the csv module ends rows with \r\n, and replies are
+# written with bare \n line breaks, so a record never contains its terminator
+TERMINATORS = {"jsonl": b"\n", "csv": b"\r\n"}
+MAX_STEPS = 12
+
+NEEDS_REVIEW, INVALID, FAILED = "needs_review", "invalid", "failed"
+
+
+class Case(NamedTuple):
+    index: int  # 1-based position in the input
+    case_id: str
+    user_id: Optional[str]
+    listing_id: Optional[str]
+    request_id: Optional[str]
+
+
+def _format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"{path}: expected a .csv or .jsonl file")
+
+
+def _clean(value) -> Optional[str]:
+    value = "" if value is None else str(value).strip()
+    return value or None
+
+
+def read_cases(path: str) -> Iterator[Case]:
+    """Cases from a CSV (header row) or JSONL file, one at a time"""
+    fmt = _format(path)
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows, 1):
+            yield Case(index, _clean(row.get("case_id")) or str(index),
+                       *(_clean(row.get(field)) for field in CASE_FIELDS))
+
+
+# --------------------------
+# One case through the SOP
+# --------------------------
+def _message(name: str, content: str) -> dict:
+    return {"name": name, "role": "assistant" if name == "SIA" else "user", "content": content}
+
+
+def _answer(prompt: str, case: Case) -> Optional[str]:
+    """The case's answer to SIA asking for an ID, if it has one"""
+    if prompt.rstrip().endswith(LISTING_ID_PROMPT):
+        return case.listing_id
+    asked = [field for field, pattern in ASKED_FOR.items() if pattern.search(prompt)]
+    return getattr(case, asked[0]) if len(asked) == 1 else None
+
+
+def triage_case(case: Case, engine: SOPEngine, retry_policy: Optional[RetryPolicy] = None) -> dict:
+    start = time.perf_counter()
+    flow = "brand" if case.request_id else "listing"
+    result = {"index": case.index, "case_id": case.case_id, "flow": flow, "user_id": case.user_id,
+              "listing_id": case.listing_id, "request_id": case.request_id, "outcome": None,
+              "ticket_id": None, "reply": None, "calls": 0, "error": None}
+    if flow == "listing" and not case.user_id:
+        result.update(outcome=INVALID, error="user_id or request_id is required")
+        return _timed(result, start)
+
+    # The seller states what the case knows; SIA opens with the flow's first lookup
+    stated = [f"{label} {value}" for label, value in
+              (("seller ID", case.user_id), ("listing ID", case.listing_id), ("brand request ID", case.request_id))
+              if value]
+    messages = [_message("User", f"I need help with my {'brand approval' if flow == 'brand' else 'listing'}. "
+                                 + ", ".join(stated))]
+    reply = (format_function_call("get_brand_approval_status", {"request_id": case.request_id}) if flow == "brand"
+             else format_function_call("get_user_status", {"user_id": case.user_id}))
+    status = None
+    try:
+        for _ in range(MAX_STEPS):
+            messages.append(_message("SIA", reply))
+            call = parse_function_call(reply)
+            if call:
+                output = main.execute_function_call(reply, retry_policy)
+                result["calls"] += 1
+                messages.append(_message("FunctionExecutor", output))
+                tool_result = json.loads(output)
+                if call[0] == "create_support_ticket":
+                    result["ticket_id"] = tool_result.get("ticket_id")
+                else:
+                    status = tool_result.get("status")
+            elif reply.rstrip().endswith("TERMINATE"):
+                text = reply.rstrip()[:-len("TERMINATE")].strip()
+                result.update(outcome=status or "terminated", reply=text.replace("\r\n", "\n"))
+                return _timed(result, start)
+            else:
+                answer = _answer(reply, case)
+                if answer is None:
+                    break
+                messages.append(_message("User", answer))
+            reply = engine.next_reply(messages)
+            if reply is None:
+                break
+        result.update(outcome=NEEDS_REVIEW, reply=messages[-1]["content"] if messages[-1]["name"] == "SIA" else None)
+    except Exception as e:
+        logger.exception("triage failed for case %s", case.case_id)
+        result.update(outcome=FAILED, error=f"{type(e).__name__}: {e}")
+    return _timed(result, start)
+
+
+def _timed(result: dict, start: float) -> dict:
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+# --------------------------
+# Ordered, resumable output
+# --------------------------
+def completed_records(path: str, fmt: str) -> int:
+    """Records fully written to path; a trailing partial record is truncated away"""
+    if not os.path.exists(path):
+        return 0
+    terminator = TERMINATORS[fmt]
+    count, size, last_end, carry = 0, 0, 0, b""
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            # carry: the bytes a terminator split across two blocks starts with
+            data = carry + block
+            count += data.count(terminator)
+            end = data.rfind(terminator)
+            if end >= 0:
+                last_end = size - len(carry) + end + len(terminator)
+            size += len(block)
+            carry = data[len(data) - len(terminator) + 1:]
+    if last_end < size:
+        logger.warning("truncating a partial record at the end of %s", path)
+        with open(path, "r+b") as f:
+            f.truncate(last_end)
+    return count - 1 if fmt == "csv" and count else count  # CSV header
+
+
+class ResultWriter:
+    def __init__(self, path: str, append: bool):
+        self.fmt = _format(path)
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "a" if exists else "w", newline="" if self.fmt == "csv" else None,
+                          encoding="utf-8")
+        self._csv = csv.DictWriter(self._file, RESULT_FIELDS) if self.fmt == "csv" else None
+        if self._csv is not None and not exists:
+            self._csv.writeheader()
+
+    def write(self, result: dict):
+        if self._csv is not None:
+            self._csv.writerow(result)
+        else:
+            self._file.write(json.dumps(result, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# --------------------------
+# Runner
+# --------------------------
+def run(input_path: str, output_path: str, workers: int = 8, window: Optional[int] = None,
+        resume: bool = False, locale: str = DEFAULT_LOCALE, retry_policy: Optional[RetryPolicy] = None,
+        progress_every: int = 1000) -> dict:
+    """Triage every case in input_path into output_path; returns a summary"""
+    window = window or workers * 16
+    fmt = _format(output_path)
+    skip = 0
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        if not resume:
+            raise FileExistsError(f"{output_path} exists; pass --resume to continue it")
+        skip = completed_records(output_path, fmt)
+    engine = SOPEngine(renderer=main.template_renderer, locale=locale)
+    writer = ResultWriter(output_path, append=resume)
+    outcomes: Counter = Counter()
+    written = 0
+    start = time.perf_counter()
+    if skip:
+        logger.info("resuming after %d completed cases", skip)
+
+    def emit(result: dict):
+        nonlocal written
+        writer.write(result)
+        outcomes[result["outcome"]] += 1
+        written += 1
+        if progress_every and written % progress_every == 0:
+            logger.info("triaged %d cases", written, extra={"data": {
+                "cases_per_second": round(written / (time.perf_counter() - start), 1),
+                "outcomes": dict(outcomes)}})
+
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="triage") as pool:
+            for case in read_cases(input_path):
+                if case.index <= skip:
+                    continue
+                pending.append(pool.submit(triage_case, case, engine, retry_policy))
+                while pending and (len(pending) >= window or pending[0].done()):
+                    emit(pending.popleft().result())
+            while pending:
+                emit(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        writer.close()
+        main.ticket_store.flush(timeout=30)
+    elapsed = time.perf_counter() - start
+    return {
+        "skipped": skip,
+        "cases": written,
+        "seconds": round(elapsed, 3),
+        "cases_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+        "outcomes": dict(outcomes),
+        "tickets": main.ticket_store.stats()["created"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Triage a CSV/JSONL backlog of seller cases through the SOP, "
+                                                 "without the LLM")
+    parser.add_argument("input", help="cases: .csv with a header row or .jsonl; columns/keys "
+                                      "case_id (optional), user_id, listing_id, request_id")
+    parser.add_argument("output", help="results file (.jsonl or .csv), written in input order")
+    parser.add_argument("--workers", type=int, default=8, help="cases in flight at once")
+    parser.add_argument("--window", type=int, default=None,
+                        help="cases held in memory waiting to be written in order (default 16 x workers)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run into the same output")
+    parser.add_argument("--locale", default=DEFAULT_LOCALE)
+    args = parser.parse_args()
+    configure_logging()
+    try:
+        summary = run(args.input, args.output, args.workers, args.window, args.resume, args.locale)
+    except (FileExistsError, ValueError) as e:
+        sys.exit(str(e))
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# --------------------------
+# Persistent LLM completion cache
+# --------------------------
+# SIA's LLM turns repeat constantly across sellers: the same opening message,
+# the same tool-result shapes, only the IDs differ. Completions are stored in
+# SQLite keyed by the model that answers the turn (for ModelRouter, the tier
+# the turn is routed to), a hash of the system message and the normalized
+# history, so the cache survives restarts and is shared by worker processes.
+#
+# Normalization replaces every concrete ID with a positional placeholder
+# (first ID seen -> <ID0>, ...) and timestamps with <TS>. The completion is
+# stored with the same placeholders and filled back in on a hit, so a
+# FUNCTION_CALL carrying the seller's ID is reused for the next seller with
+# their own ID.
+
+DEFAULT_PATH = os.environ.get("SIA_COMPLETION_CACHE", os.path.join(".cache", "sia_completions.sqlite3"))
+
+ID_PATTERN = re.compile(r"\b(?:[A-Za-z]{1,8}-?)?\d{3,}\b")
+TIMESTAMP_PATTERN = re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+PLACEHOLDER_PATTERN = re.compile(r"<ID(\d+)>")
+KEY_FIELDS = ("role", "name", "content")
+
+
+class CacheKey(NamedTuple):
+    digest: str
+    ids: Tuple[str, ...]  # concrete ID behind each placeholder, by position
+
+
+def normalize_messages(messages: List[dict]) -> Tuple[List[dict], Tuple[str, ...]]:
+    """(messages with IDs and timestamps replaced by placeholders, the IDs in placeholder order)"""
+    ids: Dict[str, str] = {}
+
+    def placeholder(match: re.Match) -> str:
+        value = match.group(0)
+        if value not in ids:
+            ids[value] = f"<ID{len(ids)}>"
+        return ids[value]
+
+    normalized = []
+    for m in messages:
+        content = TIMESTAMP_PATTERN.sub("<TS>", m.get("content") or "")
+        content = ID_PATTERN.sub(placeholder, content)
+        normalized.append({k: content if k == "content" else m.get(k) for k in KEY_FIELDS if m.get(k) is not None})
+    return normalized, tuple(ids)
+
+
+def make_key(model: str, system_message: str, messages: List[dict]) -> CacheKey:
+    normalized, ids = normalize_messages(messages)
+    payload = json.dumps({
+        "model": model,
+        "system": hashlib.sha256(system_message.encode()).hexdigest(),
+        "messages": normalized
+    }, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return CacheKey(hashlib.sha256(payload.encode()).hexdigest(), ids)
+
+
+class CompletionCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = 50000, max_age: float = 7 * 24 * 3600,
+                 clock: Callable[[], float] = time.time):
+        """
+        path:        SQLite file (":memory:" for a private in-process cache)
+        max_entries: entries kept before least-recently-used ones are evicted
+        max_age:     seconds a completion stays valid after it was stored
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._clock = clock
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing main never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, completion TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, model: str, system_message: str, messages: List[dict]) -> Tuple[Optional[str], CacheKey]:
+        """(cached completion with this history's IDs filled in, or None; key for store())"""
+        key = make_key(model, system_message, messages)
+        now = self._clock()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT completion, created FROM completions WHERE key = ?", (key.digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, key
+            completion, created = row
+            if now - created > self.max_age:
+                db.execute("DELETE FROM completions WHERE key = ?", (key.digest,))
+                self.expirations += 1
+                self.misses += 1
+                return None, key
+            db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key.digest))
+            self.hits += 1
+        return _fill_ids(completion, key.ids), key
+
+    def store(self, key: CacheKey, completion: str):
+        normalized = _strip_ids(completion, key.ids)
+        if normalized is None:
+            return
+        now = self._clock()
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO completions (key, completion, created, last_used) VALUES (?, ?, ?, ?)",
+                       (key.digest, normalized, now, now))
+            size = db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            if size > self.max_entries:
+                excess = size - self.max_entries
+                db.execute("DELETE FROM completions WHERE key IN "
+                           "(SELECT key FROM completions ORDER BY last_used LIMIT ?)", (excess,))
+                self.evictions += excess
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            removed = self._db().execute("DELETE FROM completions WHERE created < ?",
+                                         (self._clock() - self.max_age,)).rowcount
+            self.expirations += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM completions")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": size,
+                "max_entries": self.max_entries
+            }
+
+
+def _strip_ids(completion: str, ids: Tuple[str, ...]) -> Optional[str]:
+    """Completion with the history's IDs replaced by their placeholders.
+
+    None when the completion mentions an ID that is not in the history: it
+    could not be reproduced for another seller, so it is not cached.
+    """
+    positions = {value: i for i, value in enumerate(ids)}
+
+    def placeholder(match: re.Match) -> str:
+        value = match.group(0)
+        if value not in positions:
+            raise KeyError(value)
+        return f"<ID{positions[value]}>"
+
+    try:
+        return ID_PATTERN.sub(placeholder, completion)
+    except KeyError:
+        return None
+
+
+def _fill_ids(completion: str, ids: Tuple[str, ...]) -> str:
+    return PLACEHOLDER_PATTERN.sub(lambda m: ids[int(m.group(1))], completion)
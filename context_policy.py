@@ -0,0 +1,104 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+from intake import analyze
+from tool_registry import match_function_call
+
+# --------------------------
+# Bounded LLM context for SIA
+# --------------------------
+# Instead of the whole groupchat history, the LLM sees:
+#   1. a "facts so far" record built from tool results (IDs, last statuses,
+#      ticket ID, ...) and the IDs the seller stated (intake.analyze),
+#   2. the opening seller message (it carries the intent),
+#   3. the last few turns, with FunctionExecutor JSON reduced to its
+#      decision-relevant fields.
+# Older tool outputs and retry chatter are dropped; the facts record keeps
+# what the SOP still needs from them.
+
+FACT_FIELDS = ("user_id", "listing_id", "request_id", "ticket_id", "block_reason", "timeline_hours", "reason_code")
+TOOL_RESULT_FIELDS = ("status", "message") + FACT_FIELDS
+
+# Which fact records the status of which lookup
+STATUS_FACTS = {
+    "get_user_status": "user_status",
+    "get_listing_status": "listing_status",
+    "get_brand_approval_status": "brand_status",
+    "create_support_ticket": "ticket_status",
+}
+
+
+class ContextPolicy:
+    def __init__(self, keep_last: int = 6, max_tool_chars: int = 400):
+        """
+        keep_last:      most recent messages passed through (tool results summarized)
+        max_tool_chars: cap on a tool result that is not JSON or is still large after summarizing
+        """
+        self.keep_last = keep_last
+        self.max_tool_chars = max_tool_chars
+
+    def extract_facts(self, messages: List[dict]) -> Dict[str, Any]:
+        facts: Dict[str, Any] = {}
+        last_call = None
+        for m in messages:
+            content = m.get("content") or ""
+            if m.get("name") == "User":
+                facts.update(analyze(content).ids())
+            elif m.get("name") == "SIA":
+                matched = match_function_call(content)
+                if matched:
+                    last_call = matched[0]
+            elif m.get("name") == "FunctionExecutor":
+                result = _load_json(content)
+                if result is None:
+                    continue
+                for field in FACT_FIELDS:
+                    if result.get(field) not in (None, "", "N/A"):
+                        facts[field] = result[field]
+                if last_call in STATUS_FACTS and "status" in result:
+                    facts[STATUS_FACTS[last_call]] = result["status"]
+                if isinstance(result.get("results"), dict):
+                    facts["batch_statuses"] = {
+                        item_id: item.get("status") for item_id, item in result["results"].items()
+                    }
+        return facts
+
+    def summarize_tool_result(self, content: str) -> str:
+        result = _load_json(content)
+        if result is None:
+            return content[:self.max_tool_chars]
+        summary = {k: result[k] for k in TOOL_RESULT_FIELDS if result.get(k) is not None}
+        if isinstance(result.get("results"), dict):
+            summary["results"] = {
+                item_id: {k: item[k] for k in TOOL_RESULT_FIELDS if item.get(k) is not None}
+                for item_id, item in result["results"].items()
+            }
+        text = json.dumps(summary, ensure_ascii=False, separators=(",", ":"))
+        return text if len(text) <= self.max_tool_chars else text[:self.max_tool_chars]
+
+    def compact(self, messages: List[dict]) -> Tuple[List[dict], Dict[str, Any]]:
+        """(messages to send to the LLM, facts record) for this history"""
+        facts = self.extract_facts(messages)
+        window = messages[-self.keep_last:] if self.keep_last else []
+        compacted: List[dict] = []
+        if facts:
+            compacted.append({
+                "role": "system",
+                "content": "FACTS SO FAR (from tool results and seller messages): "
+                           + json.dumps(facts, ensure_ascii=False, separators=(",", ":"))
+            })
+        if messages and len(messages) > len(window) and messages[0].get("name") == "User":
+            compacted.append(messages[0])
+        for m in window:
+            if m.get("name") == "FunctionExecutor":
+                m = dict(m, content=self.summarize_tool_result(m.get("content") or ""))
+            compacted.append(m)
+        return compacted, facts
+
+
+def _load_json(content: str):
+    try:
+        result = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return result if isinstance(result, dict) else None
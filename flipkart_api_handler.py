@@ -1,85 +1,146 @@
-import json
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Callable, List
+from json_logging import get_logger
+from result_cache import MISSING, TTLCache, cached_method
+from seller_api import SimulatedSellerAPI, SimulatedTransport
+
+logger = get_logger(__name__)
+
+# Seconds a status lookup stays fresh; mutating endpoints are never cached
+CACHE_TTLS = {
+    'get_user_status': 60,
+    'get_listing_status': 30,
+    'get_brand_approval_status': 300,
+    'check_brand_approval': 300
+}
+
 
 class FlipkartAPIHandler:
-    def __init__(self, test_responses: Dict[str, str] = None):
-        """Initialize with test responses"""
-        self.test_responses = test_responses or {
-            'account_status': 'ACTIVE',
-            'listing_status': 'ACTIVE',
-            'block_reason': 'SELLER_STATE_CHANGE',
-            'brand_approval': 'PENDING'
-        }
+    def __init__(self, test_responses: Dict[str, str] = None, cache: TTLCache = None, transport=None):
+        """Initialize with test responses, an optional status cache and an optional transport.
+
+        transport defaults to the simulated backend answering from test_responses;
+        pass a seller_api.HTTPTransport to talk to a real seller API instead.
+        """
+        if transport is None:
+            transport = SimulatedTransport(SimulatedSellerAPI(test_responses))
+        self.transport = transport
+        self.cache = cache if cache is not None else TTLCache(CACHE_TTLS)
 
+    @property
+    def test_responses(self) -> Dict[str, str]:
+        backend = getattr(self.transport, "backend", None)
+        return backend.test_responses if backend is not None else {}
+
+    @cached_method()
     def get_user_status(self, user_id: str) -> dict:
         """Get user/account status"""
-        print(f"\n[DEBUG] Checking account status for user: {user_id}")
-        return {
-            "status": self.test_responses['account_status'],
-            "user_id": user_id,
-            "timestamp": datetime.now().isoformat()
-        }
+        logger.debug("Checking account status for user: %s", user_id)
+        return self.transport.call("get_user_status", {"user_id": user_id})
 
+    @cached_method()
     def get_listing_status(self, listing_id: str) -> dict:
         """Get listing status"""
-        print(f"\n[DEBUG] Checking listing status for: {listing_id}")
-        return {
-            "listing_id": listing_id,
-            "status": self.test_responses['listing_status'],
-            "timestamp": datetime.now().isoformat()
-        }
+        logger.debug("Checking listing status for: %s", listing_id)
+        return self.transport.call("get_listing_status", {"listing_id": listing_id})
 
     def can_reactivate_listing(self, block_reason: str) -> dict:
         """Check if listing can be reactivated"""
-        print(f"\n[DEBUG] Checking if can reactivate listing with reason: {block_reason}")
-        can_reactivate = block_reason in ["POLICY_VIOLATION", "TRADEMARK_VIOLATION"]
-        return {
-            "can_reactivate": can_reactivate,
-            "reason_code": block_reason,
-            "message": "Can be reactivated" if can_reactivate else "Cannot be reactivated",
-            "timestamp": datetime.now().isoformat()
-        }
+        logger.debug("Checking if can reactivate listing with reason: %s", block_reason)
+        return self.transport.call("can_reactivate_listing", {"block_reason": block_reason})
 
     def create_support_ticket(self, user_id: str, listing_id: str, reason: str) -> dict:
         """Create a support ticket"""
-        print(f"\n[DEBUG] Creating support ticket for listing: {listing_id}")
-        ticket_id = f"TKT-{user_id[:4]}-{listing_id[:4]}"
-        return {
-            "ticket_id": ticket_id,
-            "status": "CREATED",
-            "user_id": user_id,
-            "listing_id": listing_id,
-            "reason": reason,
-            "timestamp": datetime.now().isoformat()
-        }
+        logger.debug("Creating support ticket for listing: %s", listing_id)
+        result = self.transport.call("create_support_ticket",
+                                     {"user_id": user_id, "listing_id": listing_id, "reason": reason})
+        # The ticket changes what the status endpoints report for these IDs
+        self.cache.invalidate_matching(user_id, listing_id)
+        return result
+
+    def create_support_ticket_batch(self, tickets: List[dict]) -> Dict[str, dict]:
+        """Create many tickets in one request; each carries its own ticket_id, so a resend is a no-op"""
+        logger.debug("Creating %d support tickets", len(tickets))
+        results = self.transport.call("create_support_ticket_batch", {"tickets": tickets})
+        for ticket in tickets:
+            self.cache.invalidate_matching(ticket["user_id"], ticket["listing_id"])
+        return results
 
     def get_block_reason(self, listing_id: str) -> dict:
-        """Simulate block reason API call"""
-        print(f"\n[DEBUG] Getting block reason for: {listing_id}")
-        return {
-            "listing_id": listing_id,
-            "reason": self.test_responses['block_reason'],
-            "details": "Simulated block reason response",
-            "timestamp": datetime.now().isoformat()
-        }
+        """Get why a listing is blocked"""
+        logger.debug("Getting block reason for: %s", listing_id)
+        return self.transport.call("get_block_reason", {"listing_id": listing_id})
 
+    @cached_method()
+    def get_brand_approval_status(self, request_id: str) -> dict:
+        """Get the status of a brand approval request"""
+        logger.debug("Checking brand approval request: %s", request_id)
+        return self.transport.call("get_brand_approval_status", {"request_id": request_id})
+
+    @cached_method()
     def check_brand_approval(self, brand_id: str) -> dict:
-        """Simulate brand approval API call"""
-        print(f"\n[DEBUG] Checking brand approval for: {brand_id}")
-        return {
-            "brand_id": brand_id,
-            "status": self.test_responses['brand_approval'],
-            "timestamp": datetime.now().isoformat()
-        }
+        """Get brand approval status"""
+        logger.debug("Checking brand approval for: %s", brand_id)
+        return self.transport.call("check_brand_approval", {"brand_id": brand_id})
 
     def get_override_status(self, listing_id: str) -> dict:
-        """Simulate override status API call"""
-        print(f"\n[DEBUG] Getting override status for: {listing_id}")
-        block_reason = self.test_responses['block_reason']
-        return {
-            "listing_id": listing_id,
-            "overrides": [block_reason] if block_reason in ["TRADEMARK_VIOLATION", "POLICY_VIOLATION"] else [],
-            "count": 1 if block_reason in ["TRADEMARK_VIOLATION", "POLICY_VIOLATION"] else 0,
-            "timestamp": datetime.now().isoformat()
-        } 
\ No newline at end of file
+        """Get override status"""
+        logger.debug("Getting override status for: %s", listing_id)
+        return self.transport.call("get_override_status", {"listing_id": listing_id})
+
+    # --------------------------
+    # Batch endpoints: one request for many IDs, results keyed by ID
+    # --------------------------
+    def _batch(self, cache_name: str, ids: List[str], fetch_many: Callable[[List[str]], Dict[str, dict]]) -> Dict[str, dict]:
+        """Serve cached IDs and fetch the rest in a single backend request"""
+        results: Dict[str, dict] = {}
+        missing = []
+        for item_id in dict.fromkeys(ids):
+            cached = self.cache.get(cache_name, (item_id,), MISSING)
+            if cached is MISSING:
+                missing.append(item_id)
+            else:
+                results[item_id] = cached
+        if missing:
+            fetched = fetch_many(missing)
+            for item_id, result in fetched.items():
+                if "error" not in result:
+                    self.cache.set(cache_name, (item_id,), result)
+            results.update(fetched)
+        return results
+
+    def get_listing_status_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        """Get listing status for many listings in one request"""
+        logger.debug("Checking listing status for %d listings", len(listing_ids))
+        return self._batch('get_listing_status', listing_ids,
+                           lambda ids: self.transport.call("get_listing_status_batch", {"listing_ids": ids}))
+
+    def get_block_reason_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        """Get block reasons for many listings in one request"""
+        logger.debug("Getting block reasons for %d listings", len(listing_ids))
+        return self.transport.call("get_block_reason_batch", {"listing_ids": list(dict.fromkeys(listing_ids))})
+
+    def get_override_status_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        """Get override status for many listings in one request"""
+        logger.debug("Getting override status for %d listings", len(listing_ids))
+        return self.transport.call("get_override_status_batch", {"listing_ids": list(dict.fromkeys(listing_ids))})
+
+    def check_brand_approval_batch(self, brand_ids: List[str]) -> Dict[str, dict]:
+        """Check brand approval for many brands in one request"""
+        logger.debug("Checking brand approval for %d brands", len(brand_ids))
+        return self._batch('check_brand_approval', brand_ids,
+                           lambda ids: self.transport.call("check_brand_approval_batch", {"brand_ids": ids}))
+
+    def get_listing_diagnostics(self, listing_ids: List[str]) -> Dict[str, dict]:
+        """Status, block reason and override status for many listings in one request.
+
+        Results are keyed by listing ID; a listing the backend could not
+        diagnose carries an "error" instead of failing the whole request.
+        """
+        logger.debug("Getting listing diagnostics for %d listings", len(listing_ids))
+        return self.transport.call("get_listing_diagnostics", {"listing_ids": list(dict.fromkeys(listing_ids))})
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
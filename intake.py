@@ -0,0 +1,75 @@
+import re
+from typing import NamedTuple, Optional
+
+# --------------------------
+# Local intent classifier and ID extractor for seller messages
+# --------------------------
+# Sellers often open with everything SIA needs ("listing FSN123456789012 is
+# blocked, my seller id is 1234"). analyze() reads a User message with
+# precompiled patterns, without the LLM:
+#   intent      "listing" / "brand" when the words point at only one flow
+#   user_id     a labelled seller / user / account ID
+#   listing_id  an FSN (templates.TEMPLATES["LISTING_ID_HELP"]: FSN123456789012)
+#               or a labelled listing / product ID
+#   request_id  a BR-prefixed or labelled brand request ID
+# The SOP engine turns these into facts and jumps to the matching
+# FUNCTION_CALL; the context policy passes them to the LLM as facts.
+
+BRAND_WORDS = re.compile(r"\bbrand\b", re.IGNORECASE)
+LISTING_WORDS = re.compile(r"\b(listing|listings|fsn|product|products)\b", re.IGNORECASE)
+
+_LABEL_TAIL = r"\s*(?:id|no\.?|number|code)?\s*(?:is|:|=|#|-)?\s*#?\s*"
+_LABELLED_ID = r"([A-Za-z]{0,4}-?\d{3,})\b"
+
+# One alternation, scanned once per message; the first group that matches names the ID
+ID_PATTERN = re.compile(
+    r"\b(?P<fsn>FSN[0-9A-Z]{12})\b"
+    r"|\b(?P<brand_request>BR-?\d{2,})\b"
+    r"|\b(?:seller|user|account|merchant)" + _LABEL_TAIL + r"(?P<user>" + _LABELLED_ID[1:]
+    + r"|\b(?:listing|product)" + _LABEL_TAIL + r"(?P<listing>" + _LABELLED_ID[1:]
+    + r"|\b(?:brand\s+)?(?:approval\s+)?request" + _LABEL_TAIL + r"(?P<request>" + _LABELLED_ID[1:],
+    re.IGNORECASE
+)
+
+FIELDS = {"fsn": "listing_id", "listing": "listing_id", "user": "user_id",
+          "brand_request": "request_id", "request": "request_id"}
+
+
+class Intake(NamedTuple):
+    intent: Optional[str] = None
+    user_id: Optional[str] = None
+    listing_id: Optional[str] = None
+    request_id: Optional[str] = None
+
+    def ids(self) -> dict:
+        return {field: getattr(self, field) for field in ("user_id", "listing_id", "request_id")
+                if getattr(self, field)}
+
+
+def classify_intent(text: str) -> Optional[str]:
+    """"listing" or "brand" when the text mentions only one of the flows, else None"""
+    brand = bool(BRAND_WORDS.search(text))
+    listing = bool(LISTING_WORDS.search(text))
+    if brand != listing:
+        return "brand" if brand else "listing"
+    return None
+
+
+def analyze(text: str) -> Intake:
+    """Intent and the IDs a seller message states; the first ID of each kind wins"""
+    if not text:
+        return Intake()
+    found = {}
+    for match in ID_PATTERN.finditer(text):
+        group = match.lastgroup
+        field = FIELDS[group]
+        if field not in found:
+            value = match.group(group)
+            found[field] = value.upper() if group in ("fsn", "brand_request") else value
+    intent = classify_intent(text)
+    if intent is None:
+        if "request_id" in found and "listing_id" not in found:
+            intent = "brand"
+        elif "listing_id" in found and "request_id" not in found:
+            intent = "listing"
+    return Intake(intent, **found)
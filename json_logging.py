@@ -0,0 +1,128 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+# --------------------------
+# Structured, non-blocking logging
+# --------------------------
+# Records are JSON lines tagged with the session ID of the conversation that
+# produced them. Callers only pay for a level check and a queue put; JSON
+# encoding and the write to the stream happen on a background listener thread.
+#
+#   logger = get_logger(__name__)
+#   logger.info("tool call finished", extra={"data": {"function": name}})
+#   if logger.isEnabledFor(logging.DEBUG):
+#       logger.debug("raw result", extra={"data": {"result": result}})
+
+LOGGER_NAMESPACE = "sia"
+session_id_var: ContextVar[str] = ContextVar("session_id", default="-")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_stream = None  # where the listener writes, kept so a forked child can start its own
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAMESPACE}.{name}")
+
+
+def bind_session(session_id: str):
+    """Tag every record from the current task/thread with session_id"""
+    return session_id_var.set(session_id)
+
+
+class SessionFilter(logging.Filter):
+    """Stamps the session ID while still on the caller's thread/task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = session_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "session_id": getattr(record, "session_id", "-"),
+            "msg": record.getMessage(),
+        }
+        data = getattr(record, "data", None)
+        if data:
+            entry.update(data)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record as-is (args merged lazily by the listener) but render
+        # tracebacks now, while exc_info is still valid on this thread.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: Optional[str] = None, stream=None):
+    """Install the queue handler on the "sia" logger; safe to call repeatedly.
+
+    level defaults to $SIA_LOG_LEVEL or INFO.
+    """
+    global _listener, _queue_handler, _stream
+    logger = logging.getLogger(LOGGER_NAMESPACE)
+    logger.setLevel((level or os.environ.get("SIA_LOG_LEVEL", "INFO")).upper())
+    if _listener is not None:
+        return
+
+    _stream = stream
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(records)
+    _queue_handler.addFilter(SessionFilter())
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logger = logging.getLogger(LOGGER_NAMESPACE)
+        logger.removeHandler(_queue_handler)
+        logger.propagate = True
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+
+def _restart_after_fork():
+    """A forked child inherits the listener but not its thread; start one of its own"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logger = logging.getLogger(LOGGER_NAMESPACE)
+    logger.removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+    configure_logging(logging.getLevelName(logger.level), _stream)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -1,15 +1,36 @@
 import os
-import re
 import json
-import autogen
-from autogen import AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager
+import time
+import uuid
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional, Union
+from async_llm import AsyncLLMClient
+from backend_guard import CLOSED, BackendGuard, GuardedTransport
+from completion_cache import CompletionCache
+from flipkart_api_handler import FlipkartAPIHandler
+from json_logging import bind_session, configure_logging, get_logger
+from metrics import TOOL_CALLS, TOOL_SECONDS, observe_session
+from model_router import FREE_TEXT, REISSUE, TOOL_RESULT, ModelRouter, ModelTier
+from prefetch import PrefetchPool, Prefetcher, take_prefetched
+from result_cache import TTLCache, params_key
+from retry_policy import RetryPolicy, needs_retry
+from seller_api import SellerAPIError, transport_from_env
+from sia_prompts import PromptLibrary
+from template_renderer import DEFAULT_LOCALE, TemplateRenderer
+from ticket_store import TicketBacklogFull, TicketStore
+from tool_registry import ToolCallError, ToolRegistry
+
+if TYPE_CHECKING:
+    # autogen is imported on first build_agents() call, not at import time
+    from autogen import UserProxyAgent
+    from agents import ChatAgents
+
+logger = get_logger(__name__)
 
 # --------------------------
-# Global Configuration & Retry Helpers
+# Global Configuration & Retry Policy
 # --------------------------
-MAX_RETRIES = 3
-retry_counts = {}
-
 config_list = [{
     "model": "gpt-4o-mini",
     "api_type": "azure",
@@ -18,468 +39,650 @@ config_list = [{
     "api_version": "2024-02-15-preview"
 }]
 
-def get_retry_count(key: str) -> int:
-    return retry_counts.get(key, 0)
+# Largest ID list a single batched FUNCTION_CALL may carry
+MAX_BATCH_SIZE = 100
+
+# Every function SIA may call is registered here once; dispatch, argument
+# validation and the prompt's function formats all come from this registry
+tools = ToolRegistry(max_list_length=MAX_BATCH_SIZE)
+
+# FunctionExecutor retries "auto_retry" responses itself; SIA only sees the outcome
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=0.5, multiplier=2.0, max_delay=4.0, jitter=0.5)
 
-def increment_retry(key: str) -> int:
-    retry_counts[key] = get_retry_count(key) + 1
-    print(f"DEBUG: Incrementing retry for {key}: {retry_counts[key]}")
-    return retry_counts[key]
+# Read-only lookups shared by all sessions; TTLs in seconds. Anything not listed
+# (create_support_ticket, can_reactivate_listing) always hits the backend.
+result_cache = TTLCache({
+    "get_user_status": 60,
+    "get_listing_status": 30,
+    "get_brand_approval_status": 300,
+    # Per-listing entries of get_listing_diagnostics (not a tool's own result)
+    "listing_diagnostics": 30
+}, maxsize=4096)
 
-def reset_retries(key: str):
-    if key in retry_counts:
-        print(f"DEBUG: Resetting retries for {key}")
-        del retry_counts[key]
+# Simulated backend unless $SELLER_API_URL points at a real seller API. The
+# status tools cache their results in result_cache, so the handler keeps no
+# cache of its own (two caches would be invalidated at different times).
+api_handler = FlipkartAPIHandler(cache=TTLCache({}), transport=GuardedTransport(transport_from_env()))
 
 # --------------------------
 # Function Implementations for API Calls
 # --------------------------
-def get_user_status(user_id: str = "default") -> dict:
-    print(f"\n🔴 [get_user_status] Received user_id: '{user_id}'")
-    # Retry logic if user_id starts with "5"
-    if user_id.startswith("5"):
-        retry_key = f"user_{user_id}"
-        current_retry = increment_retry(retry_key)
-        print(f"🔄 [get_user_status] Retry count for {user_id}: {current_retry} (Max: {MAX_RETRIES})")
-        if current_retry < MAX_RETRIES:
-            return {
-                "status": "retrying",
-                "message": f"Automatically retrying API call (attempt {current_retry}/{MAX_RETRIES})",
-                "retry_needed": True,
-                "auto_retry": True,
-                "user_id": user_id
-            }
-        else:
-            reset_retries(retry_key)
-            return {
-                "status": "on_hold",
-                "reason_code": "MAX_RETRIES_EXCEEDED",
-                "message": "Account verification failed after multiple attempts",
-                "user_id": user_id
-            }
-
-    # Normal user status logic
-    if user_id.startswith("1"):
-        result = {
-            "status": "active",
-            "message": "Your account is active.",
-            "user_id": user_id
-        }
-    elif user_id.startswith("2"):
-        result = {
-            "status": "onboarding",
-            "message": (
-                "Your products aren’t visible yet. Once onboarding is complete, "
-                "your account will be activated within 48 hours, and your listings "
-                "will go live."
-            ),
-            "user_id": user_id
-        }
-    else:
-        result = {
-            "status": "on_hold",
-            "message": "Your account is on hold. Please contact support if you have questions.",
-            "user_id": user_id
-        }
-    print(f"🔵 [get_user_status] Returning: {result}")
+def service_unavailable_result(message: str, **ids: str) -> dict:
+    """A lookup whose backend call failed; FunctionExecutor retries it"""
+    return {
+        "status": "retrying",
+        "message": message,
+        "retry_needed": True,
+        "auto_retry": True,
+        **ids
+    }
+
+
+@tools.register(module="listing")
+def get_user_status(user_id: str) -> dict:
+    logger.debug("get_user_status received user_id=%s", user_id)
+    try:
+        result = api_handler.get_user_status(user_id)
+    except SellerAPIError as e:
+        logger.debug("get_user_status returning auto-retry for user_id=%s: %s", user_id, e)
+        return service_unavailable_result("Account service temporarily unavailable", user_id=user_id)
+    logger.debug("get_user_status returning status=%s", result["status"])
     return result
 
 
-def get_listing_status(listing_id: str = "default") -> dict:
-    print(f"\n🔴 [get_listing_status] Received listing_id: '{listing_id}'")
-    # Retry logic if listing_id starts with "5"
-    if listing_id.startswith("5"):
-        retry_key = f"listing_{listing_id}"
-        current_retry = increment_retry(retry_key)
-        print(f"🔄 [get_listing_status] Retry count for {listing_id}: {current_retry} (Max: {MAX_RETRIES})")
-        if current_retry < MAX_RETRIES:
-            result = {
-                "status": "retrying",
-                "message": f"Automatically retrying API call (attempt {current_retry}/{MAX_RETRIES})",
-                "retry_needed": True,
-                "auto_retry": True,
-                "listing_id": listing_id
-            }
-            print(f"DEBUG: [get_listing_status] Returning (auto-retry): {result}")
-            return result
-        else:
-            reset_retries(retry_key)
-            result = {
-                "status": "error",
-                "message": "Maximum retries reached for listing. Terminating conversation. Please try again later. TERMINATE",
-                "retry_needed": False,
-                "listing_id": listing_id
-            }
-            print(f"DEBUG: [get_listing_status] Returning (max retries reached): {result}")
-            return result
-
-    # Normal listing status logic
-    last_char = listing_id[-1] if listing_id else "0"
-    if last_char == "2":
-        result = {
-            "status": "blocked",
-            "message": "Your listing is blocked due to seller state change.",
-            "block_reason": "seller_state_change",
-            "listing_id": listing_id
-        }
-    elif last_char == "1":
-        result = {
-            "status": "inactive",
-            "message": "Your listing is currently inactive. Please activate it to be visible.",
-            "listing_id": listing_id
-        }
-    elif last_char == "3":
-        result = {
-            "status": "archived",
-            "message": "Your listing is archived and not visible to customers.",
-            "listing_id": listing_id
-        }
-    elif last_char == "4":
-        result = {
-            "status": "rfa",
-            "message": "Your listing is pending approval (RFA).",
-            "listing_id": listing_id
-        }
-    else:
-        result = {
-            "status": "active",
-            "message": "Your listing is active and visible to customers.",
-            "listing_id": listing_id
-        }
-    print(f"DEBUG: [get_listing_status] Returning: {result}")
+@tools.register(module="listing")
+def get_listing_status(listing_id: str) -> dict:
+    logger.debug("get_listing_status received listing_id=%s", listing_id)
+    try:
+        result = api_handler.get_listing_status(listing_id)
+    except SellerAPIError as e:
+        logger.debug("get_listing_status returning auto-retry for listing_id=%s: %s", listing_id, e)
+        return service_unavailable_result("Listing service temporarily unavailable", listing_id=listing_id)
+    logger.debug("get_listing_status returning status=%s", result["status"])
     return result
 
 
+@tools.register(in_prompt=False)
 def can_reactivate_listing(block_reason: str) -> dict:
-    print(f"\n🔴 [can_reactivate_listing] Received block_reason: '{block_reason}'")
+    logger.debug("can_reactivate_listing received block_reason=%s", block_reason)
     result = {"can_reactivate": True, "message": "Listing can be reactivated."}
-    print(f"🔵 [can_reactivate_listing] Returning: {result}")
     return result
 
 
-def create_support_ticket(user_id: str, listing_id: str, reason: str) -> dict:
-    print(f"\n🔴 [create_support_ticket] Received user_id: '{user_id}', listing_id: '{listing_id}', reason: '{reason}'")
+@tools.register()
+def create_support_ticket(user_id: str, listing_id: str, reason: str, request_id: Optional[str] = None) -> dict:
+    logger.debug("create_support_ticket received user_id=%s listing_id=%s request_id=%s reason=%s",
+                 user_id, listing_id, request_id, reason)
+    try:
+        ticket, created = ticket_store.create(user_id, listing_id, reason, request_id)
+    except TicketBacklogFull as e:
+        logger.warning("create_support_ticket returning auto-retry: %s", e)
+        return service_unavailable_result("Ticket service temporarily unavailable",
+                                          user_id=user_id, listing_id=listing_id)
+    subject = f"brand request {request_id}" if request_id else f"listing {listing_id}"
     result = {
-        "ticket_id": "TICKET12345",
+        "ticket_id": ticket["ticket_id"],
         "status": "created",
-        "message": f"Support ticket created for user {user_id} regarding listing {listing_id}: {reason}"
+        "message": f"Support ticket created for user {user_id} regarding {subject}: {reason}",
+        "duplicate": not created
     }
-    print(f"🔵 [create_support_ticket] Returning: {result}")
+    logger.info("support ticket created" if created else "support ticket already filed",
+                extra={"data": {"ticket_id": result["ticket_id"], "listing_id": listing_id}})
     return result
 
 
 # --------------------------
 # 1) New function for brand approval
 # --------------------------
-def get_brand_approval_status(request_id: str = "default") -> dict:
+@tools.register(module="brand")
+def get_brand_approval_status(request_id: str) -> dict:
     """
-    Simulate brand approval status.
+    Brand approval status from the seller API.
     Returns 'approved', 'in_progress', or 'disapproved'
     plus timeline if needed.
     """
-    print(f"\n🔴 [get_brand_approval_status] Received request_id: '{request_id}'")
+    logger.debug("get_brand_approval_status received request_id=%s", request_id)
+    try:
+        result = api_handler.get_brand_approval_status(request_id)
+    except SellerAPIError as e:
+        logger.debug("get_brand_approval_status returning auto-retry for request_id=%s: %s", request_id, e)
+        return service_unavailable_result("Brand approval service temporarily unavailable", request_id=request_id)
+    logger.debug("get_brand_approval_status returning status=%s", result["status"])
+    return result
 
-    last_char = request_id[-1] if request_id else "0"
-    if last_char == "1":
-        result = {
-            "status": "approved",
-            "message": "Your brand approval request is approved."
+
+# --------------------------
+# 2) Batched lookups: one FUNCTION_CALL for a whole catalogue
+# --------------------------
+# Batched function -> the single-ID function whose retry-exhausted result it shares
+BATCH_ITEM_FUNCTIONS = {
+    "get_listing_status_batch": "get_listing_status",
+    "get_listing_diagnostics": "get_listing_status",
+    "get_brand_approval_status_batch": "get_brand_approval_status"
+}
+
+
+# Tickets are deduplicated by (user_id, listing_id, request_id, reason) and written to the
+# backend in batches, off the chat turn
+ticket_store = TicketStore(api_handler.create_support_ticket_batch)
+
+# Each tool has a circuit breaker over its recent outcomes; concurrent
+# identical cacheable lookups share one backend call
+backend_guard = BackendGuard()
+
+
+def _batch_lookup(cache_name: str, id_field: str, ids: list, fetch_many) -> dict:
+    """Resolve many IDs; cached IDs skip the backend, fetch_many(ids) gets the rest at once.
+
+    If any ID is still retrying the whole batch reports auto_retry, and the
+    executor's next attempt only re-fetches those IDs.
+    """
+    cached = {}
+    for item_id in dict.fromkeys(ids):
+        result = result_cache.get(cache_name, params_key({id_field: item_id}))
+        if result is not None:
+            cached[item_id] = result
+    missing = [item_id for item_id in dict.fromkeys(ids) if item_id not in cached]
+    fetched = fetch_many(missing) if missing else {}
+    results = {}
+    pending = []
+    for item_id in dict.fromkeys(ids):
+        result = cached[item_id] if item_id in cached else fetched[item_id]
+        if needs_retry(result):
+            pending.append(item_id)
+        elif item_id in fetched:
+            result_cache.set(cache_name, params_key({id_field: item_id}), result)
+        results[item_id] = result
+
+    batch = {"status": "retrying" if pending else "ok", "count": len(results), "results": results}
+    if pending:
+        batch.update(retry_needed=True, auto_retry=True, pending_ids=pending)
+    return batch
+
+
+def _each(lookup):
+    """fetch_many for a backend that only answers one ID at a time"""
+    return lambda ids: {item_id: lookup(item_id) for item_id in ids}
+
+
+@tools.register(module="listing")
+def get_listing_status_batch(listing_ids: list) -> dict:
+    logger.debug("get_listing_status_batch received %d listing_ids", len(listing_ids))
+    return _batch_lookup("get_listing_status", "listing_id", listing_ids, _each(get_listing_status))
+
+
+@tools.register(module="brand")
+def get_brand_approval_status_batch(request_ids: list) -> dict:
+    logger.debug("get_brand_approval_status_batch received %d request_ids", len(request_ids))
+    return _batch_lookup("get_brand_approval_status", "request_id", request_ids, _each(get_brand_approval_status))
+
+
+def _fetch_diagnostics(listing_ids: list) -> dict:
+    """One diagnostics request; listings it could not diagnose come back as retrying"""
+    try:
+        diagnostics = api_handler.get_listing_diagnostics(listing_ids)
+    except SellerAPIError as e:
+        logger.debug("get_listing_diagnostics returning auto-retry for %d listings: %s", len(listing_ids), e)
+        diagnostics = {}
+    results = {}
+    for listing_id in listing_ids:
+        item = diagnostics.get(listing_id)
+        if item is None or "error" in item:
+            item = service_unavailable_result("Listing service temporarily unavailable", listing_id=listing_id)
+        results[listing_id] = item
+    return results
+
+
+@tools.register(module="listing", hint="when the user gives several listing IDs, resolve them all with ONE call: "
+                     "status, block reason and overrides per listing")
+def get_listing_diagnostics(listing_ids: list) -> dict:
+    """Status, block reason and override status for every listing in one call"""
+    logger.debug("get_listing_diagnostics received %d listing_ids", len(listing_ids))
+    return _batch_lookup("listing_diagnostics", "listing_id", listing_ids, _fetch_diagnostics)
+
+
+def retry_exhausted_result(func_name: str, last_result: dict) -> dict:
+    """Final outcome once the retry policy gives up on an auto-retry response"""
+    if func_name in BATCH_ITEM_FUNCTIONS:
+        item_func_name = BATCH_ITEM_FUNCTIONS[func_name]
+        results = {
+            item_id: retry_exhausted_result(item_func_name, r) if needs_retry(r) else r
+            for item_id, r in last_result.get("results", {}).items()
         }
-    elif last_char == "2":
-        result = {
-            "status": "in_progress",
-            "message": "Brand approval is still in progress.",
-            "timeline_hours": 48
+        return {
+            "status": "partial",
+            "count": len(results),
+            "results": results,
+            "failed_ids": last_result.get("pending_ids", [])
         }
-    else:
-        result = {
-            "status": "disapproved",
-            "message": "Brand approval disapproved. Additional steps required.",
-            "timeline_hours": 80
+    if func_name == "get_user_status":
+        return {
+            "status": "on_hold",
+            "reason_code": "MAX_RETRIES_EXCEEDED",
+            "message": "Account verification failed after multiple attempts",
+            "user_id": last_result.get("user_id")
+        }
+    if func_name == "get_listing_status":
+        return {
+            "status": "error",
+            "message": "Maximum retries reached for listing. Terminating conversation. Please try again later. TERMINATE",
+            "retry_needed": False,
+            "listing_id": last_result.get("listing_id")
         }
-    print(f"🔵 [get_brand_approval_status] Returning: {result}")
+    return {
+        "status": "error",
+        "reason_code": "MAX_RETRIES_EXCEEDED",
+        "message": "Maximum retries reached. Please try again later.",
+        "retry_needed": False
+    }
+
+
+def circuit_open_result(func_name: str, params: dict) -> dict:
+    """Fail-fast outcome while func_name's backend breaker is open; renders ERROR_API_FAILURE"""
+    result = {
+        "status": "error",
+        "reason_code": "BACKEND_UNAVAILABLE",
+        "message": "The service is temporarily unavailable. Please try again later.",
+        "retry_needed": False
+    }
+    for id_field in ("user_id", "listing_id", "request_id"):
+        if id_field in params:
+            result[id_field] = params[id_field]
     return result
 
 
+def backend_stats() -> dict:
+    """Coalescing and breaker metrics for tool calls and the seller API transport"""
+    transport = api_handler.transport
+    return {
+        "tools": backend_guard.stats(),
+        "seller_api": transport.stats() if hasattr(transport, "stats") else {},
+        "tickets": ticket_store.stats(),
+    }
+
+
 # --------------------------
-# Function Call Execution via FunctionExecutor
+# Speculative lookups (see prefetch.py)
 # --------------------------
-class FunctionExecutorAgent(UserProxyAgent):
-    def generate_reply(self, messages=None, sender=None, **kwargs):
-        if messages is None:
-            messages = self._oai_messages[sender]
-        print(f"DEBUG [FunctionExecutor] Received messages from {sender.name}:")
-        for m in messages:
-            print("   ", m.get("content", ""))
-
-        # We only check SIA's last message for function calls
-        sia_msgs = [m for m in messages if m.get("name") == "SIA"]
-        if not sia_msgs:
-            return None
+# Read-only calls a session may start before SIA asks for them. A speculative
+# call is a single attempt: it is skipped while the tool's breaker is not
+# closed, and a retrying or failed answer is dropped so the real call goes
+# through the normal retry policy. At most max_in_flight speculative calls run
+# against any one backend across all sessions.
+prefetch_pool = PrefetchPool(max_in_flight=8)
 
-        last_msg = sia_msgs[-1].get("content", "")
-        print(f"DEBUG [FunctionExecutor] Checking SIA message: {last_msg}")
 
-        # Strict regex to detect function call
-        if re.search(r'^\s*FUNCTION_CALL:\w+\s*\{.*\}\s*$', last_msg, re.DOTALL):
-            print("🔧 [FunctionExecutor] Detected valid function call format")
-            return {"content": execute_function_call(last_msg)}
-        else:
-            print("⚠️ [FunctionExecutor] No valid function call detected")
+def _speculative_tool(func_name: str):
+    def lookup(params: dict) -> Optional[dict]:
+        if backend_guard.breaker(func_name).state != CLOSED:
+            return None
+        key = params_key(params)
+        result = backend_guard.flight.do((func_name, key), lambda: tools.dispatch(func_name, params))
+        if needs_retry(result) or result.get("status") in ("error", "critical_error"):
             return None
+        result_cache.set(func_name, key, result)
+        return result
+    return lookup
+
+
+SPECULATIVE_LOOKUPS = {
+    "get_user_status": _speculative_tool("get_user_status"),
+    "get_listing_status": _speculative_tool("get_listing_status"),
+    "get_brand_approval_status": _speculative_tool("get_brand_approval_status"),
+}
+
+
+def new_prefetcher() -> Prefetcher:
+    """A session's prefetcher; lookups already in result_cache are not speculated on"""
+    return Prefetcher(SPECULATIVE_LOOKUPS, prefetch_pool,
+                      known=lambda name, params: result_cache.contains(name, params_key(params)))
 
 
-def execute_function_call(message: str) -> str:
-    print(f"\n🔍 [execute_function_call] RAW INPUT:\n{message}\n{'='*50}")
+def _parse_function_call(message: str):
+    """Return (func_name, kwargs, None) or (None, None, error_json)"""
     try:
-        pattern = r'^\s*FUNCTION_CALL:(\w+)\s*(\{.*\})\s*$'
-        match = re.search(pattern, message, re.DOTALL)
-        if not match:
-            error_msg = "❌ [execute_function_call] INVALID FORMAT - Missing FUNCTION_CALL: prefix or malformed parameters"
-            print(error_msg)
-            return json.dumps({"status": "error", "message": error_msg})
+        spec, kwargs = tools.parse(message)
+    except ToolCallError as e:
+        error_msg = f"❌ [execute_function_call] {str(e)}"
+        logger.warning("rejected function call: %s", e)
+        return None, None, json.dumps({"status": "error", "message": error_msg})
+    logger.debug("parsed function call %s", spec.name, extra={"data": {"params": kwargs}})
+    return spec.name, kwargs, None
 
-        func_name, params_str = match.groups()
-        print(f"✅ [execute_function_call] PARSED - Function: {func_name}, Params: {params_str}")
 
-        try:
-            params = json.loads(params_str)
-            print(f"🔧 [execute_function_call] VALIDATED PARAMS: {json.dumps(params, indent=2)}")
-        except json.JSONDecodeError as e:
-            error_msg = f"❌ [execute_function_call] INVALID JSON: {str(e)}"
-            print(error_msg)
-            return json.dumps({"status": "error", "message": error_msg})
-
-        # Dispatch the correct function
-        if func_name == "get_user_status":
-            result = get_user_status(params.get("user_id", "default"))
-        elif func_name == "get_listing_status":
-            result = get_listing_status(params.get("listing_id", "default"))
-        elif func_name == "can_reactivate_listing":
-            result = can_reactivate_listing(params.get("block_reason", ""))
-        elif func_name == "create_support_ticket":
-            result = create_support_ticket(
-                params.get("user_id", ""),
-                params.get("listing_id", ""),
-                params.get("reason", "")
-            )
-        elif func_name == "get_brand_approval_status":
-            result = get_brand_approval_status(params.get("request_id", ""))
-        else:
-            error_msg = f"❌ [execute_function_call] UNKNOWN FUNCTION: {func_name}"
-            print(error_msg)
-            return json.dumps({"status": "error", "message": error_msg})
-
-        print(f"✅ [execute_function_call] SUCCESS - Result:\n{json.dumps(result, indent=2)}")
-        return json.dumps(result, ensure_ascii=False)
+def _call_with_retries(func_name: str, params: dict, retry_policy: RetryPolicy):
+    """Generator yielding each backoff delay; its return value is the final result.
 
+    Shared by the sync and async executors so both follow the same policy.
+    Prefetched and cached lookups return without dispatching.
+    """
+    prefetched = take_prefetched(func_name, params)
+    if prefetched is not None:
+        logger.debug("prefetch hit for %s", func_name)
+        return dict(prefetched, attempts=0, retry_wait_seconds=0.0, prefetched=True)
+    key = params_key(params)
+    cached = result_cache.get(func_name, key)
+    if cached is not None:
+        logger.debug("cache hit for %s", func_name)
+        return dict(cached, attempts=0, retry_wait_seconds=0.0, cached=True)
+
+    # One breaker outcome per lookup: success, or given up after every retry
+    breaker = backend_guard.breaker(func_name)
+    if not breaker.allow():
+        logger.warning("%s circuit open, failing fast", func_name)
+        return dict(circuit_open_result(func_name, params), attempts=0, retry_wait_seconds=0.0, circuit_open=True)
+
+    policy = retry_policy.for_function(func_name)
+    total_wait = 0.0
+    exhausted = False
+    attempt = 0
+    ok = False
+    try:
+        while True:
+            attempt += 1
+            if result_cache.cacheable(func_name):
+                result = backend_guard.flight.do((func_name, key), lambda: tools.dispatch(func_name, params))
+            else:
+                result = tools.dispatch(func_name, params)
+            if not needs_retry(result):
+                break
+            if attempt >= policy.max_attempts:
+                logger.warning("%s still retrying after %d attempts, giving up", func_name, attempt)
+                result = retry_exhausted_result(func_name, result)
+                exhausted = True
+                break
+            delay = policy.backoff(attempt)
+            logger.info("%s attempt %d/%d needs retry, backing off %.2fs",
+                        func_name, attempt, policy.max_attempts, delay)
+            total_wait += delay
+            yield delay
+        ok = not exhausted
+    finally:
+        breaker.record(ok)
+
+    if func_name == "create_support_ticket":
+        result_cache.invalidate_matching(params.get("user_id"), params.get("listing_id"))
+    elif not exhausted and result.get("status") != "retrying":
+        result_cache.set(func_name, key, result)
+    return dict(result, attempts=attempt, retry_wait_seconds=round(total_wait, 3))
+
+
+def _next_attempt(attempts) -> tuple:
+    """(False, backoff delay) or (True, final result) from a _call_with_retries generator"""
+    try:
+        return False, next(attempts)
+    except StopIteration as done:
+        return True, done.value
+
+
+def _call_outcome(result: dict) -> str:
+    if result.get("prefetched"):
+        return "prefetched"
+    if result.get("cached"):
+        return "cached"
+    if result.get("circuit_open"):
+        return "circuit_open"
+    if result.get("status") == "partial":
+        return "partial"
+    if result.get("status") in ("error", "critical_error"):
+        return "error"
+    return "ok"
+
+
+def _finish_call(func_name: str, result: dict, start: float) -> str:
+    TOOL_SECONDS.labels(func_name).observe(time.perf_counter() - start)
+    TOOL_CALLS.labels(func_name, _call_outcome(result)).inc()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("function call %s succeeded", func_name, extra={"data": {"result": result}})
+    return json.dumps(result, ensure_ascii=False)
+
+
+def _critical_error(e: Exception, func_name: Optional[str]) -> str:
+    TOOL_CALLS.labels(func_name or "-", "error").inc()
+    error_msg = f"‼️ [execute_function_call] CRITICAL ERROR: {str(e)}"
+    logger.exception("function call crashed")
+    return json.dumps({
+        "status": "critical_error",
+        "message": "System failure - contact support",
+        "technical_details": error_msg
+    })
+
+
+def execute_function_call(message: str, retry_policy: Optional[RetryPolicy] = None) -> str:
+    logger.debug("execute_function_call raw input: %s", message)
+    start = time.perf_counter()
+    func_name = None
+    try:
+        func_name, params, error = _parse_function_call(message)
+        if error:
+            TOOL_CALLS.labels("-", "invalid").inc()
+            return error
+        attempts = _call_with_retries(func_name, params, retry_policy or DEFAULT_RETRY_POLICY)
+        try:
+            while True:
+                time.sleep(next(attempts))
+        except StopIteration as done:
+            result = done.value
+        return _finish_call(func_name, result, start)
     except Exception as e:
-        error_msg = f"‼️ [execute_function_call] CRITICAL ERROR: {str(e)}"
-        print(error_msg)
-        return json.dumps({
-            "status": "critical_error",
-            "message": "System failure - contact support",
-            "technical_details": error_msg
-        })
+        return _critical_error(e, func_name)
 
 
-# --------------------------
-# Instantiate FunctionExecutor Agent
-# --------------------------
-function_executor = FunctionExecutorAgent(
-    name="FunctionExecutor",
-    human_input_mode="NEVER",
-    system_message="EXCLUSIVELY executes valid function calls in FUNCTION_CALL: format",
-    code_execution_config={
-        "last_n_messages": 2,
-        "work_dir": "groupchat",
-        "use_docker": False
-    }
-)
-function_executor.register_function({"execute_function_call": execute_function_call})
-function_executor.register_function({
-    "get_user_status": get_user_status,
-    "get_listing_status": get_listing_status,
-    "can_reactivate_listing": can_reactivate_listing,
-    "create_support_ticket": create_support_ticket,
-    "get_brand_approval_status": get_brand_approval_status  # <--- new brand function
-})
+async def a_execute_function_call(message: str, retry_policy: Optional[RetryPolicy] = None) -> str:
+    """Async execute_function_call: backend calls run in a worker thread, backoff waits are awaited"""
+    logger.debug("execute_function_call raw input: %s", message)
+    start = time.perf_counter()
+    func_name = None
+    try:
+        func_name, params, error = _parse_function_call(message)
+        if error:
+            TOOL_CALLS.labels("-", "invalid").inc()
+            return error
+        attempts = _call_with_retries(func_name, params, retry_policy or DEFAULT_RETRY_POLICY)
+        while True:
+            # Each attempt calls the seller API, so it runs off the event loop
+            finished, value = await asyncio.to_thread(_next_attempt, attempts)
+            if finished:
+                return _finish_call(func_name, value, start)
+            await asyncio.sleep(value)
+    except Exception as e:
+        return _critical_error(e, func_name)
 
-# --------------------------
-# Define Other Agents
-# --------------------------
-user_agent = UserProxyAgent(
-    name="User",
-    human_input_mode="ALWAYS",
-    system_message="You are a human user interacting with the support system.",
-    code_execution_config=False
-)
-
-coordinator = AssistantAgent(
-    name="Coordinator",
-    system_message="""ORCHESTRATION RULES:
-1. If SIA requests user ID → Select User as next speaker.
-2. If FunctionExecutor returns results → Select SIA as next speaker.
-3. If error occurs → Terminate the conversation.
-4. Else → Continue normal rotation.
-""",
-    llm_config={"config_list": config_list}
-)
 
 # --------------------------
-# 2) Unified SIA System Message
-#    Handling both listing logic and brand approval logic
+# LLM access for SIA
 # --------------------------
-sia = AssistantAgent(
-    name="SIA",
-    system_message="""
-You are a support assistant that can handle both listing-related queries and brand approval queries.
-TEMPLATING AND STATUS COMMUNICATION:
-
-1. If the user wants listing help:
-   - Ask for user ID using: FUNCTION_CALL:get_user_status{"user_id": "$0"}
-   - After user status response:
-       • IF status is "retrying" and auto_retry is true:
-         OUTPUT: FUNCTION_CALL:get_user_status{"user_id": "$user_id"}
-       • IF status is "active":
-         OUTPUT: "[message from response] Please provide listing ID."
-       • IF status is "onboarding":
-         OUTPUT: "[message from response] TERMINATING chat now. TERMINATE"
-       • IF status is "on_hold":
-         OUTPUT: "[message from response] Please provide listing ID."
-       • ELSE:
-         OUTPUT: "[message from response] Please provide listing ID."
-   - For listing ID input, use: FUNCTION_CALL:get_listing_status{"listing_id": "$0"}
-   - After listing status response:
-       • IF status is "retrying" and auto_retry is true:
-         OUTPUT: FUNCTION_CALL:get_listing_status{"listing_id": "$listing_id"}
-       • IF status is "active" or "inactive":
-         OUTPUT: "[message from response] Inform the user that their listing is active/inactive. TERMINATE"
-       • IF status is "blocked":
-         OUTPUT: "FUNCTION_CALL:create_support_ticket{\"user_id\": \"$user_id\", \"listing_id\": \"$listing_id\", \"reason\": \"Reactivation requested\"}"
-       • IF status is "archived":
-         OUTPUT: "[message from response] This listing is archived and cannot be reactivated. TERMINATE"
-       • IF status is "rfa":
-         OUTPUT: "[message from response] Your listing is pending approval. TERMINATE"
-       • IF status is "error" (with retry_needed false):
-         OUTPUT: "[message from response] Terminating conversation. Please try again later. TERMINATE"
-
-2. If the user wants brand approval:
-   - Ask for the brand request ID using: FUNCTION_CALL:get_brand_approval_status{"request_id": "$0"}
-   - After brand approval status response:
-       • IF status is "approved":
-         OUTPUT: "[message from response] Your brand approval request is approved. TERMINATE"
-       • IF status is "in_progress" or "disapproved":
-           - IF timeline_hours <= 72:
-             OUTPUT: "[message from response] Please wait while your brand request is processed. TERMINATE"
-           - ELSE:
-             OUTPUT: "FUNCTION_CALL:create_support_ticket{\"user_id\": \"$user_id\", \"listing_id\": \"N/A\", \"reason\": \"Brand approval follow-up\"}"
-   - After support ticket response for brand approval:
-       • IF status is "created":
-         OUTPUT: "[message from response] Support ticket $ticket_id created for brand approval. TERMINATE"
-
-3. Use EXACT function call formats:
-   - FUNCTION_CALL:get_user_status{"user_id": "[ID]"}
-   - FUNCTION_CALL:get_listing_status{"listing_id": "[ID]"}
-   - FUNCTION_CALL:create_support_ticket{"user_id": "[USER_ID]", "listing_id": "[LISTING_ID]", "reason": "[REASON]"}
-   - FUNCTION_CALL:get_brand_approval_status{"request_id": "[REQUEST_ID]"}
-
-4. Always end the conversation with 'TERMINATE' if no further steps are needed.
-
-5. Retry logic remains the same for IDs that start with '5' (the system will handle auto-retry).
+# SIA's LLM turns are routed by class: relaying a tool result or re-issuing a
+# rejected call goes to the small model, interpreting free seller text to the
+# large one. A reply that fails validate_reply() (e.g. a FUNCTION_CALL the
+# registry rejects) is retried on the next tier, and each tier falls back to
+# the other deployment when its own times out.
+MODEL_TIERS = [
+    ModelTier("mini", [config_list[0], dict(config_list[0], model="gpt-4o")],
+              prompt_cost=0.00015, completion_cost=0.0006, timeout=20),
+    ModelTier("full", [dict(config_list[0], model="gpt-4o"), config_list[0]],
+              prompt_cost=0.0025, completion_cost=0.01, timeout=30),
+]
+MODEL_ROUTES = {TOOL_RESULT: "mini", REISSUE: "mini", FREE_TEXT: "full"}
+
+
+def validate_reply(reply: str) -> Optional[str]:
+    """Why an LLM reply cannot be used as SIA's turn, or None"""
+    if not reply.strip():
+        return "empty"
+    if "FUNCTION_CALL" in reply:
+        try:
+            tools.parse(reply)
+        except ToolCallError:
+            return "malformed_function_call"
+    return None
 
-""",
-    llm_config={"config_list": config_list}
-)
 
+model_router = ModelRouter(MODEL_TIERS, MODEL_ROUTES, validate=validate_reply)
+
+# SIA completions shared across sessions and restarts; IDs are normalized out
+# of the key. Pass completion_cache=None to build_agents to opt a session out.
+completion_cache = CompletionCache()
 
 
 # --------------------------
-# Custom Speaker Selection
+# 2) SIA System Message
+#    Base rules plus the listing and/or brand module, chosen per intent
 # --------------------------
-class CustomGroupChat(GroupChat):
-    def select_speaker(self, last_speaker, selector):
-        return speaker_selection_func(last_speaker, self)
+sia_prompts = PromptLibrary(tools)
+SIA_SYSTEM_MESSAGE = sia_prompts.system_message()
 
-def speaker_selection_func(last_speaker, groupchat):
-    messages = groupchat.messages
-    if not messages:
-        return next(agent for agent in groupchat.agents if agent.name == "SIA")
+# Terminal tool results are answered from templates.TEMPLATES without the LLM
+template_renderer = TemplateRenderer(api_handler=api_handler)
 
-    last_msg = messages[-1]
-    content = last_msg.get("content", "")
-    sender = last_msg.get("name", "")
 
-    # Check for termination condition: message ends with TERMINATE
-    if content.rstrip().endswith("TERMINATE"):
-        print("DEBUG: Termination condition met in message. Chat will be terminated.")
-        return None
+# --------------------------
+# Agent Factory: one independent set per conversation
+# --------------------------
+def build_agents(user_agent: Optional["UserProxyAgent"] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 silent: bool = False,
+                 llm_config: Optional[dict] = None,
+                 llm_client: Optional[Union[AsyncLLMClient, ModelRouter]] = None,
+                 completion_cache: Optional[CompletionCache] = completion_cache,
+                 locale: str = DEFAULT_LOCALE,
+                 stream: bool = True,
+                 prefetch: bool = True) -> "ChatAgents":
+    """Build the agents, groupchat and manager for one conversation.
+
+    Nothing is shared between two calls, so concurrent sessions never see each
+    other's history. Pass user_agent to replace the stdin-driven User, and
+    silent=True to keep autogen from echoing every message to stdout.
+    llm_config / llm_client point the LLM-backed agents at another endpoint
+    (e.g. the local stub model used by the benchmarks); llm_client defaults
+    to model_router, which only serves SIA's async turns (the sync chat keeps
+    autogen's client on llm_config). completion_cache=None
+    makes SIA call the LLM for every free-text turn. locale picks the
+    template catalog for SIA's templated replies. stream=False makes SIA wait
+    for whole completions instead of reading them as a stream. prefetch=False
+    turns off speculative lookups for the session.
+
+    Only SIA holds an LLM config, and its client is created on its first LLM
+    call: speaker selection is rule-based, so the coordinator and the manager
+    never call a model.
+    """
+    from autogen import AssistantAgent, GroupChatManager, UserProxyAgent
+    from agents import ChatAgents, CustomGroupChat, FunctionExecutorAgent, SIAAgent
+
+    if llm_config is None:
+        llm_config = {"config_list": config_list}
+    function_executor = FunctionExecutorAgent(
+        name="FunctionExecutor",
+        execute=execute_function_call,
+        a_execute=a_execute_function_call,
+        retry_policy=retry_policy or DEFAULT_RETRY_POLICY,
+        human_input_mode="NEVER",
+        system_message="EXCLUSIVELY executes valid function calls in FUNCTION_CALL: format",
+        code_execution_config={
+            "last_n_messages": 2,
+            "work_dir": "groupchat",
+            "use_docker": False
+        }
+    )
+    function_executor.register_function({"execute_function_call": execute_function_call})
+    function_executor.register_function(tools.functions())
+
+    if user_agent is None:
+        user_agent = UserProxyAgent(
+            name="User",
+            human_input_mode="ALWAYS",
+            system_message="You are a human user interacting with the support system.",
+            code_execution_config=False
+        )
 
-    print("DEBUG: Last speaker was", sender, "content:", content[:50] if len(content) > 50 else content)
+    coordinator = AssistantAgent(
+        name="Coordinator",
+        system_message="""ORCHESTRATION RULES:
+1. If SIA requests user ID → Select User as next speaker.
+2. If FunctionExecutor returns results → Select SIA as next speaker.
+3. If error occurs → Terminate the conversation.
+4. Else → Continue normal rotation.
+""",
+        llm_config=False
+    )
+
+    sia = SIAAgent(
+        name="SIA",
+        system_message=SIA_SYSTEM_MESSAGE,
+        llm_config=llm_config,
+        prompts=sia_prompts,
+        llm_client=llm_client or model_router,
+        completion_cache=completion_cache,
+        renderer=template_renderer,
+        locale=locale,
+        stream=stream,
+        prefetcher=new_prefetcher() if prefetch else None
+    )
+
+    groupchat = CustomGroupChat(
+        agents=[user_agent, sia, function_executor, coordinator],
+        messages=[],
+        max_round=25,
+        speaker_selection_method="round_robin",  # Ignored by our custom speaker selection
+        allow_repeat_speaker=False,
+        func_call_filter=True
+    )
+
+    manager = GroupChatManager(
+        groupchat=groupchat,
+        llm_config=False,
+        is_termination_msg=lambda msg: (msg.get("content") or "").rstrip().endswith("TERMINATE"),
+        silent=silent
+    )
+    return ChatAgents(user_agent, sia, function_executor, coordinator, groupchat, manager)
 
-    # If SIA just output a function call => next is FunctionExecutor
-    if sender == "SIA" and re.search(r'^\s*FUNCTION_CALL:\w+\s*\{.*\}\s*$', content, re.DOTALL):
-        print("DEBUG: SIA issued function call -> FunctionExecutor will process")
-        return next(agent for agent in groupchat.agents if agent.name == "FunctionExecutor")
 
-    # If SIA just gave a normal prompt => next is User
-    if sender == "SIA" and "FUNCTION_CALL:" not in content:
-        print("DEBUG: SIA sent a prompt -> User will respond")
-        return next(agent for agent in groupchat.agents if agent.name == "User")
+# --------------------------
+# Default single-conversation agents used by start_chat()
+# --------------------------
+# Built on first access (main.sia, main.groupchat, ...), not at import time
+_default_agents: Optional["ChatAgents"] = None
 
-    # If FunctionExecutor just returned a result => back to SIA
-    if sender == "FunctionExecutor":
-        print("DEBUG: FunctionExecutor returned result -> SIA will interpret")
-        return next(agent for agent in groupchat.agents if agent.name == "SIA")
 
-    # If the last speaker is User => SIA responds
-    if sender == "User":
-        print("DEBUG: User sent a message -> SIA will respond")
-        return next(agent for agent in groupchat.agents if agent.name == "SIA")
+def default_agents() -> "ChatAgents":
+    global _default_agents
+    if _default_agents is None:
+        _default_agents = build_agents()
+    return _default_agents
 
-    print("DEBUG: Default fallback -> User will respond")
-    return next(agent for agent in groupchat.agents if agent.name == "User")
 
+def __getattr__(name: str):
+    if name in ("user_agent", "sia", "function_executor", "coordinator", "groupchat", "manager"):
+        return getattr(default_agents(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# --------------------------
-# Setup Custom Group Chat and Manager
-# --------------------------
-groupchat = CustomGroupChat(
-    agents=[user_agent, sia, function_executor, coordinator],
-    messages=[],
-    max_round=25,
-    speaker_selection_method="round_robin",  # Ignored by our custom speaker selection
-    allow_repeat_speaker=False,
-    func_call_filter=True
-)
-
-manager = GroupChatManager(
-    groupchat=groupchat,
-    llm_config={
-        "config_list": config_list,
-        "temperature": 0,
-        "timeout": 120
-    },
-    is_termination_msg=lambda msg: msg.get("content", "").rstrip().endswith("TERMINATE")
-)
 
 # --------------------------
 # Start Chat Session
 # --------------------------
 def start_chat():
-    print("\n🔍 DEBUG: Starting new chat session")
-    print("DEBUG: Agent order:", [a.name for a in groupchat.agents])
-    print("DEBUG: SIA system message:\n", sia.system_message)
+    configure_logging()
+    bind_session(uuid.uuid4().hex)
+    user_agent, sia, _, _, groupchat, manager = default_agents()
+    logger.info("starting new chat session", extra={"data": {"agents": [a.name for a in groupchat.agents]}})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("SIA system message", extra={"data": {"system_message": sia.system_message}})
+    sia.reset_stats()
     try:
-        print("DEBUG: Initiating chat with message: 'I need help with my listing or brand approval'")
         user_agent.initiate_chat(
             manager,
             message="I need help with my listing or brand approval",
             clear_history=True
         )
-    except Exception as e:
-        print(f"🔴 CRITICAL ERROR: {str(e)}")
+    except Exception:
+        logger.exception("chat session crashed")
+        observe_session(groupchat.messages, "crashed")
         raise
+    else:
+        observe_session(groupchat.messages)
+    finally:
+        sia.end_session()
+        logger.info("chat session finished", extra={"data": sia.stats()})
 
 
 if __name__ == "__main__":
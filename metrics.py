@@ -0,0 +1,322 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# --------------------------
+# In-process metrics with a Prometheus text endpoint
+# --------------------------
+# Counters and histograms keyed by label values, cheap enough to leave on:
+# an observation is one dict lookup (cached per label combination), a bisect
+# over the bucket bounds and a few additions under a per-series lock.
+#
+#   REGISTRY.render()    Prometheus text exposition (format 0.0.4)
+#   REGISTRY.snapshot()  plain dict, for tests and the JSON endpoint
+#   MetricsServer(port=9108).start()  serves /metrics and /metrics.json
+#
+# The SIA metrics themselves are defined at the bottom of this module.
+
+# Seconds; tuned for tool calls and LLM round trips (1 ms .. 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Small counts per session (rounds, retries)
+COUNT_BUCKETS = (1, 2, 4, 6, 8, 10, 15, 20, 30, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _CounterSeries:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        key = tuple(str(v) for v in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {key}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._series.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount: float = 1.0):
+        """Unlabelled counters only"""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.label_names, key)} {_number(s.value)}" for key, s in self._items()]
+
+    def snapshot(self) -> dict:
+        return {",".join(key): s.value for key, s in self._items()}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value: float):
+        """Unlabelled histograms only"""
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, s in self._items():
+            with s._lock:
+                counts, total, count = list(s.counts), s.sum, s.count
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.label_names, key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        result = {}
+        for key, s in self._items():
+            with s._lock:
+                result[",".join(key)] = {
+                    "count": s.count,
+                    "sum": s.sum,
+                    "buckets": dict(zip([_number(b) for b in self.buckets] + ["+Inf"], s.counts)),
+                }
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """{metric name: {comma-joined label values: value or histogram dict}}"""
+        return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+    def reset(self):
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --------------------------
+# Local HTTP endpoint
+# --------------------------
+class _Handler(BaseHTTPRequestHandler):
+    server: "_MetricsHTTPServer"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics":
+            body, content_type = self.server.registry.render().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(self.server.registry.snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _MetricsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, registry: MetricsRegistry):
+        super().__init__(address, _Handler)
+        self.registry = registry
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self._address = (host, port)
+        self._server: Optional[_MetricsHTTPServer] = None
+
+    def start(self) -> "MetricsServer":
+        self._server = _MetricsHTTPServer(self._address, self.registry)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+
+# --------------------------
+# SIA metrics
+# --------------------------
+TOOL_SECONDS = REGISTRY.histogram(
+    "sia_tool_call_seconds", "execute_function_call latency, retries and backoff included", ("function",))
+TOOL_CALLS = REGISTRY.counter(
+    "sia_tool_calls_total", "Function calls by outcome (ok, cached, prefetched, partial, error, circuit_open, invalid)",
+    ("function", "outcome"))
+PREFETCH_CALLS = REGISTRY.counter(
+    "sia_prefetch_calls_total",
+    "Speculative lookups by outcome (issued, hit, wasted, failed, capped)", ("backend", "outcome"))
+LLM_SECONDS = REGISTRY.histogram("sia_llm_call_seconds", "LLM round-trip latency per agent", ("agent",))
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "sia_llm_first_token_seconds", "Streamed LLM calls: request to first content token", ("agent",))
+LLM_STREAM_EARLY_STOPS = REGISTRY.counter(
+    "sia_llm_stream_early_stops_total", "Streams closed once the reply's routing was settled",
+    ("agent", "kind"))
+LLM_ENDPOINT_FALLBACKS = REGISTRY.counter(
+    "sia_llm_endpoint_fallbacks_total", "LLM calls moved to the next endpoint after a timeout or error", ("client",))
+LLM_TIER_SECONDS = REGISTRY.histogram(
+    "sia_llm_tier_seconds", "Routed LLM calls: latency per model tier, endpoint fallbacks included", ("tier",))
+LLM_TIER_CALLS = REGISTRY.counter(
+    "sia_llm_tier_calls_total", "Routed LLM calls by tier, turn class and outcome (ok, invalid, error)",
+    ("tier", "turn", "outcome"))
+LLM_TIER_COST = REGISTRY.counter("sia_llm_tier_cost_usd_total", "Estimated LLM spend per model tier", ("tier",))
+LLM_ESCALATIONS = REGISTRY.counter(
+    "sia_llm_escalations_total", "Routed LLM calls retried on the next tier, by reason", ("tier", "reason"))
+LLM_CALLS = REGISTRY.counter(
+    "sia_llm_calls_total", "Agent replies by source (llm, completion_cache, sop)", ("agent", "source"))
+LLM_TOKENS = REGISTRY.counter(
+    "sia_llm_tokens_total", "Tokens sent to and received from the LLM", ("agent", "kind"))
+SPEAKER_SELECTION_SECONDS = REGISTRY.histogram(
+    "sia_speaker_selection_seconds", "speaker_selection_func latency", ("next_speaker",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005))
+SESSION_ROUNDS = REGISTRY.histogram("sia_session_rounds", "Groupchat messages per finished session",
+                                    buckets=COUNT_BUCKETS)
+SESSION_RETRIES = REGISTRY.counter("sia_session_retries_total", "Executor retries, counted when sessions end",
+                                   ("function",))
+SESSIONS = REGISTRY.counter(
+    "sia_sessions_total", "Finished sessions by how they ended (terminated, exited, suspended, crashed)",
+    ("outcome",))
+
+
+def observe_session(messages: List[dict], outcome: Optional[str] = None, since: int = 0):
+    """Record a finished session; outcome defaults to terminated / exited from the last message.
+
+    since: messages already accounted for (a resumed session's stored history)
+    """
+    from session_store import retry_state
+
+    if outcome is None:
+        last = (messages[-1].get("content") or "") if messages else ""
+        outcome = "terminated" if last.rstrip().endswith("TERMINATE") else "exited"
+    SESSIONS.labels(outcome).inc()
+    SESSION_ROUNDS.observe(len(messages))
+    for func_name, retries in retry_state(messages[since:]).items():
+        SESSION_RETRIES.labels(func_name).inc(retries)
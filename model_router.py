@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from async_llm import AsyncLLMClient, StreamedReply
+from json_logging import get_logger
+from metrics import LLM_ESCALATIONS, LLM_TIER_CALLS, LLM_TIER_COST, LLM_TIER_SECONDS
+from token_count import count_message_tokens, count_text_tokens
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Tiered model routing for SIA's LLM turns
+# --------------------------
+# The SOP engine answers every turn it has a rule for; what reaches the LLM
+# falls into three classes of very different difficulty:
+#
+#   tool_result  SIA reacts to a tool message (mostly relaying it)
+#   reissue      the last call was rejected or failed; SIA writes it again
+#   free_text    SIA interprets whatever the seller typed
+#
+# Each class goes to a configured tier (cheapest first in `tiers`). A reply
+# that fails validation, e.g. a FUNCTION_CALL the registry cannot parse, or a
+# tier whose endpoints all failed, escalates to the next tier; the last tier's
+# answer is used as is. Within a tier, AsyncLLMClient moves to the next
+# endpoint of its config_list when one times out, so a tier's timeout bounds
+# how long a stalled endpoint can hold a turn.
+#
+# A streamed reply whose text was already forwarded to the seller cannot be
+# taken back, so it is never escalated (function calls are not forwarded).
+#
+# Per tier: calls, outcomes, latency, tokens, estimated cost, escalations and
+# endpoint fallbacks (stats(), and the sia_llm_tier_* metrics).
+
+TOOL_RESULT, REISSUE, FREE_TEXT = "tool_result", "reissue", "free_text"
+OK, INVALID, ERROR = "ok", "invalid", "error"
+
+LATENCY_WINDOW = 2048  # latencies kept per tier for the percentiles in stats()
+
+
+class ModelTier(NamedTuple):
+    name: str
+    config_list: List[dict]       # preferred endpoint first, then fallbacks
+    prompt_cost: float = 0.0      # USD per 1K prompt tokens
+    completion_cost: float = 0.0  # USD per 1K completion tokens
+    timeout: float = 30.0         # seconds per endpoint before falling back
+
+
+def classify_turn(messages: List[dict]) -> str:
+    """The class of the turn SIA is about to answer"""
+    turns = [m for m in messages if m.get("role") != "system"]
+    last = turns[-1] if turns else {}
+    if last.get("name") != "FunctionExecutor":
+        return FREE_TEXT
+    try:
+        result = json.loads(last.get("content") or "")
+    except ValueError:
+        return REISSUE
+    if not isinstance(result, dict) or result.get("status") in ("error", "critical_error"):
+        return REISSUE
+    return TOOL_RESULT
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class _TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.outcomes = {OK: 0, INVALID: 0, ERROR: 0}
+        self.escalations = 0
+        self.seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+
+
+class ModelRouter:
+    def __init__(self, tiers: List[ModelTier], routes: Dict[str, str],
+                 validate: Callable[[str], Optional[str]] = lambda reply: None,
+                 classify: Callable[[List[dict]], str] = classify_turn):
+        """
+        tiers:    escalation order, cheapest first
+        routes:   turn class -> tier name; unlisted classes go to the last tier
+        validate: reason a reply is unusable (e.g. "malformed_function_call"), or None
+        """
+        unknown = set(routes.values()) - {t.name for t in tiers}
+        if not tiers or unknown:
+            raise ValueError(f"routes name unknown tiers: {sorted(unknown)}" if unknown else "no model tiers")
+        self.tiers = list(tiers)
+        self.routes = dict(routes)
+        self.validate = validate
+        self.classify = classify
+        self._index = {t.name: i for i, t in enumerate(self.tiers)}
+        # Fallback is the tier's job here, so the openai client does not retry a stalled endpoint itself
+        self._clients = [AsyncLLMClient(t.config_list, timeout=t.timeout, max_retries=0, name=t.name)
+                         for t in self.tiers]
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def tier_for(self, turn: str) -> ModelTier:
+        return self.tiers[self._index.get(self.routes.get(turn), len(self.tiers) - 1)]
+
+    def model_for(self, messages: List[dict]) -> str:
+        """The tier and model messages are routed to, e.g. 'mini:gpt-4o-mini'"""
+        tier = self.tier_for(self.classify(messages))
+        return f"{tier.name}:{tier.config_list[0].get('model', '')}"
+
+    async def complete(self, messages: List[dict], **params) -> Optional[str]:
+        return await self._route(messages, lambda client: client.complete(messages, **params),
+                                 content=lambda reply: reply, shown=lambda: False)
+
+    async def stream(self, messages: List[dict], on_text: Optional[Callable[[str], None]] = None,
+                     **params) -> StreamedReply:
+        forwarded = []
+
+        def forward(text: str):
+            forwarded.append(len(text))
+            on_text(text)
+
+        return await self._route(
+            messages, lambda client: client.stream(messages, on_text=forward if on_text else None, **params),
+            content=lambda reply: reply.content, shown=lambda: bool(forwarded))
+
+    async def _route(self, messages: List[dict], call: Callable[[AsyncLLMClient], Awaitable[Any]],
+                     content: Callable[[Any], Optional[str]], shown: Callable[[], bool]):
+        turn = self.classify(messages)
+        first = self._index[self.tier_for(turn).name]
+        prompt_tokens = count_message_tokens(messages)
+        with self._lock:
+            self._turns[turn] = self._turns.get(turn, 0) + 1
+        for index in range(first, len(self.tiers)):
+            tier = self.tiers[index]
+            last = index + 1 == len(self.tiers)
+            start = time.perf_counter()
+            try:
+                reply = await call(self._clients[index])
+            except Exception as e:
+                self._record(tier, turn, ERROR, time.perf_counter() - start, prompt_tokens, None)
+                if last or shown():
+                    raise
+                self._escalate(tier, ERROR, e)
+                continue
+            text = content(reply) or ""
+            reason = self.validate(text)
+            self._record(tier, turn, INVALID if reason else OK, time.perf_counter() - start, prompt_tokens, text)
+            if reason is None or last or shown():
+                return reply
+            self._escalate(tier, reason, text)
+
+    def _escalate(self, tier: ModelTier, reason: str, detail):
+        with self._lock:
+            self._stats[tier.name].escalations += 1
+        LLM_ESCALATIONS.labels(tier.name, reason).inc()
+        logger.warning("escalating LLM turn from tier %s: %s", tier.name, reason,
+                       extra={"data": {"detail": str(detail)[:200]}})
+
+    def _record(self, tier: ModelTier, turn: str, outcome: str, seconds: float, prompt_tokens: int,
+                reply: Optional[str]):
+        # A call that failed outright is not billed
+        completion_tokens = count_text_tokens(reply) if reply else 0
+        if outcome == ERROR:
+            prompt_tokens = 0
+        cost = (prompt_tokens * tier.prompt_cost + completion_tokens * tier.completion_cost) / 1000
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats.calls += 1
+            stats.outcomes[outcome] += 1
+            stats.seconds += seconds
+            stats.latencies.append(seconds)
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += cost
+        LLM_TIER_SECONDS.labels(tier.name).observe(seconds)
+        LLM_TIER_CALLS.labels(tier.name, turn, outcome).inc()
+        if cost:
+            LLM_TIER_COST.labels(tier.name).inc(cost)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {t.name: _TierStats() for t in self.tiers}
+            self._turns: Dict[str, int] = {}
+        for client in self._clients:
+            client.fallbacks = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for tier, client in zip(self.tiers, self._clients):
+                s = self._stats[tier.name]
+                latencies = list(s.latencies)
+                tiers[tier.name] = {
+                    "calls": s.calls,
+                    **s.outcomes,
+                    "escalations": s.escalations,
+                    "escalation_rate": round(s.escalations / s.calls, 4) if s.calls else 0.0,
+                    "endpoint_fallbacks": client.fallbacks,
+                    "mean_ms": round(s.seconds / s.calls * 1000, 2) if s.calls else 0.0,
+                    "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                    "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                    "prompt_tokens": s.prompt_tokens,
+                    "completion_tokens": s.completion_tokens,
+                    "cost_usd": round(s.cost, 6),
+                }
+            return {"turns": dict(self._turns), "tiers": tiers}
@@ -0,0 +1,224 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from json_logging import get_logger
+from metrics import PREFETCH_CALLS
+from result_cache import params_key
+from sop_engine import SOPEngine, parse_function_call
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Speculative prefetch of the SOP's next lookups
+# --------------------------
+# The SOP is predictable: once a seller ID is known, get_user_status follows;
+# a stated listing ID means get_listing_status; a brand request ID means
+# get_brand_approval_status. The session's Prefetcher predicts the read-only
+# lookups the known IDs still need and starts them on a shared background
+# pool at two points:
+#   - SIA's prompt goes to the seller: lookups for IDs given earlier run while
+#     the seller reads and types
+#   - the seller's answer comes in: the SOP makes the call for that answer
+#     itself, straight away; lookups queued behind it (a listing stated
+#     alongside the seller ID) run at the same time instead of after it
+# An ID the seller has not typed yet cannot be looked up ahead of time.
+# Results are parked per session; execute_function_call takes them through
+# take_prefetched() before calling the backend itself.
+#
+# Accounting per lookup (sia_prefetch_calls_total): issued, hit, wasted
+# (fetched but never used by the session), failed, capped (skipped because its
+# backend already had max_in_flight speculative calls running).
+
+_current: ContextVar[Optional["Prefetcher"]] = ContextVar("prefetcher", default=None)
+
+Prediction = Tuple[str, dict]
+Lookup = Callable[[dict], Optional[dict]]
+
+
+def activate(prefetcher: Optional["Prefetcher"]):
+    """Make prefetcher the one execute_function_call consults in this context (session)"""
+    _current.set(prefetcher)
+
+
+def take_prefetched(name: str, params: dict) -> Optional[dict]:
+    """The current session's prefetched result for name(params), if it has one"""
+    prefetcher = _current.get()
+    return prefetcher.take(name, params) if prefetcher is not None else None
+
+
+def predict_lookups(messages: List[dict]) -> List[Prediction]:
+    """Read-only lookups the SOP will most likely make soon, in order of need.
+
+    After a seller message, the SOP's own next call (the lookup for what the
+    seller just said) is left out: it starts right away, so only the lookups
+    queued behind it gain from starting early.
+    """
+    facts = SOPEngine.extract_facts(messages)
+    calls = facts.get("calls", [])
+    predictions = []
+    if facts.get("request_id") and facts.get("intent") != "listing" and "get_brand_approval_status" not in calls:
+        predictions.append(("get_brand_approval_status", {"request_id": facts["request_id"]}))
+    if facts.get("intent") != "brand":
+        if facts.get("user_id") and "get_user_status" not in calls:
+            predictions.append(("get_user_status", {"user_id": facts["user_id"]}))
+        if facts.get("listing_id") and "get_listing_status" not in calls:
+            predictions.append(("get_listing_status", {"listing_id": facts["listing_id"]}))
+    if messages and messages[-1].get("name") == "User":
+        immediate = parse_function_call(SOPEngine().next_reply(messages) or "")
+        predictions = [p for p in predictions if p != immediate]
+    return predictions
+
+
+class PrefetchPool:
+    def __init__(self, max_in_flight: int = 4, max_workers: int = 16):
+        """
+        max_in_flight: speculative calls allowed to run at once against one backend
+        max_workers:   background threads shared by every session's prefetches
+        """
+        self.max_in_flight = max_in_flight
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, backend: str, fn: Callable[[], Optional[dict]]) -> Optional[Future]:
+        """Run fn in the background, or return None if backend is at its speculative cap"""
+        with self._lock:
+            if self._in_flight.get(backend, 0) >= self.max_in_flight:
+                return None
+            self._in_flight[backend] = self._in_flight.get(backend, 0) + 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="prefetch")
+        # Keep the session's log binding in the background thread
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, fn)
+        future.add_done_callback(lambda _: self._release(backend))
+        return future
+
+    def _release(self, backend: str):
+        with self._lock:
+            self._in_flight[backend] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"max_in_flight": self.max_in_flight, "in_flight": dict(self._in_flight)}
+
+
+class Prefetcher:
+    def __init__(self, lookups: Dict[str, Lookup], pool: PrefetchPool,
+                 known: Callable[[str, dict], bool] = lambda name, params: False,
+                 predict: Callable[[List[dict]], List[Prediction]] = predict_lookups,
+                 max_entries: int = 16, max_age: float = 30.0, wait: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        lookups:     name -> read-only call taking the params dict (None for an unusable result)
+        known:       true when a lookup's answer is already cached elsewhere, so speculating is pointless
+        max_entries: parked results per session
+        max_age:     seconds a parked result stays usable
+        wait:        longest take() waits for a prefetch still in flight
+        """
+        self.lookups = lookups
+        self.pool = pool
+        self.known = known
+        self.predict = predict
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.wait = wait
+        self._clock = clock
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Future]] = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.issued = 0
+        self.hits = 0
+        self.wasted = 0
+        self.failed = 0
+        self.capped = 0
+
+    def observe(self, messages: List[dict]):
+        """Start the lookups the conversation is about to need"""
+        self._expire()
+        for name, params in self.predict(messages):
+            lookup = self.lookups.get(name)
+            key = (name, params_key(params))
+            with self._lock:
+                if lookup is None or key in self._entries or len(self._entries) >= self.max_entries:
+                    continue
+            if self.known(name, params):
+                continue
+            future = self.pool.submit(name, lambda lookup=lookup, params=params: lookup(params))
+            if future is None:
+                self.capped += 1
+                PREFETCH_CALLS.labels(name, "capped").inc()
+                continue
+            with self._lock:
+                self._entries[key] = (self._clock(), future)
+            self.issued += 1
+            PREFETCH_CALLS.labels(name, "issued").inc()
+            logger.debug("prefetching %s", name, extra={"data": {"params": params}})
+
+    def pending(self, name: str, params: dict) -> Optional[Future]:
+        with self._lock:
+            entry = self._entries.get((name, params_key(params)))
+        return entry[1] if entry is not None else None
+
+    def take(self, name: str, params: dict) -> Optional[dict]:
+        """The parked result for name(params), waiting for it if still in flight; None if there is none"""
+        with self._lock:
+            entry = self._entries.pop((name, params_key(params)), None)
+        if entry is None:
+            return None
+        started, future = entry
+        try:
+            result = future.result(timeout=self.wait)
+        except (FutureTimeoutError, CancelledError):
+            result = None
+        except Exception as e:
+            logger.debug("prefetch of %s failed: %s", name, e)
+            result = None
+        if result is None or self._clock() - started > self.max_age:
+            self.failed += result is None
+            self.wasted += result is not None
+            PREFETCH_CALLS.labels(name, "failed" if result is None else "wasted").inc()
+            return None
+        self.hits += 1
+        PREFETCH_CALLS.labels(name, "hit").inc()
+        return dict(result)
+
+    def _expire(self):
+        now = self._clock()
+        with self._lock:
+            stale = [key for key, (started, _) in self._entries.items() if now - started > self.max_age]
+            entries = [(key[0], self._entries.pop(key)[1]) for key in stale]
+        self._discard(entries)
+
+    def _discard(self, entries: List[Tuple[str, Future]]):
+        for name, future in entries:
+            if future.cancel():
+                continue
+            # Already running or done: the backend call was made for nothing
+            self.wasted += 1
+            PREFETCH_CALLS.labels(name, "wasted").inc()
+
+    def close(self):
+        """End of the session: whatever is still parked was wasted"""
+        with self._lock:
+            entries = [(key[0], future) for key, (_, future) in self._entries.items()]
+            self._entries.clear()
+        self._discard(entries)
+
+    def stats(self) -> dict:
+        return {
+            "prefetch_issued": self.issued,
+            "prefetch_hits": self.hits,
+            "prefetch_wasted": self.wasted,
+            "prefetch_failed": self.failed,
+            "prefetch_capped": self.capped,
+            "prefetch_hit_rate": round(self.hits / self.issued, 4) if self.issued else 0.0,
+        }
@@ -0,0 +1,99 @@
+from typing import Optional
+
+# --------------------------
+# Routing decisions from a partial SIA reply
+# --------------------------
+# SIA's completions are streamed. ReplyScanner reads the chunks as they
+# arrive and settles, as early as the text allows, what speaker_selection_func
+# will do with the reply:
+#   kind "function_call"  the reply opens with FUNCTION_CALL: (never shown to
+#                         the seller); complete once its JSON object closes
+#   kind "text"           anything else, forwarded to the seller chunk by
+#                         chunk and read to the end of the stream: a
+#                         TERMINATE only ends the chat when the whole reply
+#                         ends with it, which only the end of the stream tells
+# Once a function call is complete, nothing the model adds can change the
+# routing, so the caller stops reading the stream and uses scanner.reply. A
+# stream that ends is settled with finish(), which hands over any text still
+# held back.
+
+FUNCTION_CALL_PREFIX = "FUNCTION_CALL:"
+FUNCTION_CALL, TEXT = "function_call", "text"
+
+
+class ReplyScanner:
+    def __init__(self):
+        self.text = ""
+        self.kind: Optional[str] = None
+        self.complete = False
+        self.chunks = 0
+        self._end: Optional[int] = None  # cut-off once complete
+        self._forwarded = 0
+        # JSON object scan state for function calls
+        self._scanned = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def reply(self) -> str:
+        """The reply as routed: cut right after a function call's JSON, otherwise all of it"""
+        return self.text if self._end is None else self.text[:self._end]
+
+    def feed(self, delta: str) -> str:
+        """Add one streamed chunk; returns the new text that can be shown to the seller"""
+        if self.complete or not delta:
+            return ""
+        self.chunks += 1
+        self.text += delta
+        if self.kind is None:
+            head = self.text.lstrip()
+            if head.startswith(FUNCTION_CALL_PREFIX):
+                self.kind = FUNCTION_CALL
+            elif FUNCTION_CALL_PREFIX.startswith(head):
+                return ""  # could still become a function call
+            else:
+                self.kind = TEXT
+        if self.kind == FUNCTION_CALL:
+            self._scan_call()
+            return ""
+        return self._visible()
+
+    def finish(self) -> str:
+        """The stream ended; returns the text not yet shown to the seller"""
+        if self.complete or not self.text:
+            return ""
+        if self.kind is None:
+            self.kind = TEXT  # never became a function call
+        return self._visible() if self.kind == TEXT else ""
+
+    def _visible(self) -> str:
+        end = len(self.text) if self._end is None else self._end
+        visible = self.text[self._forwarded:end]
+        self._forwarded = end
+        return visible
+
+    def _scan_call(self):
+        text = self.text
+        i = self._scanned or text.index(FUNCTION_CALL_PREFIX) + len(FUNCTION_CALL_PREFIX)
+        while i < len(text):
+            ch = text[i]
+            i += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth:
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    self._end = i
+                    self.complete = True
+                    break
+        self._scanned = i
@@ -0,0 +1,153 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# --------------------------
+# Bounded TTL cache for read-only status lookups
+# --------------------------
+# Only functions with a configured TTL are cached, so mutating calls such as
+# create_support_ticket can never be served from here. Entries are evicted
+# least-recently-used once maxsize is reached.
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttls: Dict[str, float], maxsize: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        ttls:    seconds to keep a result, per function name; others are never cached
+        maxsize: total entries across all functions before LRU eviction
+        """
+        self.ttls = dict(ttls)
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def cacheable(self, func_name: str) -> bool:
+        return self.ttls.get(func_name, 0) > 0
+
+    def get(self, func_name: str, key: Hashable, default=None):
+        """Cached value for (func_name, key), or default on a miss"""
+        if not self.cacheable(func_name):
+            return default
+        entry_key = (func_name, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[entry_key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+        return dict(value) if isinstance(value, dict) else value
+
+    def contains(self, func_name: str, key: Hashable) -> bool:
+        """True if a fresh entry exists; unlike get() this is not counted as a hit or miss"""
+        if not self.cacheable(func_name):
+            return False
+        with self._lock:
+            entry = self._entries.get((func_name, key))
+            return entry is not None and entry[0] > self._clock()
+
+    def set(self, func_name: str, key: Hashable, value):
+        if not self.cacheable(func_name):
+            return
+        entry_key = (func_name, key)
+        stored = dict(value) if isinstance(value, dict) else value
+        with self._lock:
+            self._entries[entry_key] = (self._clock() + self.ttls[func_name], stored)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, func_name: str, key: Hashable) -> bool:
+        with self._lock:
+            removed = self._entries.pop((func_name, key), None) is not None
+            self.invalidations += removed
+        return removed
+
+    def invalidate_matching(self, *values) -> int:
+        """Drop every entry whose key mentions one of the given IDs"""
+        targets = {v for v in values if v not in (None, "")}
+        if not targets:
+            return 0
+        with self._lock:
+            stale = [k for k in self._entries if targets & set(_flatten_key(k[1]))]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": size,
+            "maxsize": self.maxsize,
+        }
+
+
+def _flatten_key(key):
+    if isinstance(key, tuple):
+        for part in key:
+            yield from _flatten_key(part)
+    else:
+        yield key
+
+
+def params_key(params: dict) -> Tuple:
+    """Hashable cache key for a FUNCTION_CALL params dict"""
+    return tuple(sorted((k, v if isinstance(v, Hashable) else repr(v)) for k, v in params.items()))
+
+
+def cached_method(skip: Callable[[Any], bool] = lambda result: False):
+    """Serve a method from self.cache (a TTLCache) keyed by its arguments.
+
+    The method name is the function name looked up in the cache's TTL table;
+    results for which skip(result) is true are returned but not stored.
+    """
+    def decorator(method):
+        func_name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache: Optional[TTLCache] = getattr(self, "cache", None)
+            if cache is None or not cache.cacheable(func_name):
+                return method(self, *args, **kwargs)
+            key = args + tuple(sorted(kwargs.items()))
+            result = cache.get(func_name, key, MISSING)
+            if result is not MISSING:
+                return result
+            result = method(self, *args, **kwargs)
+            if not skip(result):
+                cache.set(func_name, key, result)
+            return result
+        return wrapper
+    return decorator
+
@@ -0,0 +1,60 @@
+import random
+from typing import Dict, Optional
+
+# --------------------------
+# Retry Policy for FunctionExecutor
+# --------------------------
+# Backend lookups that answer {"status": "retrying", "auto_retry": true} are
+# retried by the executor itself with exponential backoff, so SIA (and the
+# LLM behind it) only ever sees the final outcome.
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, multiplier: float = 2.0,
+                 max_delay: float = 8.0, jitter: float = 0.5,
+                 overrides: Optional[Dict[str, dict]] = None):
+        """
+        max_attempts: total calls including the first one
+        base_delay:   seconds to wait before the first retry
+        multiplier:   growth factor of the delay per attempt
+        max_delay:    cap on a single delay, before jitter
+        jitter:       fraction of each delay that is randomised (0 = none, 1 = full jitter)
+        overrides:    per-function keyword overrides, e.g. {"get_listing_status": {"max_attempts": 5}}
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.overrides = overrides or {}
+        self._per_function: Dict[str, "RetryPolicy"] = {}
+
+    def for_function(self, func_name: str) -> "RetryPolicy":
+        """Policy to apply to one function, with its overrides merged in"""
+        if func_name not in self.overrides:
+            return self
+        policy = self._per_function.get(func_name)
+        if policy is None:
+            settings = {
+                "max_attempts": self.max_attempts,
+                "base_delay": self.base_delay,
+                "multiplier": self.multiplier,
+                "max_delay": self.max_delay,
+                "jitter": self.jitter,
+            }
+            settings.update(self.overrides[func_name])
+            policy = self._per_function[func_name] = RetryPolicy(**settings)
+        return policy
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait after the given (1-based) failed attempt"""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        return delay * (1 - self.jitter * random.random())
+
+
+def needs_retry(result) -> bool:
+    return isinstance(result, dict) and result.get("status") == "retrying" and bool(result.get("auto_retry"))
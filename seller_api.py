@@ -0,0 +1,385 @@
+import gzip
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from json_logging import get_logger
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Seller API transports behind FlipkartAPIHandler
+# --------------------------
+# Every backend call is an endpoint name plus a params dict. A transport turns
+# that into a response dict:
+#   SimulatedTransport - the in-process simulated backend (default)
+#   HTTPTransport      - real HTTP: pooled keep-alive httpx clients (sync and
+#                        async), per-endpoint timeouts, gzip both ways
+# Set $SELLER_API_URL to use HTTP; benchmarks/mock_seller_api.py serves the
+# simulated backend over HTTP for local runs.
+
+# endpoint -> (HTTP method, path); {name} segments come from params, the rest
+# of the params go in the query string (GET) or JSON body (POST)
+ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "get_user_status": ("GET", "/v1/users/{user_id}/status"),
+    "get_listing_status": ("GET", "/v1/listings/{listing_id}/status"),
+    "get_brand_approval_status": ("GET", "/v1/brand-requests/{request_id}/status"),
+    "get_block_reason": ("GET", "/v1/listings/{listing_id}/block-reason"),
+    "get_override_status": ("GET", "/v1/listings/{listing_id}/override-status"),
+    "can_reactivate_listing": ("GET", "/v1/block-reasons/{block_reason}/reactivation"),
+    "check_brand_approval": ("GET", "/v1/brands/{brand_id}/approval"),
+    "create_support_ticket": ("POST", "/v1/tickets"),
+    "create_support_ticket_batch": ("POST", "/v1/tickets:batch"),
+    "get_listing_status_batch": ("POST", "/v1/listings/status:batch"),
+    "get_block_reason_batch": ("POST", "/v1/listings/block-reason:batch"),
+    "get_override_status_batch": ("POST", "/v1/listings/override-status:batch"),
+    "get_listing_diagnostics": ("POST", "/v1/listings/diagnostics:batch"),
+    "check_brand_approval_batch": ("POST", "/v1/brands/approval:batch"),
+}
+
+# Seconds per request; writes and batches get longer than single lookups
+DEFAULT_TIMEOUT = 3.0
+ENDPOINT_TIMEOUTS = {
+    "create_support_ticket": 10.0,
+    "create_support_ticket_batch": 15.0,
+    "get_listing_status_batch": 8.0,
+    "get_block_reason_batch": 8.0,
+    "get_override_status_batch": 8.0,
+    "get_listing_diagnostics": 8.0,
+    "check_brand_approval_batch": 8.0,
+}
+
+# Request bodies above this many bytes are sent gzip-compressed
+GZIP_MIN_BYTES = 1024
+
+PATH_PARAM = re.compile(r"\{(\w+)\}")
+
+
+class SellerAPIError(Exception):
+    """A seller API call that failed (transport error, timeout or non-2xx status)"""
+
+    def __init__(self, endpoint: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+        self.status = status
+
+
+DEFAULT_TEST_RESPONSES = {
+    'block_reason': 'SELLER_STATE_CHANGE',
+    'brand_approval': 'PENDING'
+}
+OVERRIDABLE_REASONS = ["POLICY_VIOLATION", "TRADEMARK_VIOLATION"]
+
+
+def new_ticket_id() -> str:
+    return f"TKT-{uuid.uuid4().hex[:12].upper()}"
+
+
+class SimulatedSellerAPI:
+    """The simulated backend: one method per endpoint; statuses follow the IDs, the rest come from test_responses"""
+
+    def __init__(self, test_responses: Optional[Dict[str, str]] = None):
+        self.test_responses = test_responses or dict(DEFAULT_TEST_RESPONSES)
+
+    def handle(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        if endpoint not in ENDPOINTS:
+            raise SellerAPIError(endpoint, "unknown endpoint", 404)
+        return getattr(self, endpoint)(**params)
+
+    # Status lookups are derived from the IDs, so every scripted scenario gets
+    # the same answers; IDs starting with "5" simulate a flaky service
+    def get_user_status(self, user_id: str) -> dict:
+        if user_id.startswith("5"):
+            raise SellerAPIError("get_user_status", "account service temporarily unavailable", 503)
+        if user_id.startswith("1"):
+            return {
+                "status": "active",
+                "message": "Your account is active.",
+                "user_id": user_id
+            }
+        if user_id.startswith("2"):
+            return {
+                "status": "onboarding",
+                "message": (
+                    "Your products aren’t visible yet. Once onboarding is complete, "
+                    "your account will be activated within 48 hours, and your listings "
+                    "will go live."
+                ),
+                "user_id": user_id
+            }
+        return {
+            "status": "on_hold",
+            "message": "Your account is on hold. Please contact support if you have questions.",
+            "user_id": user_id
+        }
+
+    def get_listing_status(self, listing_id: str) -> dict:
+        if listing_id.startswith("5"):
+            raise SellerAPIError("get_listing_status", "listing service temporarily unavailable", 503)
+        last_char = listing_id[-1] if listing_id else "0"
+        if last_char == "2":
+            return {
+                "status": "blocked",
+                "message": "Your listing is blocked due to seller state change.",
+                "block_reason": "seller_state_change",
+                "listing_id": listing_id
+            }
+        if last_char == "1":
+            return {
+                "status": "inactive",
+                "message": "Your listing is currently inactive. Please activate it to be visible.",
+                "listing_id": listing_id
+            }
+        if last_char == "3":
+            return {
+                "status": "archived",
+                "message": "Your listing is archived and not visible to customers.",
+                "listing_id": listing_id
+            }
+        if last_char == "4":
+            return {
+                "status": "rfa",
+                "message": "Your listing is pending approval (RFA).",
+                "listing_id": listing_id
+            }
+        return {
+            "status": "active",
+            "message": "Your listing is active and visible to customers.",
+            "listing_id": listing_id
+        }
+
+    def get_brand_approval_status(self, request_id: str) -> dict:
+        last_char = request_id[-1] if request_id else "0"
+        if last_char == "1":
+            return {
+                "status": "approved",
+                "message": "Your brand approval request is approved."
+            }
+        if last_char == "2":
+            return {
+                "status": "in_progress",
+                "message": "Brand approval is still in progress.",
+                "timeline_hours": 48
+            }
+        return {
+            "status": "disapproved",
+            "message": "Brand approval disapproved. Additional steps required.",
+            "timeline_hours": 80
+        }
+
+    def can_reactivate_listing(self, block_reason: str) -> dict:
+        can_reactivate = block_reason in OVERRIDABLE_REASONS
+        return {
+            "can_reactivate": can_reactivate,
+            "reason_code": block_reason,
+            "message": "Can be reactivated" if can_reactivate else "Cannot be reactivated",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def create_support_ticket(self, user_id: str, listing_id: str, reason: str,
+                              ticket_id: Optional[str] = None, request_id: Optional[str] = None) -> dict:
+        # Callers may pick the ticket ID themselves (see ticket_store); otherwise it is fresh
+        result = {
+            "ticket_id": ticket_id or new_ticket_id(),
+            "status": "CREATED",
+            "user_id": user_id,
+            "listing_id": listing_id,
+            "reason": reason,
+            "timestamp": datetime.now().isoformat()
+        }
+        if request_id:
+            result["request_id"] = request_id
+        return result
+
+    def get_block_reason(self, listing_id: str) -> dict:
+        return {
+            "listing_id": listing_id,
+            "reason": self.test_responses['block_reason'],
+            "details": "Simulated block reason response",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def check_brand_approval(self, brand_id: str) -> dict:
+        return {
+            "brand_id": brand_id,
+            "status": self.test_responses['brand_approval'],
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def get_override_status(self, listing_id: str) -> dict:
+        block_reason = self.test_responses['block_reason']
+        overridable = block_reason in OVERRIDABLE_REASONS
+        return {
+            "listing_id": listing_id,
+            "overrides": [block_reason] if overridable else [],
+            "count": 1 if overridable else 0,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    # Batches answer per ID: an ID whose lookup fails gets {<id field>, "error"}
+    # and the rest of the batch still succeeds
+    @staticmethod
+    def _per_item(lookup, ids: List[str], id_field: str) -> Dict[str, dict]:
+        results = {}
+        for item_id in dict.fromkeys(ids):
+            try:
+                results[item_id] = lookup(item_id)
+            except SellerAPIError as e:
+                results[item_id] = {id_field: item_id, "error": str(e)}
+        return results
+
+    def get_listing_status_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        return self._per_item(self.get_listing_status, listing_ids, "listing_id")
+
+    def get_block_reason_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        return self._per_item(self.get_block_reason, listing_ids, "listing_id")
+
+    def get_override_status_batch(self, listing_ids: List[str]) -> Dict[str, dict]:
+        return self._per_item(self.get_override_status, listing_ids, "listing_id")
+
+    def check_brand_approval_batch(self, brand_ids: List[str]) -> Dict[str, dict]:
+        return self._per_item(self.check_brand_approval, brand_ids, "brand_id")
+
+    def get_listing_diagnostics(self, listing_ids: List[str]) -> Dict[str, dict]:
+        """Status, block reason and overrides for many listings in one request"""
+        return self._per_item(self._diagnose, listing_ids, "listing_id")
+
+    def _diagnose(self, listing_id: str) -> dict:
+        status = self.get_listing_status(listing_id)
+        if status["status"] != "blocked":
+            return dict(status, block_reason=None, overrides=[], override_count=0)
+        override = self.get_override_status(listing_id)
+        return dict(status, block_reason=self.get_block_reason(listing_id)["reason"],
+                    overrides=override["overrides"], override_count=override["count"])
+
+    def create_support_ticket_batch(self, tickets: List[dict]) -> Dict[str, dict]:
+        """tickets: create_support_ticket params, each with its ticket_id; results keyed by ticket_id"""
+        results = {}
+        for ticket in tickets:
+            result = self.create_support_ticket(**ticket)
+            results[result["ticket_id"]] = result
+        return results
+
+
+class SimulatedTransport:
+    def __init__(self, backend: Optional[SimulatedSellerAPI] = None):
+        self.backend = backend or SimulatedSellerAPI()
+
+    def call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        return self.backend.handle(endpoint, params)
+
+    async def a_call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        return self.backend.handle(endpoint, params)
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+def build_request(endpoint: str, params: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any], Optional[bytes], Dict[str, str]]:
+    """(method, path, query, body, headers) for an endpoint call"""
+    try:
+        method, template = ENDPOINTS[endpoint]
+    except KeyError:
+        raise SellerAPIError(endpoint, "unknown endpoint")
+    rest = dict(params)
+    path = PATH_PARAM.sub(lambda m: quote(str(rest.pop(m.group(1))), safe=""), template)
+    headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+    if method == "GET":
+        return method, path, rest, None, headers
+    body = json.dumps(rest, ensure_ascii=False, separators=(",", ":")).encode()
+    headers["Content-Type"] = "application/json"
+    if len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return method, path, {}, body, headers
+
+
+class HTTPTransport:
+    def __init__(self, base_url: str, timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = DEFAULT_TIMEOUT, max_connections: int = 100,
+                 max_keepalive_connections: int = 20, keepalive_expiry: float = 30.0):
+        """
+        base_url:  seller API root, e.g. http://127.0.0.1:8780
+        timeouts:  seconds per endpoint, overriding ENDPOINT_TIMEOUTS
+        max_*:     connection pool limits, per client (sync and async each have one)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.default_timeout = default_timeout
+        self._pool = dict(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                          keepalive_expiry=keepalive_expiry)
+        self._client = None
+        self._async_client = None
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(**self._pool)
+
+    def _sync_client(self):
+        # Clients are created on first use; httpx is only imported when HTTP is in play
+        if self._client is None:
+            import httpx
+            self._client = httpx.Client(base_url=self.base_url, limits=self._limits(), timeout=self.default_timeout)
+        return self._client
+
+    def _a_client(self):
+        if self._async_client is None:
+            import httpx
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, limits=self._limits(),
+                                                   timeout=self.default_timeout)
+        return self._async_client
+
+    def call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        import httpx
+        method, path, query, body, headers = build_request(endpoint, params)
+        try:
+            response = self._sync_client().request(method, path, params=query, content=body, headers=headers,
+                                                   timeout=self.timeouts.get(endpoint, self.default_timeout))
+        except httpx.HTTPError as e:
+            raise SellerAPIError(endpoint, f"{type(e).__name__}: {e}") from e
+        return _decode(endpoint, response)
+
+    async def a_call(self, endpoint: str, params: Dict[str, Any]) -> dict:
+        import httpx
+        method, path, query, body, headers = build_request(endpoint, params)
+        try:
+            response = await self._a_client().request(method, path, params=query, content=body, headers=headers,
+                                                      timeout=self.timeouts.get(endpoint, self.default_timeout))
+        except httpx.HTTPError as e:
+            raise SellerAPIError(endpoint, f"{type(e).__name__}: {e}") from e
+        return _decode(endpoint, response)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def _decode(endpoint: str, response) -> dict:
+    if response.status_code >= 400:
+        raise SellerAPIError(endpoint, f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+    try:
+        return response.json()
+    except ValueError as e:
+        raise SellerAPIError(endpoint, f"invalid JSON response: {e}", response.status_code) from e
+
+
+def transport_from_env():
+    """HTTPTransport when $SELLER_API_URL is set, else the simulated backend"""
+    base_url = os.environ.get("SELLER_API_URL")
+    if base_url:
+        logger.info("seller API over HTTP at %s", base_url)
+        return HTTPTransport(base_url)
+    return SimulatedTransport()
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import uuid
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+from autogen import UserProxyAgent
+
+import main
+from json_logging import bind_session, configure_logging, get_logger
+from metrics import MetricsServer, observe_session
+from session_store import DEFAULT_PATH, SessionRecord, SessionStore
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Concurrent Seller Sessions on asyncio
+# --------------------------
+# Every session gets its own agents and groupchat from main.build_agents(), and
+# runs as one asyncio task. The User agent reads the seller's messages from an
+# inbox queue instead of stdin, so hundreds of conversations can wait on the
+# LLM at the same time in one process.
+#
+# With a SessionStore, every session is checkpointed whenever it waits for the
+# seller. A seller who goes quiet for idle_timeout seconds is suspended: the
+# task ends and frees its memory, and the conversation can be resumed later,
+# on this or any other worker sharing the store, from its stored messages.
+#
+# With stream_replies, the text of SIA's LLM replies also reaches the seller
+# as it is generated: ReplyDelta items ahead of each full reply, which stays
+# the authoritative copy (SOP, template and cached replies arrive whole).
+
+DEFAULT_OPENING_MESSAGE = "I need help with my listing or brand approval"
+
+
+class ReplyDelta(NamedTuple):
+    """Part of the SIA reply being generated"""
+    text: str
+
+
+def parse_opening(line: str) -> Tuple[str, Optional[str]]:
+    """(opening message, session_id or None) from a connection's first line"""
+    opening = line.strip() or DEFAULT_OPENING_MESSAGE
+    if not opening.startswith("{"):
+        return opening, None
+    try:
+        request = json.loads(opening)
+    except ValueError:
+        return opening, None
+    if not isinstance(request, dict):
+        return opening, None
+    if request.get("resume"):
+        return DEFAULT_OPENING_MESSAGE, str(request["resume"])
+    if "message" in request or "session_id" in request:
+        session_id = request.get("session_id")
+        return request.get("message") or DEFAULT_OPENING_MESSAGE, str(session_id) if session_id else None
+    return opening, None
+
+
+class SessionUserAgent(UserProxyAgent):
+    def __init__(self, session: "SellerSession"):
+        super().__init__(
+            name="User",
+            human_input_mode="ALWAYS",
+            system_message="You are a human user interacting with the support system.",
+            code_execution_config=False
+        )
+        self.session = session
+
+    async def a_get_human_input(self, prompt: str) -> str:
+        return await self.session.wait_for_seller()
+
+    def get_human_input(self, prompt: str) -> str:
+        raise RuntimeError("SessionUserAgent only supports the async chat path")
+
+
+class SellerSession:
+    def __init__(self, session_id: str, store: Optional[SessionStore] = None,
+                 idle_timeout: Optional[float] = None, stream_replies: bool = False,
+                 agent_options: Optional[dict] = None):
+        """agent_options: extra main.build_agents() arguments (llm_config, llm_client, retry_policy, ...)"""
+        self.session_id = session_id
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.agents = main.build_agents(user_agent=SessionUserAgent(self), silent=True, **(agent_options or {}))
+        if stream_replies:
+            self.agents.sia.on_text = self._publish_delta
+        self.closed = False
+        self.suspended = False
+        self.resumed_messages = 0
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self, opening_message: str, record: Optional[SessionRecord] = None):
+        """Start the conversation, or continue the stored one in record"""
+        # Runs inside this session's own task, so the binding stays private to it
+        bind_session(self.session_id)
+        self.agents.sia.reset_stats()
+        try:
+            if record is None:
+                await self.agents.user_agent.a_initiate_chat(
+                    self.agents.manager,
+                    message=opening_message,
+                    clear_history=True,
+                    silent=True
+                )
+            else:
+                await self._resume(record)
+            if not self.suspended:
+                self._publish_last_reply()
+        except Exception:
+            observe_session(self.agents.groupchat.messages, "crashed", self.resumed_messages)
+            raise
+        else:
+            observe_session(self.agents.groupchat.messages, "suspended" if self.suspended else None,
+                            self.resumed_messages)
+        finally:
+            self.agents.sia.end_session()
+            if self.store is not None and not self.suspended:
+                self.store.checkpoint(self.session_id, self.agents.groupchat.messages)
+                self.store.close_session(self.session_id)
+            self.closed = True
+            logger.info("session suspended" if self.suspended else "session finished", extra={"data": self.stats()})
+            self._outbox.put_nowait(None)
+
+    async def _resume(self, record: SessionRecord):
+        logger.info("resuming session", extra={"data": {"messages": len(record.messages), "facts": record.facts}})
+        self.resumed_messages = len(record.messages)
+        manager = self.agents.manager
+        last_agent, last_message = await manager.a_resume(record.messages, None, silent=True)
+        await last_agent.a_initiate_chat(manager, message=last_message, clear_history=False, silent=True)
+
+    async def wait_for_seller(self) -> str:
+        """Show the seller SIA's latest reply and wait for their answer"""
+        if self.store is not None:
+            self.store.checkpoint(self.session_id, self.agents.groupchat.messages)
+        self._publish_last_reply()
+        try:
+            return await asyncio.wait_for(self._inbox.get(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            # Already checkpointed; end the task and leave the session resumable
+            self.suspended = self.store is not None
+            return "exit"
+
+    def _publish_last_reply(self):
+        messages = self.agents.groupchat.messages
+        if messages and messages[-1].get("name") != "User":
+            self._outbox.put_nowait(messages[-1].get("content") or "")
+
+    def _publish_delta(self, text: str):
+        self._outbox.put_nowait(ReplyDelta(text))
+
+    def send(self, text: str):
+        self._inbox.put_nowait(text)
+
+    async def receive(self, timeout: Optional[float] = None,
+                      partial: bool = False) -> Union[str, ReplyDelta, None]:
+        """Next reply for the seller, or None once the conversation has ended.
+
+        partial=True also returns the ReplyDelta items streamed ahead of a reply.
+        """
+        while True:
+            item = await asyncio.wait_for(self._outbox.get(), timeout)
+            if partial or not isinstance(item, ReplyDelta):
+                return item
+
+    def stats(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "rounds": len(self.agents.groupchat.messages),
+            "closed": self.closed,
+            **self.agents.sia.stats()
+        }
+
+
+class SessionServer:
+    def __init__(self, max_sessions: int = 500, store: Optional[SessionStore] = None,
+                 idle_timeout: Optional[float] = None, stream_replies: bool = False,
+                 agent_options: Optional[dict] = None):
+        """
+        store:          durable session store; without one sessions live only in this process
+        idle_timeout:   seconds a seller may stay silent before their session is suspended
+        stream_replies: send SIA's LLM replies to sellers as they are generated
+        agent_options:  extra main.build_agents() arguments for every session
+        """
+        self.max_sessions = max_sessions
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.stream_replies = stream_replies
+        self.agent_options = agent_options
+        self.sessions: Dict[str, SellerSession] = {}
+        self._capacity: Optional[asyncio.Semaphore] = None
+
+    async def open_session(self, opening_message: str = DEFAULT_OPENING_MESSAGE,
+                           session_id: Optional[str] = None) -> SellerSession:
+        """Start a conversation; waits for a free slot once max_sessions are live.
+
+        If session_id names an open session in the store, that conversation is
+        resumed instead and opening_message is ignored.
+        """
+        live = self.sessions.get(session_id) if session_id else None
+        if live is not None:
+            return live
+        record = self.store.resumable(session_id) if self.store is not None and session_id else None
+        if self._capacity is None:
+            self._capacity = asyncio.Semaphore(self.max_sessions)
+        await self._capacity.acquire()
+        session = SellerSession(session_id or uuid.uuid4().hex, self.store, self.idle_timeout,
+                                self.stream_replies, self.agent_options)
+        self.sessions[session.session_id] = session
+        session.task = asyncio.create_task(self._run(session, opening_message, record))
+        return session
+
+    async def _run(self, session: SellerSession, opening_message: str, record: Optional[SessionRecord]):
+        try:
+            await session.run(opening_message, record)
+        except Exception:
+            logger.exception("session %s crashed", session.session_id)
+        finally:
+            self.sessions.pop(session.session_id, None)
+            self._capacity.release()
+
+    def get(self, session_id: str) -> Optional[SellerSession]:
+        return self.sessions.get(session_id)
+
+    async def close_session(self, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        session.send("exit")
+        await asyncio.gather(session.task, return_exceptions=True)
+
+    async def shutdown(self):
+        await asyncio.gather(*(self.close_session(sid) for sid in list(self.sessions)))
+
+    # --------------------------
+    # JSON-lines TCP front end: one connection per seller
+    # --------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # First line: the opening message, {"resume": "<session_id>"} to continue a
+        # conversation, or {"session_id": ..., "message": ...} to start one under a
+        # given ID (the worker pool's dispatcher assigns IDs this way).
+        # Replies go out as {"session_id", "reply", "done"} lines, preceded by
+        # {"session_id", "delta"} lines when stream_replies is on.
+        opening, session_id = parse_opening((await reader.readline()).decode())
+        session = await self.open_session(opening, session_id)
+
+        async def pump_replies():
+            while True:
+                reply = await session.receive(partial=True)
+                if isinstance(reply, ReplyDelta):
+                    writer.write((json.dumps({"session_id": session.session_id, "delta": reply.text},
+                                             ensure_ascii=False) + "\n").encode())
+                    await writer.drain()
+                    continue
+                done = reply is None
+                writer.write((json.dumps({
+                    "session_id": session.session_id,
+                    "reply": reply,
+                    "done": done
+                }, ensure_ascii=False) + "\n").encode())
+                await writer.drain()
+                if done:
+                    return
+
+        pump = asyncio.create_task(pump_replies())
+        try:
+            while not session.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                session.send(line.decode().strip())
+        finally:
+            if not session.closed:
+                await self.close_session(session.session_id)
+            await pump
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Listen without blocking; port 0 picks a free port"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info("session server listening on %s:%d (max %d sessions)",
+                    host, server.sockets[0].getsockname()[1], self.max_sessions)
+        return server
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        configure_logging()
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve concurrent seller support sessions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=500)
+    parser.add_argument("--session-store", default=DEFAULT_PATH, help="SQLite file shared by workers")
+    parser.add_argument("--session-ttl", type=float, default=24 * 3600, help="seconds before idle sessions are evicted")
+    parser.add_argument("--idle-timeout", type=float, default=600.0,
+                        help="seconds of seller silence before a session is suspended")
+    parser.add_argument("--stream-replies", action="store_true",
+                        help='send {"delta": ...} lines while SIA generates a reply')
+    parser.add_argument("--metrics-port", type=int, default=9108, help="Prometheus endpoint port (0 disables it)")
+    args = parser.parse_args()
+    if args.metrics_port:
+        MetricsServer(host=args.host, port=args.metrics_port).start()
+    store = SessionStore(args.session_store, ttl=args.session_ttl)
+    asyncio.run(SessionServer(max_sessions=args.max_sessions, store=store,
+                              idle_timeout=args.idle_timeout,
+                              stream_replies=args.stream_replies).serve(args.host, args.port))
@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sop_engine import SOPEngine, parse_function_call
+
+# --------------------------
+# Durable seller sessions
+# --------------------------
+# Each session's groupchat messages, the facts extracted from them and the
+# executor's retry tally are checkpointed to SQLite at every turn boundary
+# (whenever the conversation waits for the seller). Messages are append-only:
+# a checkpoint writes just the messages added since the last one. Any worker
+# sharing the file can load a session and resume it with
+# GroupChatManager.a_resume, so nothing is replayed through the LLM.
+#
+# Memory does not grow with the number of sellers handled: state lives on
+# disk, sessions idle for longer than ttl are evicted, and at most
+# max_sessions are kept (least recently active evicted first).
+
+DEFAULT_PATH = os.environ.get("SIA_SESSION_STORE", os.path.join(".cache", "sia_sessions.sqlite3"))
+
+OPEN, CLOSED = "open", "closed"
+
+
+class SessionRecord(NamedTuple):
+    session_id: str
+    status: str
+    messages: List[dict]
+    facts: dict
+    retries: Dict[str, int]
+    updated: float
+
+
+def retry_state(messages: List[dict], retries: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Retries the executor made, per function, from its results in messages (added to retries)"""
+    retries = dict(retries or {})
+    func_name = None
+    for m in messages:
+        content = m.get("content") or ""
+        if m.get("name") == "SIA":
+            call = parse_function_call(content)
+            func_name = call[0] if call else None
+        elif m.get("name") == "FunctionExecutor" and func_name:
+            try:
+                attempts = json.loads(content).get("attempts", 1)
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(attempts, int) and attempts > 1:
+                retries[func_name] = retries.get(func_name, 0) + attempts - 1
+    return retries
+
+
+class SessionStore:
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = 24 * 3600, max_sessions: int = 100000,
+                 evict_every: int = 100, clock: Callable[[], float] = time.time):
+        """
+        path:         SQLite file shared by the workers (":memory:" for a private in-process store)
+        ttl:          seconds without activity after which a session is evicted
+        max_sessions: sessions kept on disk; the least recently active go first
+        evict_every:  checkpoints between eviction passes
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.evict_every = evict_every
+        self._clock = clock
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._since_eviction = 0
+        self.checkpoints = 0
+        self.messages_written = 0
+        self.resumes = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY, status TEXT NOT NULL, message_count INTEGER NOT NULL,"
+                " facts TEXT NOT NULL, retries TEXT NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,"
+                " seq INTEGER NOT NULL, message TEXT NOT NULL, PRIMARY KEY (session_id, seq))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def checkpoint(self, session_id: str, messages: List[dict]) -> int:
+        """Persist messages (the session's full history so far); returns how many were new"""
+        now = self._clock()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT message_count, retries FROM sessions WHERE session_id = ?",
+                             (session_id,)).fetchone()
+            stored, retries = (row[0], json.loads(row[1])) if row else (0, {})
+            new = messages[stored:]
+            retries = retry_state(new, retries)
+            facts = SOPEngine.extract_facts(messages)
+            db.execute("BEGIN")
+            try:
+                db.execute(
+                    "INSERT INTO sessions (session_id, status, message_count, facts, retries, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (session_id) DO UPDATE SET"
+                    " status = excluded.status, message_count = excluded.message_count, facts = excluded.facts,"
+                    " retries = excluded.retries, updated = excluded.updated",
+                    (session_id, OPEN, stored + len(new), _dumps(facts), _dumps(retries), now, now)
+                )
+                db.executemany("INSERT OR REPLACE INTO messages (session_id, seq, message) VALUES (?, ?, ?)",
+                               [(session_id, stored + i, _dumps(m)) for i, m in enumerate(new)])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self.checkpoints += 1
+            self.messages_written += len(new)
+            self._since_eviction += 1
+            if self._since_eviction >= self.evict_every:
+                self._since_eviction = 0
+                self._evict(db, now)
+        return len(new)
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """The stored session, or None if it is unknown or has expired"""
+        now = self._clock()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT status, facts, retries, updated FROM sessions WHERE session_id = ?",
+                             (session_id,)).fetchone()
+            if row is None:
+                return None
+            status, facts, retries, updated = row
+            if now - updated > self.ttl:
+                db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self.evictions += 1
+                return None
+            messages = [json.loads(m) for (m,) in db.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq", (session_id,))]
+        return SessionRecord(session_id, status, messages, json.loads(facts), json.loads(retries), updated)
+
+    def resumable(self, session_id: str) -> Optional[SessionRecord]:
+        """The stored session if it is still open and has history to resume from"""
+        record = self.load(session_id)
+        if record is None or record.status != OPEN or not record.messages:
+            return None
+        with self._lock:
+            self.resumes += 1
+        return record
+
+    def close_session(self, session_id: str):
+        """Mark a finished conversation; it is kept (not resumable) until evicted"""
+        with self._lock:
+            self._db().execute("UPDATE sessions SET status = ?, updated = ? WHERE session_id = ?",
+                               (CLOSED, self._clock(), session_id))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict(self) -> int:
+        """Drop idle and excess sessions now; returns how many were removed"""
+        with self._lock:
+            return self._evict(self._db(), self._clock())
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> int:
+        removed = db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,)).rowcount
+        size = db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if size > self.max_sessions:
+            removed += db.execute("DELETE FROM sessions WHERE session_id IN "
+                                  "(SELECT session_id FROM sessions ORDER BY updated LIMIT ?)",
+                                  (size - self.max_sessions,)).rowcount
+        self.evictions += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM sessions")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            sessions, messages = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(message_count), 0) FROM sessions").fetchone()
+            return {
+                "sessions": sessions,
+                "messages": messages,
+                "checkpoints": self.checkpoints,
+                "messages_written": self.messages_written,
+                "resumes": self.resumes,
+                "evictions": self.evictions,
+            }
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
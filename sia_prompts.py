@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional, Tuple
+
+from intake import classify_intent
+from token_count import count_text_tokens
+from tool_registry import ToolRegistry, match_function_call
+
+# --------------------------
+# Intent-scoped SIA system messages
+# --------------------------
+# The SIA prompt is assembled from a base section plus one module per flow.
+# Until the intent is known SIA gets every module (the original unified
+# prompt); once a conversation has committed to the listing or the brand
+# flow, only that module and its function formats are sent.
+
+INTENTS = ("listing", "brand")
+
+HEADERS = {
+    None: "You are a support assistant that can handle both listing-related queries and brand approval queries.",
+    "listing": "You are a support assistant handling a listing-related query.",
+    "brand": "You are a support assistant handling a brand approval query.",
+}
+
+LISTING_MODULE = """If the user wants listing help:
+   - Ask for user ID using: FUNCTION_CALL:get_user_status{"user_id": "$0"}
+   - After user status response:
+       • IF status is "active":
+         OUTPUT: "[message from response] Please provide listing ID."
+       • IF status is "onboarding":
+         OUTPUT: "[message from response] TERMINATING chat now. TERMINATE"
+       • IF status is "on_hold":
+         OUTPUT: "[message from response] Please provide listing ID."
+       • ELSE:
+         OUTPUT: "[message from response] Please provide listing ID."
+   - For listing ID input, use: FUNCTION_CALL:get_listing_status{"listing_id": "$0"}
+   - After listing status response:
+       • IF status is "active" or "inactive":
+         OUTPUT: "[message from response] Inform the user that their listing is active/inactive. TERMINATE"
+       • IF status is "blocked":
+         OUTPUT: "FUNCTION_CALL:create_support_ticket{"user_id": "$user_id", "listing_id": "$listing_id", "reason": "Reactivation requested"}"
+       • IF status is "archived":
+         OUTPUT: "[message from response] This listing is archived and cannot be reactivated. TERMINATE"
+       • IF status is "rfa":
+         OUTPUT: "[message from response] Your listing is pending approval. TERMINATE"
+       • IF status is "error" (with retry_needed false):
+         OUTPUT: "[message from response] Terminating conversation. Please try again later. TERMINATE\""""
+
+BRAND_MODULE = """If the user wants brand approval:
+   - Ask for the brand request ID using: FUNCTION_CALL:get_brand_approval_status{"request_id": "$0"}
+   - After brand approval status response:
+       • IF status is "approved":
+         OUTPUT: "[message from response] Your brand approval request is approved. TERMINATE"
+       • IF status is "in_progress" or "disapproved":
+           - IF timeline_hours <= 72:
+             OUTPUT: "[message from response] Please wait while your brand request is processed. TERMINATE"
+           - ELSE:
+             OUTPUT: "FUNCTION_CALL:create_support_ticket{"user_id": "$user_id", "listing_id": "N/A", "reason": "Brand approval follow-up", "request_id": "$request_id"}"
+   - After support ticket response for brand approval:
+       • IF status is "created":
+         OUTPUT: "[message from response] Support ticket $ticket_id created for brand approval. TERMINATE\""""
+
+MODULES = {"listing": LISTING_MODULE, "brand": BRAND_MODULE}
+
+BASE_RULES = [
+    "Always end the conversation with 'TERMINATE' if no further steps are needed.",
+    "Never re-issue a function call to retry it. The system retries failed lookups automatically "
+    "and only reports the final result.",
+]
+
+class PromptLibrary:
+    def __init__(self, tools: ToolRegistry):
+        self.tools = tools
+        self._prompts: Dict[Optional[str], str] = {}
+
+    def system_message(self, intent: Optional[str] = None) -> str:
+        """Assembled prompt for an intent (None = not yet known); built once per intent"""
+        prompt = self._prompts.get(intent)
+        if prompt is None:
+            prompt = self._prompts[intent] = self._assemble(intent)
+        return prompt
+
+    def _assemble(self, intent: Optional[str]) -> str:
+        modules: Tuple[str, ...] = INTENTS if intent is None else (intent,)
+        sections: List[str] = [MODULES[m] for m in modules]
+        sections.append("Use EXACT function call formats:\n" + self.tools.prompt_section(modules))
+        sections.extend(BASE_RULES)
+        body = "\n\n".join(f"{i}. {section}" for i, section in enumerate(sections, 1))
+        return f"\n{HEADERS[intent]}\nTEMPLATING AND STATUS COMMUNICATION:\n\n{body}\n\n"
+
+    def detect_intent(self, messages: List[dict]) -> Optional[str]:
+        """The flow this conversation has committed to, or None while it is open.
+
+        A function call from one module settles it; before any call, the
+        seller's own words are used when they mention only one flow.
+        """
+        called = set()
+        for m in messages:
+            if m.get("name") == "SIA":
+                matched = match_function_call(m.get("content") or "")
+                if matched and matched[0] in self.tools:
+                    module = self.tools.get(matched[0]).module
+                    if module:
+                        called.add(module)
+        if len(called) == 1:
+            return called.pop()
+        if called:
+            return None
+
+        return classify_intent(" ".join(m.get("content") or "" for m in messages if m.get("name") == "User"))
+
+    def token_report(self) -> Dict[str, int]:
+        """System-prompt tokens per flow"""
+        return {
+            (intent or "unified"): count_text_tokens(self.system_message(intent))
+            for intent in (None,) + INTENTS
+        }
+
+
+if __name__ == "__main__":
+    import main
+
+    report = main.sia_prompts.token_report()
+    unified = report["unified"]
+    print(f"{'flow':<10}{'system prompt tokens':>22}{'saving':>10}")
+    for flow, tokens in report.items():
+        print(f"{flow:<10}{tokens:>22}{(1 - tokens / unified):>10.0%}")
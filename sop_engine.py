@@ -0,0 +1,300 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from intake import analyze
+from tool_registry import match_function_call
+
+# --------------------------
+# Executable SIA Standard Operating Procedure
+# --------------------------
+# The SIA system message in main.py is a decision table keyed on the last tool
+# result. SOPEngine runs that table locally so routing turns ("blocked ->
+# ticket", "timeline_hours > 72 -> ticket") never reach the LLM. Anything the
+# table does not cover returns None and falls back to the LLM.
+#
+# With a TemplateRenderer, terminal outcomes are answered with the matching
+# templates.TEMPLATES text instead of echoing the tool's message.
+#
+# IDs the seller states in their own words (intake.analyze) are facts too:
+# an opener carrying the seller and listing IDs goes straight to the lookups,
+# and a bare ID answering SIA's request for one is routed without the LLM.
+
+# A lone token counts as an ID only if it has a digit (12345, FSN123..., BR-1003),
+# so answers like "why" or "no" still go to the LLM
+BARE_ID_PATTERN = re.compile(r'^\s*((?=[A-Za-z_-]*\d)[A-Za-z0-9_-]+)\s*\.?\s*$')
+
+LISTING_ID_PROMPT = "Please provide listing ID."
+BRAND_TIMELINE_LIMIT_HOURS = 72
+ID_FIELDS = ("user_id", "listing_id", "request_id")
+
+# What SIA's last prompt asked the seller for, so a bare ID reply can be routed
+ASKED_FOR = {
+    "user_id": re.compile(r"\b(?:user|seller|account)\s*id\b", re.IGNORECASE),
+    "request_id": re.compile(r"\b(?:brand\s+)?request\s*id\b", re.IGNORECASE),
+}
+
+
+def format_function_call(func_name: str, params: Dict[str, Any]) -> str:
+    """Render a call in the exact FUNCTION_CALL format SIA is asked to use"""
+    return f"FUNCTION_CALL:{func_name}{json.dumps(params, ensure_ascii=False)}"
+
+
+def parse_function_call(content: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Return (func_name, params) for a well-formed FUNCTION_CALL, else None"""
+    matched = match_function_call(content) if content else None
+    if matched is None:
+        return None
+    try:
+        params = json.loads(matched[1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(params, dict):
+        return None
+    return matched[0], params
+
+
+class SOPEngine:
+    def __init__(self, renderer=None, locale: str = "en"):
+        """renderer: optional template_renderer.TemplateRenderer for terminal replies"""
+        self.renderer = renderer
+        self.locale = locale
+        self.llm_calls_avoided = 0
+        self.llm_calls = 0
+        self.template_replies = 0
+        self._handlers = {
+            "get_user_status": self._after_user_status,
+            "get_listing_status": self._after_listing_status,
+            "get_brand_approval_status": self._after_brand_status,
+            "create_support_ticket": self._after_support_ticket,
+            "get_listing_status_batch": self._after_listing_batch,
+            "get_listing_diagnostics": self._after_listing_batch,
+        }
+
+    def reset(self):
+        """Start counting for a new conversation"""
+        self.llm_calls_avoided = 0
+        self.llm_calls = 0
+        self.template_replies = 0
+
+    def stats(self) -> dict:
+        return {"llm_calls_avoided": self.llm_calls_avoided, "llm_calls": self.llm_calls,
+                "template_replies": self.template_replies}
+
+    def _terminal(self, rendered: Optional[str], fallback: Optional[str]) -> Optional[str]:
+        """Template text closed with TERMINATE, or the SOP's own text when nothing was rendered"""
+        if rendered is None:
+            return fallback
+        self.template_replies += 1
+        return f"{rendered}\nTERMINATE"
+
+    def next_reply(self, messages: List[dict]) -> Optional[str]:
+        """Next SIA message for this history, or None if the LLM is needed"""
+        if not messages:
+            return None
+        last = messages[-1]
+        sender = last.get("name", "")
+        content = last.get("content") or ""
+
+        if sender == "FunctionExecutor":
+            reply = self._after_tool_result(messages, content)
+        elif sender == "User":
+            reply = self._after_user_text(messages, content)
+        else:
+            reply = None
+
+        if reply is None:
+            self.llm_calls += 1
+        else:
+            self.llm_calls_avoided += 1
+        return reply
+
+    # --------------------------
+    # Conversation facts
+    # --------------------------
+    @staticmethod
+    def extract_facts(messages: List[dict]) -> dict:
+        """Collect IDs and the latest SIA function call from the history"""
+        facts: Dict[str, Any] = {}
+        for m in messages:
+            content = m.get("content") or ""
+            if m.get("name") == "User":
+                stated = analyze(content)
+                facts.update(stated.ids())
+                if stated.intent:
+                    facts["intent"] = stated.intent
+            elif m.get("name") == "SIA":
+                call = parse_function_call(content)
+                if call:
+                    func_name, params = call
+                    facts["last_call"] = func_name
+                    facts["last_params"] = params
+                    calls = facts.setdefault("calls", [])
+                    if func_name not in calls:
+                        calls.append(func_name)
+                    for field in ID_FIELDS:
+                        if params.get(field) not in (None, "", "N/A"):
+                            facts[field] = params[field]
+            elif m.get("name") == "FunctionExecutor":
+                try:
+                    result = json.loads(content)
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                if isinstance(result, dict):
+                    for field in ID_FIELDS:
+                        if result.get(field) not in (None, "", "N/A"):
+                            facts[field] = result[field]
+                    if result.get("block_reason"):
+                        facts["block_reason"] = result["block_reason"]
+        return facts
+
+    # --------------------------
+    # Decision table: tool results
+    # --------------------------
+    def _after_tool_result(self, messages: List[dict], content: str) -> Optional[str]:
+        try:
+            result = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        if not isinstance(result, dict):
+            return None
+
+        facts = self.extract_facts(messages[:-1])
+        handler = self._handlers.get(facts.get("last_call"))
+        if handler is None:
+            return None
+        return handler(result, facts)
+
+    def _backend_error(self, result: dict) -> Optional[str]:
+        """Final reply for a lookup that failed for good (e.g. its backend's breaker is open)"""
+        if result.get("status") != "error" or result.get("retry_needed", False):
+            return None
+        rendered = self.renderer.render("ERROR_API_FAILURE", self.locale) if self.renderer else None
+        return self._terminal(rendered, f"{result.get('message', '')} Please try again later. TERMINATE")
+
+    def _after_user_status(self, result: dict, facts: dict) -> Optional[str]:
+        status = result.get("status")
+        message = result.get("message", "")
+        if status == "error":
+            return self._backend_error(result)
+        if status == "onboarding":
+            rendered = self.renderer.for_user_status(result, self.locale) if self.renderer else None
+            return self._terminal(rendered, f"{message} TERMINATING chat now. TERMINATE")
+        if facts.get("listing_id") and "get_listing_status" not in facts.get("calls", ()):
+            # The seller already named the listing
+            return format_function_call("get_listing_status", {"listing_id": facts["listing_id"]})
+        if not message:
+            return None
+        return f"{message} {LISTING_ID_PROMPT}"
+
+    def _after_listing_status(self, result: dict, facts: dict) -> Optional[str]:
+        status = result.get("status")
+        message = result.get("message", "")
+        listing_id = result.get("listing_id") or facts.get("listing_id")
+        rendered = None
+        if self.renderer is not None and status != "blocked":
+            rendered = self.renderer.for_listing_status(result, self.locale, listing_id=listing_id)
+        if status in ("active", "inactive"):
+            return self._terminal(rendered, f"{message} TERMINATE")
+        if status == "blocked":
+            if not (listing_id and facts.get("user_id")):
+                return None
+            return format_function_call("create_support_ticket", {
+                "user_id": facts["user_id"],
+                "listing_id": listing_id,
+                "reason": "Reactivation requested"
+            })
+        if status == "archived":
+            return self._terminal(rendered, f"{message} This listing is archived and cannot be reactivated. TERMINATE")
+        if status == "rfa":
+            return self._terminal(rendered, f"{message} Your listing is pending approval. TERMINATE")
+        if status == "error" and not result.get("retry_needed", False):
+            return self._terminal(rendered, f"{message} Terminating conversation. Please try again later. TERMINATE")
+        return None
+
+    def _after_brand_status(self, result: dict, facts: dict) -> Optional[str]:
+        status = result.get("status")
+        message = result.get("message", "")
+        if status == "error":
+            return self._backend_error(result)
+        if status == "approved":
+            return f"{message} Your brand approval request is approved. TERMINATE"
+        if status in ("in_progress", "disapproved"):
+            timeline_hours = result.get("timeline_hours")
+            if not isinstance(timeline_hours, (int, float)):
+                return None
+            if timeline_hours <= BRAND_TIMELINE_LIMIT_HOURS:
+                return f"{message} Please wait while your brand request is processed. TERMINATE"
+            return format_function_call("create_support_ticket", {
+                "user_id": facts.get("user_id", "N/A"),
+                "listing_id": "N/A",
+                "reason": "Brand approval follow-up",
+                "request_id": facts.get("request_id", "N/A")
+            })
+        return None
+
+    def _after_support_ticket(self, result: dict, facts: dict) -> Optional[str]:
+        if result.get("status") != "created":
+            return None
+        message = result.get("message", "")
+        ticket_id = result.get("ticket_id", "")
+        listing_id = facts.get("last_params", {}).get("listing_id")
+        if listing_id == "N/A":
+            return f"{message} Support ticket {ticket_id} created for brand approval. TERMINATE"
+        rendered = None
+        if self.renderer is not None and facts.get("block_reason"):
+            rendered = self.renderer.for_listing_status(
+                {"status": "blocked", "listing_id": listing_id}, self.locale,
+                block_reason=facts["block_reason"], ticket_id=ticket_id
+            )
+        return self._terminal(rendered, f"{message} Support ticket {ticket_id} created. TERMINATE")
+
+    def _after_listing_batch(self, result: dict, facts: dict) -> Optional[str]:
+        # One section per listing; any listing without a template or message goes to the LLM
+        results = result.get("results")
+        if self.renderer is None or not isinstance(results, dict) or not results:
+            return None
+        sections = []
+        for listing_id, item in results.items():
+            text = self.renderer.for_listing_status(item, self.locale, listing_id=listing_id) or item.get("message")
+            if not text:
+                return None
+            sections.append(f"Listing {listing_id}:\n{text}")
+        return self._terminal("\n\n".join(sections), None)
+
+    # --------------------------
+    # Decision table: seller text
+    # --------------------------
+    def _after_user_text(self, messages: List[dict], content: str) -> Optional[str]:
+        # A bare ID answering SIA's own request for one, or a message that
+        # states the IDs the flow needs; anything else is free text for the LLM.
+        sia_msgs = [m for m in messages[:-1] if m.get("name") == "SIA"]
+        prompt = (sia_msgs[-1].get("content") or "").rstrip() if sia_msgs else ""
+        match = BARE_ID_PATTERN.match(content)
+        if match and prompt:
+            bare_id = match.group(1)
+            if prompt.endswith(LISTING_ID_PROMPT):
+                return format_function_call("get_listing_status", {"listing_id": bare_id})
+            asked = [field for field, pattern in ASKED_FOR.items() if pattern.search(prompt)]
+            if asked == ["user_id"]:
+                return format_function_call("get_user_status", {"user_id": bare_id})
+            if asked == ["request_id"]:
+                return format_function_call("get_brand_approval_status", {"request_id": bare_id})
+            return None
+
+        stated = analyze(content)
+        if not stated.ids():
+            return None
+        facts = self.extract_facts(messages)
+        calls = facts.get("calls", [])
+        intent = stated.intent or facts.get("intent")
+        if intent == "brand":
+            if facts.get("request_id") and "get_brand_approval_status" not in calls:
+                return format_function_call("get_brand_approval_status", {"request_id": facts["request_id"]})
+            return None
+        if intent == "listing" or stated.user_id:
+            if facts.get("user_id") and "get_user_status" not in calls:
+                return format_function_call("get_user_status", {"user_id": facts["user_id"]})
+            if facts.get("listing_id") and "get_user_status" in calls and "get_listing_status" not in calls:
+                return format_function_call("get_listing_status", {"listing_id": facts["listing_id"]})
+        return None
\ No newline at end of file
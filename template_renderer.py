@@ -0,0 +1,140 @@
+import string
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from seller_api import SellerAPIError
+from templates import TEMPLATES
+
+# --------------------------
+# Zero-LLM replies from templates.TEMPLATES
+# --------------------------
+# Terminal tool results (listing active/inactive/archived/blocked, lookups that
+# failed for good, onboarding accounts) map to a fixed seller-facing template.
+# Templates are dedented and their placeholders parsed once at start-up;
+# rendered texts are cached per (locale, template, fields). Results without a
+# template return None and the caller falls back to the SOP text or the LLM.
+
+DEFAULT_LOCALE = "en"
+
+# locale -> template catalog; locales without a template fall back to DEFAULT_LOCALE
+CATALOGS: Dict[str, Dict[str, str]] = {DEFAULT_LOCALE: TEMPLATES}
+
+USER_STATUS_TEMPLATES = {"onboarding": "ONBOARDING_EDUCATION"}
+LISTING_STATUS_TEMPLATES = {
+    "active": "ACTIVE_LISTING",
+    "inactive": "INACTIVE_LISTING",
+    "archived": "ARCHIVED_LISTING",
+    "blocked": "BLOCKED_LISTING",
+    "error": "ERROR_API_FAILURE",
+}
+TRADEMARK_REASONS = ("TRADEMARK", "BRAND")
+
+
+class CompiledTemplate(NamedTuple):
+    text: str
+    fields: Tuple[str, ...]
+
+
+def compile_template(raw: str) -> CompiledTemplate:
+    text = textwrap.dedent(raw).strip()
+    fields = tuple(name for _, name, _, _ in string.Formatter().parse(text) if name)
+    return CompiledTemplate(text, fields)
+
+
+class TemplateRenderer:
+    def __init__(self, catalogs: Optional[Dict[str, Dict[str, str]]] = None, api_handler=None,
+                 maxsize: int = 1024):
+        """
+        catalogs:    locale -> {template name: template text}
+        api_handler: FlipkartAPIHandler used for block reasons / overrides the tool result lacks
+        """
+        self.api_handler = api_handler
+        self.maxsize = maxsize
+        self._compiled = {
+            locale: {name: compile_template(raw) for name, raw in catalog.items()}
+            for locale, catalog in (catalogs or CATALOGS).items()
+        }
+        self._rendered: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def template(self, name: str, locale: str = DEFAULT_LOCALE) -> Optional[CompiledTemplate]:
+        catalog = self._compiled.get(locale) or {}
+        return catalog.get(name) or self._compiled.get(DEFAULT_LOCALE, {}).get(name)
+
+    def render(self, name: str, locale: str = DEFAULT_LOCALE, **fields: Any) -> Optional[str]:
+        """Filled-in template text, or None if the template or one of its fields is missing"""
+        compiled = self.template(name, locale)
+        if compiled is None or any(f not in fields for f in compiled.fields):
+            return None
+        key = (locale, name) + tuple(str(fields[f]) for f in compiled.fields)
+        with self._lock:
+            text = self._rendered.get(key)
+            if text is not None:
+                self._rendered.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = compiled.text.format_map({f: fields[f] for f in compiled.fields})
+        with self._lock:
+            self._rendered[key] = text
+            while len(self._rendered) > self.maxsize:
+                self._rendered.popitem(last=False)
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._rendered)}
+
+    # --------------------------
+    # Tool result -> template
+    # --------------------------
+    def for_user_status(self, result: dict, locale: str = DEFAULT_LOCALE) -> Optional[str]:
+        name = USER_STATUS_TEMPLATES.get(result.get("status"))
+        return self.render(name, locale) if name else None
+
+    def for_listing_status(self, result: dict, locale: str = DEFAULT_LOCALE,
+                           listing_id: Optional[str] = None, block_reason: Optional[str] = None,
+                           ticket_id: Optional[str] = None) -> Optional[str]:
+        status = result.get("status")
+        name = LISTING_STATUS_TEMPLATES.get(status)
+        if name is None or (status == "error" and result.get("retry_needed")):
+            return None
+        if status != "blocked":
+            return self.render(name, locale)
+
+        listing_id = result.get("listing_id") or listing_id
+        reason = result.get("block_reason") or block_reason
+        try:
+            if not reason and self.api_handler is not None and listing_id:
+                reason = self.api_handler.get_block_reason(listing_id).get("reason")
+            if not reason:
+                return None
+            if any(marker in reason.upper() for marker in TRADEMARK_REASONS):
+                return self.render("BRAND_TRADEMARK_ISSUE", locale)
+            override_status = self._override_status(result, listing_id)
+        except SellerAPIError:
+            # Backend down (or its breaker open) while filling in the details
+            return self.render(LISTING_STATUS_TEMPLATES["error"], locale)
+        return self.render(
+            name, locale,
+            reason=reason.replace("_", " ").lower(),
+            override_status=override_status,
+            next_steps=(f"Support ticket {ticket_id} has been raised to reactivate the listing."
+                        if ticket_id else "Raise a support ticket to request reactivation.")
+        )
+
+    def _override_status(self, result: dict, listing_id: Optional[str]) -> str:
+        if "override_count" in result:
+            overrides, count = result.get("overrides") or [], result["override_count"]
+        elif self.api_handler is not None and listing_id:
+            override = self.api_handler.get_override_status(listing_id)
+            overrides, count = override.get("overrides") or [], override.get("count", 0)
+        else:
+            return "unknown"
+        if not count:
+            return "no override available"
+        return f"{count} override(s) available ({', '.join(overrides)})"
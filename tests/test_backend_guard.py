@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from backend_guard import CLOSED, HALF_OPEN, OPEN, BackendGuard, CircuitOpenError, GuardedTransport
+from seller_api import SellerAPIError, SimulatedTransport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _guard(clock):
+    return BackendGuard(min_calls=4, window=4, failure_ratio=0.5, open_seconds=10.0, clock=clock)
+
+
+def _fail(endpoint="get_listing_status"):
+    raise SellerAPIError(endpoint, "HTTP 503", 503)
+
+
+def test_breaker_opens_then_lets_one_trial_through_and_closes():
+    clock = FakeClock()
+    guard = _guard(clock)
+    for _ in range(4):
+        with pytest.raises(SellerAPIError):
+            guard.call("get_listing_status", None, _fail)
+    breaker = guard.breaker("get_listing_status")
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        guard.call("get_listing_status", None, lambda: calls.append(1))
+    assert not calls  # failed fast, backend untouched
+
+    clock.now += 10.0
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert guard.call("get_listing_status", None, lambda: {"status": "active"}) == {"status": "active"}
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    guard = _guard(clock)
+    for _ in range(4):
+        with pytest.raises(SellerAPIError):
+            guard.call("get_listing_status", None, _fail)
+    clock.now += 10.0
+    with pytest.raises(SellerAPIError):
+        guard.call("get_listing_status", None, _fail)
+    breaker = guard.breaker("get_listing_status")
+    assert breaker.state == OPEN and breaker.times_opened == 2
+
+
+class BlockingTransport(SimulatedTransport):
+    """Holds every call until released, counting how many reach the backend"""
+
+    def __init__(self, error=None):
+        super().__init__()
+        self.error = error
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def call(self, endpoint, params):
+        self.calls += 1
+        self.entered.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return super().call(endpoint, params)
+
+
+def _concurrent(transport, callers=8):
+    guarded = GuardedTransport(transport)
+    outcomes = []
+    lock = threading.Lock()
+
+    def caller():
+        try:
+            result = guarded.call("get_listing_status", {"listing_id": "1002"})
+        except Exception as e:
+            result = e
+        with lock:
+            outcomes.append(result)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    threads[0].start()
+    assert transport.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Let the followers reach the in-flight call before the leader finishes
+    while guarded.guard.flight.stats()["coalesced"] < callers - 1:
+        time.sleep(0.001)
+    transport.release.set()
+    for thread in threads:
+        thread.join(5)
+    return guarded, outcomes
+
+
+def test_concurrent_identical_calls_share_one_backend_call():
+    transport = BlockingTransport()
+    guarded, outcomes = _concurrent(transport)
+    assert transport.calls == 1
+    assert len(outcomes) == 8 and all(r["status"] == "blocked" for r in outcomes)
+    assert guarded.guard.flight.stats() == {"leaders": 1, "coalesced": 7}
+
+
+def test_error_reaches_every_waiter():
+    error = SellerAPIError("get_listing_status", "HTTP 503", 503)
+    transport = BlockingTransport(error)
+    _, outcomes = _concurrent(transport)
+    assert transport.calls == 1
+    assert len(outcomes) == 8 and all(r is error for r in outcomes)
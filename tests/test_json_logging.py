@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+
+import pytest
+
+import json_logging
+
+
+def _report_listener(results):
+    listener = json_logging._listener
+    results.put((listener is not None, listener is not None and listener._thread.is_alive()))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_runs_its_own_listener():
+    json_logging.configure_logging()
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_report_listener, args=(results,))
+    child.start()
+    assert results.get(timeout=10) == (True, True)
+    child.join(10)
@@ -0,0 +1,22 @@
+import json
+
+from completion_cache import make_key
+from model_router import ModelRouter, ModelTier
+
+TIERS = [ModelTier("mini", [{"model": "small-model"}]), ModelTier("full", [{"model": "large-model"}])]
+FREE_TEXT = [{"role": "user", "name": "User", "content": "12345"}]
+TOOL_RESULT = FREE_TEXT + [{"role": "user", "name": "FunctionExecutor",
+                            "content": json.dumps({"status": "active", "user_id": "12345"})}]
+
+
+def test_model_for_names_the_routed_tier():
+    router = ModelRouter(TIERS, {"tool_result": "mini", "free_text": "full"})
+    assert router.model_for(FREE_TEXT) == "full:large-model"
+    assert router.model_for(TOOL_RESULT) == "mini:small-model"
+
+
+def test_completion_key_changes_with_the_route():
+    cheap = ModelRouter(TIERS, {"free_text": "mini"})
+    strong = ModelRouter(TIERS, {"free_text": "full"})
+    assert make_key(cheap.model_for(FREE_TEXT), "SIA", FREE_TEXT) != \
+        make_key(strong.model_for(FREE_TEXT), "SIA", FREE_TEXT)
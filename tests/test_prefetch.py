@@ -0,0 +1,26 @@
+from prefetch import predict_lookups
+
+
+def test_predicts_the_lookup_a_known_id_still_needs_while_the_seller_answers():
+    messages = [
+        {"role": "user", "name": "User", "content": "My listing 1002 is not visible"},
+        {"role": "assistant", "name": "SIA", "content": "Please share your user ID."},
+    ]
+    assert predict_lookups(messages) == [("get_listing_status", {"listing_id": "1002"})]
+
+
+def test_nothing_to_predict_once_the_ids_were_looked_up():
+    messages = [
+        {"role": "user", "name": "User", "content": "1001"},
+        {"role": "assistant", "name": "SIA", "content": 'FUNCTION_CALL:get_user_status{"user_id": "1001"}'},
+        {"role": "user", "name": "FunctionExecutor", "content": '{"status": "active", "user_id": "1001"}'},
+        {"role": "assistant", "name": "SIA", "content": "Please share your listing ID."},
+    ]
+    assert predict_lookups(messages) == []
+
+
+def test_after_the_sellers_answer_only_the_lookups_behind_the_sops_own_call_are_predicted():
+    messages = [{"role": "user", "name": "User",
+                 "content": "listing FSN123456789012 is blocked, my seller id is 1234"}]
+    # The SOP calls get_user_status for this message itself; the listing lookup comes after it
+    assert predict_lookups(messages) == [("get_listing_status", {"listing_id": "FSN123456789012"})]
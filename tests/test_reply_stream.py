@@ -0,0 +1,34 @@
+from reply_stream import FUNCTION_CALL, TEXT, ReplyScanner
+
+
+def _feed(chunks):
+    scanner = ReplyScanner()
+    shown = "".join(scanner.feed(chunk) for chunk in chunks)
+    return scanner, shown
+
+
+def test_terminate_mid_reply_keeps_the_rest_of_the_text():
+    chunks = ["Reply TERMINATE if done, ", "otherwise tell me your listing ID."]
+    scanner, shown = _feed(chunks)
+    shown += scanner.finish()
+    assert not scanner.complete and scanner.kind == TEXT
+    assert scanner.reply == shown == "".join(chunks)
+
+
+def test_terminate_at_end_of_stream_is_kept_with_trailing_whitespace():
+    scanner, shown = _feed(["Ticket raised. ", "TERMINATE", "\n"])
+    shown += scanner.finish()
+    assert scanner.reply == shown == "Ticket raised. TERMINATE\n"
+    assert scanner.reply.rstrip().endswith("TERMINATE")
+
+
+def test_finish_emits_text_held_back_as_a_possible_function_call():
+    scanner, shown = _feed(["FUNCTION"])
+    assert shown == "" and scanner.kind is None
+    assert scanner.finish() == "FUNCTION" and scanner.kind == TEXT
+
+
+def test_function_call_is_never_shown():
+    scanner, shown = _feed(['FUNCTION_CALL:get_user_status{"user_id": ', '"123"}', " trailing"])
+    assert scanner.complete and scanner.kind == FUNCTION_CALL and shown == ""
+    assert scanner.reply == 'FUNCTION_CALL:get_user_status{"user_id": "123"}'
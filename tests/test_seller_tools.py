@@ -0,0 +1,65 @@
+import main
+from flipkart_api_handler import FlipkartAPIHandler
+from result_cache import TTLCache
+from seller_api import SellerAPIError, SimulatedTransport
+
+
+class RecordingTransport(SimulatedTransport):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def call(self, endpoint, params):
+        self.calls.append((endpoint, params))
+        return super().call(endpoint, params)
+
+
+def _use_transport(monkeypatch, transport):
+    monkeypatch.setattr(main, "api_handler", FlipkartAPIHandler(cache=TTLCache({}), transport=transport))
+
+
+def test_status_tools_call_the_seller_api(monkeypatch):
+    transport = RecordingTransport()
+    _use_transport(monkeypatch, transport)
+    assert main.tools.dispatch("get_user_status", {"user_id": "12345"})["status"] == "active"
+    assert main.tools.dispatch("get_listing_status", {"listing_id": "LST-2"})["status"] == "blocked"
+    assert main.tools.dispatch("get_brand_approval_status", {"request_id": "BR-1002"})["status"] == "in_progress"
+    assert [endpoint for endpoint, _ in transport.calls] == [
+        "get_user_status", "get_listing_status", "get_brand_approval_status"]
+
+
+def test_seller_api_failure_is_retried(monkeypatch):
+    class DownTransport(SimulatedTransport):
+        def call(self, endpoint, params):
+            raise SellerAPIError(endpoint, "connection refused")
+
+    _use_transport(monkeypatch, DownTransport())
+    result = main.tools.dispatch("get_listing_status", {"listing_id": "LST-1"})
+    assert result["status"] == "retrying" and result["auto_retry"]
+    assert result["listing_id"] == "LST-1"
+
+
+def test_listing_diagnostics_is_one_request_with_per_listing_errors(monkeypatch):
+    transport = RecordingTransport()
+    _use_transport(monkeypatch, transport)
+    monkeypatch.setattr(main, "result_cache", TTLCache({"listing_diagnostics": 30}))
+    batch = main.tools.dispatch("get_listing_diagnostics", {"listing_ids": ["LST-2", "5003", "LST-0"]})
+    assert [endpoint for endpoint, _ in transport.calls] == ["get_listing_diagnostics"]
+    assert batch["results"]["LST-2"]["block_reason"] == "SELLER_STATE_CHANGE"
+    assert batch["results"]["LST-0"]["status"] == "active"
+    assert batch["pending_ids"] == ["5003"] and batch["auto_retry"]
+
+    # The executor's next attempt only asks again for the listing that failed
+    main.tools.dispatch("get_listing_diagnostics", {"listing_ids": ["LST-2", "5003", "LST-0"]})
+    assert transport.calls[-1] == ("get_listing_diagnostics", {"listing_ids": ["5003"]})
+
+
+def test_listing_diagnostics_backend_failure_is_retried(monkeypatch):
+    class DownTransport(SimulatedTransport):
+        def call(self, endpoint, params):
+            raise SellerAPIError(endpoint, "connection refused")
+
+    _use_transport(monkeypatch, DownTransport())
+    monkeypatch.setattr(main, "result_cache", TTLCache({"listing_diagnostics": 30}))
+    batch = main.tools.dispatch("get_listing_diagnostics", {"listing_ids": ["LST-1", "LST-2"]})
+    assert batch["status"] == "retrying" and batch["pending_ids"] == ["LST-1", "LST-2"]
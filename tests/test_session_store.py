@@ -0,0 +1,113 @@
+import asyncio
+import logging
+
+import pytest
+
+import session_server
+from async_llm import AsyncLLMClient
+from benchmarks.bench_scenarios import NO_WAIT_RETRY_POLICY
+from benchmarks.stub_llm import StubLLM
+from session_server import SellerSession
+from session_store import CLOSED, OPEN, SessionStore
+
+OPENING = "I need help with my brand approval"
+HISTORY = [
+    {"name": "User", "role": "user", "content": OPENING},
+    {"name": "SIA", "role": "assistant", "content": "Please share your brand request ID."},
+]
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def llm():
+    with StubLLM() as stub:
+        yield stub
+
+
+def _session(store, llm, idle_timeout):
+    agent_options = {"llm_config": llm.llm_config(), "llm_client": AsyncLLMClient(llm.config_list()),
+                     "retry_policy": NO_WAIT_RETRY_POLICY, "completion_cache": None}
+    return SellerSession("S-1", store, idle_timeout=idle_timeout, agent_options=agent_options)
+
+
+def _contents(messages):
+    return [(m["name"], m["content"]) for m in messages]
+
+
+def test_checkpoint_writes_only_new_messages_and_reloads(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SessionStore(path)
+    assert store.checkpoint("S-1", HISTORY[:1]) == 1
+    assert store.checkpoint("S-1", HISTORY) == 1
+    store.close()
+
+    record = SessionStore(path).resumable("S-1")
+    assert record.status == OPEN and _contents(record.messages) == _contents(HISTORY)
+
+
+def test_closed_session_is_never_resumed(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SessionStore(path)
+    store.checkpoint("S-1", HISTORY)
+    store.close_session("S-1")
+    store.close()
+
+    fresh = SessionStore(path)
+    assert fresh.resumable("S-1") is None
+    assert fresh.load("S-1").status == CLOSED and fresh.stats()["resumes"] == 0
+
+
+def test_suspended_session_resumes_from_a_fresh_store(tmp_path, llm):
+    path = str(tmp_path / "sessions.sqlite3")
+
+    async def suspend():
+        session = _session(SessionStore(path), llm, idle_timeout=0.1)
+        task = asyncio.create_task(session.run(OPENING))
+        assert await session.receive(5) == HISTORY[-1]["content"]
+        await task
+        assert session.suspended
+        session.store.close()
+
+    asyncio.run(suspend())
+
+    store = SessionStore(path)
+    record = store.resumable("S-1")
+    assert record is not None and _contents(record.messages) == _contents(HISTORY)
+
+    handler = RecordingHandler()
+    session_server.logger.addHandler(handler)
+
+    async def resume():
+        session = _session(store, llm, idle_timeout=5)
+        task = asyncio.create_task(session.run(OPENING, record))
+        session.send("BR-1002")
+        replies = []
+        while (reply := await session.receive(5)) is not None:
+            replies.append(reply)
+        await task
+        return session, replies
+
+    try:
+        session, replies = asyncio.run(resume())
+    finally:
+        session_server.logger.removeHandler(handler)
+
+    # Nothing was replayed: the resumed chat carried on from the seller's answer
+    assert session.resumed_messages == len(HISTORY) and not session.suspended
+    assert "in progress" in replies[-1]
+    messages = store.load("S-1").messages
+    assert _contents(messages[:len(HISTORY)]) == _contents(HISTORY)
+    assert messages[len(HISTORY)]["content"] == "BR-1002"
+
+    # The ended session is closed before it is reported, and never resumed again
+    finished = [r for r in handler.records if r.getMessage() == "session finished"]
+    assert len(finished) == 1 and finished[0].data["closed"]
+    assert store.resumable("S-1") is None and store.load("S-1").status == CLOSED
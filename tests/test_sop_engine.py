@@ -0,0 +1,28 @@
+import pytest
+
+from sop_engine import LISTING_ID_PROMPT, SOPEngine
+
+
+def _after_prompt(prompt: str, answer: str):
+    messages = [
+        {"name": "User", "role": "user", "content": "I need help"},
+        {"name": "SIA", "role": "assistant", "content": prompt},
+        {"name": "User", "role": "user", "content": answer},
+    ]
+    return SOPEngine().next_reply(messages)
+
+
+@pytest.mark.parametrize("prompt", [LISTING_ID_PROMPT, "Please share your user ID.",
+                                    "Please share your brand request ID."])
+@pytest.mark.parametrize("answer", ["why", "hello", "no", "help"])
+def test_words_after_an_id_prompt_go_to_the_llm(prompt, answer):
+    assert _after_prompt(prompt, answer) is None
+
+
+@pytest.mark.parametrize("prompt, answer, call", [
+    (LISTING_ID_PROMPT, "FSN123456789012", 'get_listing_status{"listing_id": "FSN123456789012"}'),
+    ("Please share your user ID.", "12345.", 'get_user_status{"user_id": "12345"}'),
+    ("Please share your brand request ID.", "BR-1003", 'get_brand_approval_status{"request_id": "BR-1003"}'),
+])
+def test_bare_ids_are_routed_without_the_llm(prompt, answer, call):
+    assert _after_prompt(prompt, answer) == "FUNCTION_CALL:" + call
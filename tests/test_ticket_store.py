@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+import pytest
+
+import main
+from sop_engine import SOPEngine, parse_function_call
+from ticket_store import TicketBacklogFull, TicketStore, ticket_key
+
+
+def _store(written):
+    return TicketStore(written.extend, flush_interval=0.01)
+
+
+def test_different_brand_requests_get_different_tickets():
+    written = []
+    store = _store(written)
+    first, created_first = store.create("N/A", "N/A", "Brand approval follow-up", request_id="BR-1003")
+    second, created_second = store.create("N/A", "N/A", "Brand approval follow-up", request_id="BR-2223")
+    assert created_first and created_second
+    assert first["ticket_id"] != second["ticket_id"]
+    assert store.flush(timeout=5)
+    assert {t["request_id"] for t in written} == {"BR-1003", "BR-2223"}
+    store.close()
+
+
+def test_same_brand_request_is_deduplicated():
+    store = _store([])
+    first, _ = store.create("N/A", "N/A", "Brand approval follow-up", request_id="BR-1003")
+    again, created = store.create("N/A", "N/A", "Brand approval follow-up", request_id="BR-1003")
+    assert not created
+    assert again["ticket_id"] == first["ticket_id"]
+    store.close()
+
+
+def test_tickets_without_any_id_are_never_deduplicated():
+    assert ticket_key("N/A", "N/A", "Brand approval follow-up") is None
+    store = _store([])
+    first, _ = store.create("N/A", "N/A", "Brand approval follow-up")
+    second, created = store.create("N/A", " ", "Brand approval follow-up")
+    assert created
+    assert first["ticket_id"] != second["ticket_id"]
+    store.close()
+
+
+def test_brand_follow_up_call_carries_the_request_id():
+    engine = SOPEngine()
+    tickets = []
+    for request_id in ("BR-1003", "BR-2223"):
+        messages = [
+            {"name": "User", "role": "user", "content": f"Brand approval status for {request_id}"},
+            {"name": "SIA", "role": "assistant",
+             "content": f'FUNCTION_CALL:get_brand_approval_status{{"request_id": "{request_id}"}}'},
+            {"name": "FunctionExecutor", "role": "user",
+             "content": json.dumps({"status": "disapproved", "message": "Rejected.", "timeline_hours": 96})},
+        ]
+        reply = engine.next_reply(messages)
+        func_name, params = parse_function_call(reply)
+        assert func_name == "create_support_ticket"
+        assert params["request_id"] == request_id
+        tickets.append(json.loads(main.execute_function_call(reply)))
+    assert tickets[0]["ticket_id"] != tickets[1]["ticket_id"]
+    assert not any(t["duplicate"] for t in tickets)
+
+
+def test_same_ticket_keeps_its_id_after_a_restart():
+    before, _ = _store([]).create("1001", "1002", "Reactivation request")
+    after, created = _store([]).create("1001", "1002", " reactivation  REQUEST")
+    assert created  # a fresh process has no index, but files it under the same ID
+    assert after["ticket_id"] == before["ticket_id"]
+
+
+def test_a_rejected_ticket_is_dead_lettered_without_holding_up_the_rest():
+    written = []
+
+    def write(batch):
+        if any(t["listing_id"] == "BAD" for t in batch):
+            raise ValueError("rejected")
+        written.extend(batch)
+
+    store = TicketStore(write, flush_interval=0.01, retry_delay=0.0, max_attempts=3)
+    bad, _ = store.create("1001", "BAD", "Reactivation request")
+    for listing_id in ("1002", "1003"):
+        store.create("1001", listing_id, "Reactivation request")
+    assert store.flush(timeout=5)
+    assert {t["listing_id"] for t in written} == {"1002", "1003"}
+    assert [t["ticket_id"] for t in store.dead_letters] == [bad["ticket_id"]]
+    assert store.get("1001", "BAD", "Reactivation request") is None
+    store.close()
+
+
+def test_create_fails_fast_when_the_backlog_is_full():
+    release = threading.Event()
+    store = TicketStore(lambda batch: release.wait(5), batch_size=1, flush_interval=0.0, max_pending=1)
+    store.create("1001", "1002", "Reactivation request")  # taken by the (stuck) writer
+    while store.stats()["in_flight"] != 1:
+        time.sleep(0.001)
+    store.create("1001", "1003", "Reactivation request")  # queued
+    with pytest.raises(TicketBacklogFull):
+        store.create("1001", "1004", "Reactivation request")
+    release.set()
+    store.close()
@@ -0,0 +1,285 @@
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from json_logging import get_logger
+from seller_api import new_ticket_id
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Idempotent support tickets with write-behind
+# --------------------------
+# A ticket is identified by (user_id, listing_id, request_id, reason): asking
+# again for the same one, from a repeated SIA turn, an executor retry or
+# another session, returns the ticket already filed (dict lookup, no backend
+# call). A ticket with no identifying ID at all (every ID missing or "N/A")
+# is never deduplicated, since it cannot be told apart from another
+# seller's. The ticket ID is derived from the key and the dedup window it
+# falls in, so a restarted process (or bulk_triage --resume) files the same
+# ticket under the same ID and the backend treats it as a resend.
+#
+# New tickets are queued; a writer thread sends them to the backend in
+# batches (a full batch or every flush_interval seconds), so a slow
+# ticketing backend never holds up the chat turn. Tickets from a failed
+# batch go to the back of the queue and are retried one at a time, so a
+# ticket the backend rejects cannot hold up the others; after max_attempts
+# failed writes it is moved to dead_letters.
+# When max_pending tickets are queued, create() raises TicketBacklogFull
+# instead of waiting.
+
+
+NO_ID = "N/A"
+
+
+class TicketKey(NamedTuple):
+    user_id: str
+    listing_id: str
+    request_id: str
+    reason: str
+
+
+def _id(value) -> str:
+    value = "" if value is None else str(value).strip()
+    return value or NO_ID
+
+
+class TicketBacklogFull(Exception):
+    """create() while max_pending tickets are still waiting to be written"""
+
+
+def derived_ticket_id(key: TicketKey, window: int) -> str:
+    """Stable ticket ID for key within dedup window number `window`"""
+    digest = hashlib.sha256(json.dumps([*key, window]).encode()).hexdigest()
+    return f"TKT-{digest[:12].upper()}"
+
+
+def ticket_key(user_id: str, listing_id: str, reason: str, request_id: Optional[str] = None) -> Optional[TicketKey]:
+    """Dedup key, or None when no ID identifies the ticket; reason is compared case- and whitespace-insensitively"""
+    key = TicketKey(_id(user_id), _id(listing_id), _id(request_id), " ".join(str(reason).split()).casefold())
+    if key.user_id == key.listing_id == key.request_id == NO_ID:
+        return None
+    return key
+
+
+class TicketStore:
+    def __init__(self, write_batch: Callable[[List[dict]], Any], batch_size: int = 50,
+                 flush_interval: float = 0.5, retry_delay: float = 1.0, max_attempts: int = 10,
+                 max_pending: int = 10000, max_entries: int = 100000, dedup_window: float = 24 * 3600,
+                 max_dead_letters: int = 1000, clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        """
+        write_batch:    sends a list of tickets (create_support_ticket params plus ticket_id) to the backend
+        batch_size:     most tickets per write
+        flush_interval: longest a queued ticket waits for its batch to fill
+        retry_delay:    seconds before a failed batch is retried
+        max_attempts:   writes of one ticket before it is given up on (dead-lettered)
+        max_pending:    queued tickets before create() raises TicketBacklogFull
+        max_entries:    tickets kept in the dedup index (oldest dropped first)
+        dedup_window:   seconds after which the same key files a new ticket
+        wall_clock:     time the ticket IDs' dedup windows are counted in (shared across restarts)
+        """
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.max_entries = max_entries
+        self.dedup_window = dedup_window
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._index: "OrderedDict[TicketKey, Tuple[float, dict]]" = OrderedDict()
+        self._pending: List[dict] = []
+        self._failed_writes: Dict[str, int] = {}  # ticket_id -> failed writes so far
+        self.dead_letters: "deque[dict]" = deque(maxlen=max_dead_letters)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._writer: Optional[threading.Thread] = None
+        self._closing = False
+        self._flush_requested = False
+        self.created = 0
+        self.duplicates = 0
+        self.written = 0
+        self.batches = 0
+        self.write_failures = 0
+        self.dead_lettered = 0
+
+    def create(self, user_id: str, listing_id: str, reason: str,
+               request_id: Optional[str] = None) -> Tuple[dict, bool]:
+        """(ticket, created); created is False when the same ticket was already filed.
+
+        Raises TicketBacklogFull while max_pending tickets are waiting to be written.
+        """
+        key = ticket_key(user_id, listing_id, reason, request_id)
+        with self._changed:
+            now = self._clock()
+            entry = self._index.get(key) if key is not None else None
+            if entry is not None and now - entry[0] < self.dedup_window:
+                self.duplicates += 1
+                return dict(entry[1]), False
+            if len(self._pending) >= self.max_pending:
+                raise TicketBacklogFull(f"{len(self._pending)} support tickets waiting to be written")
+            ticket_id = (derived_ticket_id(key, int(self._wall_clock() // self.dedup_window))
+                         if key is not None else new_ticket_id())
+            ticket = {"ticket_id": ticket_id, "user_id": user_id, "listing_id": listing_id, "reason": reason}
+            if _id(request_id) != NO_ID:
+                ticket["request_id"] = request_id
+            if key is not None:
+                self._index.pop(key, None)
+                self._index[key] = (now, ticket)
+            while self._index and (len(self._index) > self.max_entries
+                                   or now - next(iter(self._index.values()))[0] >= self.dedup_window):
+                self._index.popitem(last=False)
+            self._pending.append(ticket)
+            self.created += 1
+            self._changed.notify_all()
+        self._ensure_writer()
+        return dict(ticket), True
+
+    def get(self, user_id: str, listing_id: str, reason: str, request_id: Optional[str] = None) -> Optional[dict]:
+        key = ticket_key(user_id, listing_id, reason, request_id)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+        return dict(entry[1]) if entry is not None else None
+
+    # --------------------------
+    # Write-behind
+    # --------------------------
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None and not self._closing:
+                self._writer = threading.Thread(target=self._run, name="ticket-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _next_batch(self) -> Optional[List[dict]]:
+        with self._changed:
+            while not self._pending and not self._closing:
+                self._changed.wait()
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.batch_size and not (self._closing or self._flush_requested):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            if not self._pending:
+                return None
+            # A ticket whose write failed before goes alone, so it cannot fail anyone else's
+            size = 1 if self._pending[0]["ticket_id"] in self._failed_writes else self.batch_size
+            batch = self._pending[:size]
+            del self._pending[:size]
+            self._in_flight += len(batch)
+            self._changed.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                self._write_failed(batch, e)
+                continue
+            with self._changed:
+                self._in_flight -= len(batch)
+                self.written += len(batch)
+                self.batches += 1
+                for ticket in batch:
+                    self._failed_writes.pop(ticket["ticket_id"], None)
+                self._changed.notify_all()
+            logger.debug("wrote %d support tickets", len(batch))
+
+    def _write_failed(self, batch: List[dict], error: Exception):
+        with self._changed:
+            self.write_failures += 1
+            self._in_flight -= len(batch)
+            closing = self._closing
+            retry, dead = [], []
+            for ticket in batch:
+                failures = self._failed_writes.get(ticket["ticket_id"], 0) + 1
+                if closing or failures >= self.max_attempts:
+                    self._failed_writes.pop(ticket["ticket_id"], None)
+                    dead.append(ticket)
+                else:
+                    self._failed_writes[ticket["ticket_id"]] = failures
+                    retry.append(ticket)
+            # Behind the tickets still queued, which need not wait for these retries
+            self._pending.extend(retry)
+            for ticket in dead:
+                self._dead_letter(ticket)
+            self._changed.notify_all()
+        if dead:
+            logger.error("giving up on %d support tickets%s: %s", len(dead), " at shutdown" if closing else "",
+                         error, extra={"data": {"ticket_ids": [t["ticket_id"] for t in dead]}})
+        if retry:
+            logger.warning("support ticket batch failed, retrying in %.1fs: %s", self.retry_delay, error,
+                           extra={"data": {"tickets": len(retry)}})
+            time.sleep(self.retry_delay)
+
+    def _dead_letter(self, ticket: dict):
+        # Forget it in the dedup index too, so asking again files it again
+        key = ticket_key(ticket["user_id"], ticket["listing_id"], ticket["reason"], ticket.get("request_id"))
+        entry = self._index.get(key) if key is not None else None
+        if entry is not None and entry[1]["ticket_id"] == ticket["ticket_id"]:
+            del self._index[key]
+        self.dead_letters.append(ticket)
+        self.dead_lettered += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything queued now; True once nothing is pending or in flight"""
+        if self._writer is None:
+            return not self._pending
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            self._flush_requested = True
+            self._changed.notify_all()
+            try:
+                while self._pending or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._changed.wait(remaining)
+                return True
+            finally:
+                self._flush_requested = False
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer"""
+        if self._writer is None:
+            return
+        self.flush(timeout)
+        with self._changed:
+            self._closing = True
+            self._changed.notify_all()
+        self._writer.join(timeout)
+
+    def clear(self):
+        """Forget the dedup index; queued writes are kept"""
+        with self._lock:
+            self._index.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "created": self.created,
+                "duplicates": self.duplicates,
+                "pending": len(self._pending),
+                "in_flight": self._in_flight,
+                "written": self.written,
+                "batches": self.batches,
+                "write_failures": self.write_failures,
+                "dead_lettered": self.dead_lettered,
+                "index_size": len(self._index),
+            }
@@ -0,0 +1,49 @@
+from typing import List
+
+# --------------------------
+# Prompt token counting
+# --------------------------
+# Uses tiktoken when its encoding is available locally; offline hosts fall back
+# to the usual ~4 characters per token estimate so reports still compare
+# like with like.
+
+DEFAULT_MODEL = "gpt-4o-mini"
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY_PRIMING = 3
+
+_encodings = {}
+
+
+def _encoding(model: str):
+    if model not in _encodings:
+        try:
+            import tiktoken
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception:
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def is_exact(model: str = DEFAULT_MODEL) -> bool:
+    """False when counts are character-based estimates"""
+    return _encoding(model) is not None
+
+
+def count_text_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[dict], model: str = DEFAULT_MODEL) -> int:
+    """Prompt tokens for a chat completion request with these messages"""
+    total = TOKENS_PER_REPLY_PRIMING
+    for m in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_text_tokens(m.get("content") or "", model)
+        if m.get("name"):
+            total += count_text_tokens(m["name"], model)
+    return total
@@ -0,0 +1,166 @@
+import functools
+import inspect
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# --------------------------
+# Tool Registry: one source of truth for SIA's functions
+# --------------------------
+# Each tool is registered once from its Python signature. The registry owns
+# the FUNCTION_CALL pattern, validates and coerces arguments with validators
+# built at registration time, dispatches through a dict, and renders the
+# "EXACT function call formats" section of the SIA prompt.
+
+FUNCTION_CALL_PATTERN = re.compile(r'^\s*FUNCTION_CALL:(\w+)\s*(\{.*\})\s*$', re.DOTALL)
+
+
+class ToolCallError(Exception):
+    """A FUNCTION_CALL that cannot be executed as written"""
+
+
+@functools.lru_cache(maxsize=512)
+def match_function_call(content: str) -> Optional[Tuple[str, str]]:
+    """(func_name, raw params) for a FUNCTION_CALL message, else None.
+
+    Memoized: the executor, speaker selection and SOP engine all look at the
+    same message content, so the regex runs once per distinct message.
+    """
+    match = FUNCTION_CALL_PATTERN.search(content)
+    return match.groups() if match else None
+
+
+def is_function_call(content: Optional[str]) -> bool:
+    return bool(content) and match_function_call(content) is not None
+
+
+def _string_validator(name: str) -> Callable[[Any], str]:
+    def validate(value):
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            raise ToolCallError(f"Parameter '{name}' must be a string")
+        value = str(value).strip()
+        if not value:
+            raise ToolCallError(f"Parameter '{name}' must not be empty")
+        return value
+    return validate
+
+
+def _list_validator(name: str, max_length: Optional[int]) -> Callable[[Any], List[str]]:
+    def validate(value):
+        if isinstance(value, str):
+            value = value.split(",")
+        if not isinstance(value, list):
+            raise ToolCallError(f"Parameter '{name}' must be a list of IDs")
+        items = [str(v).strip() for v in value if str(v).strip()]
+        if not items:
+            raise ToolCallError(f"Parameter '{name}' must contain at least one ID")
+        if max_length is not None and len(items) > max_length:
+            raise ToolCallError(f"At most {max_length} IDs per batch call, got {len(items)}")
+        return items
+    return validate
+
+
+class ToolSpec:
+    def __init__(self, func: Callable[..., dict], name: str, in_prompt: bool, hint: str,
+                 module: Optional[str], max_list_length: Optional[int]):
+        self.func = func
+        self.name = name
+        self.in_prompt = in_prompt
+        self.hint = hint
+        self.module = module
+        self.params: List[str] = []
+        self.required: List[str] = []
+        self.list_params: List[str] = []
+        self.validators: Dict[str, Callable[[Any], Any]] = {}
+        for param in inspect.signature(func).parameters.values():
+            self.params.append(param.name)
+            if param.default is inspect.Parameter.empty:
+                self.required.append(param.name)
+            if param.annotation in (list, List[str]):
+                self.list_params.append(param.name)
+                self.validators[param.name] = _list_validator(param.name, max_list_length)
+            else:
+                self.validators[param.name] = _string_validator(param.name)
+
+    def validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Coerced keyword arguments; raises ToolCallError on missing or bad params"""
+        missing = [p for p in self.required if p not in params]
+        if missing:
+            raise ToolCallError(f"{self.name} is missing required parameter(s): {', '.join(missing)}")
+        unknown = [p for p in params if p not in self.validators]
+        if unknown:
+            raise ToolCallError(f"{self.name} got unexpected parameter(s): {', '.join(unknown)}")
+        return {name: self.validators[name](value) for name, value in params.items()}
+
+    def call_format(self) -> str:
+        example = {}
+        for name in self.params:
+            placeholder = f"[{name.upper()[:-1] if name in self.list_params else name.upper()}]"
+            example[name] = [placeholder, placeholder] if name in self.list_params else placeholder
+        return f"FUNCTION_CALL:{self.name}{json.dumps(example)}"
+
+
+class ToolRegistry:
+    def __init__(self, max_list_length: Optional[int] = None):
+        self.max_list_length = max_list_length
+        self._tools: Dict[str, ToolSpec] = {}
+
+    def register(self, name: Optional[str] = None, in_prompt: bool = True, hint: str = "",
+                 module: Optional[str] = None):
+        """Decorator registering a tool function under its own (or the given) name.
+
+        module names the prompt module (e.g. "listing", "brand") the tool belongs
+        to; None means it is shared by every flow.
+        """
+        def decorator(func):
+            spec = ToolSpec(func, name or func.__name__, in_prompt, hint, module, self.max_list_length)
+            self._tools[spec.name] = spec
+            return func
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def get(self, name: str) -> ToolSpec:
+        spec = self._tools.get(name)
+        if spec is None:
+            raise ToolCallError(f"UNKNOWN FUNCTION: {name}")
+        return spec
+
+    def functions(self) -> Dict[str, Callable[..., dict]]:
+        """name -> function, as expected by register_function"""
+        return {name: spec.func for name, spec in self._tools.items()}
+
+    def parse(self, message: str) -> Tuple[ToolSpec, Dict[str, Any]]:
+        """Parse and validate a FUNCTION_CALL message into (spec, kwargs)"""
+        matched = match_function_call(message)
+        if matched is None:
+            raise ToolCallError("INVALID FORMAT - Missing FUNCTION_CALL: prefix or malformed parameters")
+        func_name, params_str = matched
+        try:
+            params = json.loads(params_str)
+        except json.JSONDecodeError as e:
+            raise ToolCallError(f"INVALID JSON: {str(e)}")
+        if not isinstance(params, dict):
+            raise ToolCallError("INVALID JSON: parameters must be an object")
+        spec = self.get(func_name)
+        return spec, spec.validate(params)
+
+    def dispatch(self, func_name: str, kwargs: Dict[str, Any]) -> dict:
+        return self._tools[func_name].func(**kwargs)
+
+    def prompt_section(self, modules: Optional[Tuple[str, ...]] = None) -> str:
+        """The function-format block of the SIA system message.
+
+        With modules given, only shared tools and tools of those modules are listed.
+        """
+        lines = []
+        for spec in self._tools.values():
+            if not spec.in_prompt:
+                continue
+            if modules is not None and spec.module is not None and spec.module not in modules:
+                continue
+            lines.append(f"   - {spec.call_format()}")
+            if spec.hint:
+                lines.append(f"     ({spec.hint})")
+        return "\n".join(lines)
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import gc
+import hashlib
+import json
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+import main
+from json_logging import configure_logging, get_logger
+from metrics import MetricsServer
+from session_server import SessionServer, parse_opening
+from session_store import DEFAULT_PATH, SessionStore
+
+logger = get_logger(__name__)
+
+# --------------------------
+# Multi-process session workers behind one dispatcher
+# --------------------------
+# One process runs every session's JSON handling, regex parsing and autogen
+# bookkeeping under a single GIL. WorkerPool forks N worker processes, each a
+# SessionServer on its own local port, and a dispatcher in the parent accepts
+# seller connections (same JSON-lines protocol as session_server) and relays
+# each one to a worker:
+#
+#   new session  the dispatcher assigns the session ID; it goes to the worker
+#                the ID hashes to, unless that worker is carrying clearly more
+#                live sessions than the least loaded one, which takes it instead
+#   known ID     back to the worker that ran the conversation (affinity map),
+#                so its groupchat state stays on one process; if that worker
+#                died, or the dispatcher no longer knows the ID, it goes to the
+#                worker the ID hashes to, which resumes it from the shared
+#                SessionStore
+#
+# Prompts, templates, the tool registry and autogen itself are loaded once in
+# the parent before forking and frozen out of the garbage collector's reach,
+# so workers share those pages instead of rebuilding them. Each worker keeps
+# its own caches and backend guards; a worker that dies loses only its live
+# sessions, which any other worker can resume from the store.
+#
+#   python worker_pool.py --workers 4 --port 8765
+
+
+def preload():
+    """Build everything read-only that sessions use, ahead of forking"""
+    import agents  # noqa: F401  (autogen, loaded once for every worker)
+    main.sia_prompts.token_report()  # assembles the prompt for every flow
+
+
+def _rendezvous(session_id: str, index: int) -> int:
+    digest = hashlib.blake2b(f"{index}:{session_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _run_worker(index: int, ready, host: str, server_options: dict, store_path: Optional[str],
+                session_ttl: float, metrics_port: Optional[int]):
+    configure_logging()
+    if metrics_port:
+        MetricsServer(host=host, port=metrics_port).start()
+    store = SessionStore(store_path, ttl=session_ttl) if store_path else None
+    server = SessionServer(store=store, **server_options)
+
+    async def run():
+        listener = await server.start(host, 0)
+        ready.send(listener.sockets[0].getsockname()[1])
+        ready.close()
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+class Worker:
+    def __init__(self, index: int, process: multiprocessing.Process, port: int):
+        self.index = index
+        self.process = process
+        self.port = port
+        self.live = 0        # sessions relayed right now
+        self.assigned = 0    # sessions sent here in total
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stats(self) -> dict:
+        return {"pid": self.process.pid, "port": self.port, "alive": self.alive,
+                "live": self.live, "assigned": self.assigned}
+
+
+class WorkerPool:
+    def __init__(self, workers: Optional[int] = None, host: str = "127.0.0.1", max_sessions: int = 500,
+                 store_path: Optional[str] = DEFAULT_PATH, session_ttl: float = 24 * 3600,
+                 idle_timeout: Optional[float] = None, stream_replies: bool = False,
+                 agent_options: Optional[dict] = None, imbalance: float = 1.25,
+                 max_affinity: int = 100000, metrics_port: Optional[int] = None):
+        """
+        workers:       worker processes (default: one per CPU)
+        max_sessions:  live sessions per worker
+        store_path:    SessionStore file shared by the workers (None: sessions cannot move or resume)
+        agent_options: extra main.build_agents() arguments for every session
+        imbalance:     a new session leaves its hashed worker when that worker's live
+                       sessions exceed imbalance x the least loaded worker's (+1)
+        max_affinity:  session -> worker entries remembered for resumes
+        metrics_port:  the workers' Prometheus endpoints use metrics_port + 1 + index
+        """
+        self.size = workers or os.cpu_count() or 1
+        self.host = host
+        self.server_options = {"max_sessions": max_sessions, "idle_timeout": idle_timeout,
+                               "stream_replies": stream_replies, "agent_options": agent_options}
+        self.store_path = store_path
+        self.session_ttl = session_ttl
+        self.imbalance = imbalance
+        self.max_affinity = max_affinity
+        self.metrics_port = metrics_port
+        self.workers: List[Worker] = []
+        self._affinity: "OrderedDict[str, int]" = OrderedDict()
+        self._connections = set()  # relay tasks, held so they are not collected mid-session
+        self.rebalanced = 0
+        self.reassigned = 0
+
+    # --------------------------
+    # Process management
+    # --------------------------
+    def start(self) -> "WorkerPool":
+        preload()
+        # Keep the preloaded objects out of the workers' collections so their
+        # pages stay shared copy-on-write
+        gc.freeze()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        pending = []
+        for index in range(self.size):
+            parent_end, child_end = context.Pipe(duplex=False)
+            metrics_port = self.metrics_port + 1 + index if self.metrics_port else None
+            process = context.Process(
+                target=_run_worker, name=f"sia-worker-{index}", daemon=True,
+                args=(index, child_end, self.host, self.server_options, self.store_path,
+                      self.session_ttl, metrics_port)
+            )
+            process.start()
+            child_end.close()
+            pending.append((index, process, parent_end))
+        for index, process, parent_end in pending:
+            if not parent_end.poll(60):
+                raise RuntimeError(f"worker {index} did not start")
+            self.workers.append(Worker(index, process, parent_end.recv()))
+            parent_end.close()
+        logger.info("worker pool started", extra={"data": {"workers": [w.stats() for w in self.workers]}})
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        for worker in self.workers:
+            if worker.alive:
+                worker.process.terminate()
+        for worker in self.workers:
+            worker.process.join(timeout)
+        self.workers = []
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --------------------------
+    # Placement
+    # --------------------------
+    def _hashed(self, session_id: str, candidates: List[Worker]) -> Worker:
+        return max(candidates, key=lambda w: _rendezvous(session_id, w.index))
+
+    def pick(self, session_id: str) -> Worker:
+        """The worker that should run session_id"""
+        alive = [w for w in self.workers if w.alive]
+        if not alive:
+            raise RuntimeError("no live session workers")
+        index = self._affinity.get(session_id)
+        if index is not None and self.workers[index].alive:
+            self._affinity.move_to_end(session_id)
+            return self.workers[index]
+        worker = self._hashed(session_id, alive)
+        if index is not None:
+            # Its worker died; the hashed one resumes it from the store
+            self.reassigned += 1
+        else:
+            least = min(alive, key=lambda w: w.live)
+            if worker.live > least.live * self.imbalance + 1:
+                worker = least
+                self.rebalanced += 1
+        self._affinity[session_id] = worker.index
+        self._affinity.move_to_end(session_id)
+        while len(self._affinity) > self.max_affinity:
+            self._affinity.popitem(last=False)
+        return worker
+
+    # --------------------------
+    # Dispatcher
+    # --------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # A worker resumes a session_id it finds open in the store (the opening
+        # message is then ignored), so resumes and new sessions travel alike
+        opening, session_id = parse_opening((await reader.readline()).decode())
+        session_id = session_id or uuid.uuid4().hex
+        first_line = {"session_id": session_id, "message": opening}
+        try:
+            worker = self.pick(session_id)
+            worker_reader, worker_writer = await asyncio.open_connection(self.host, worker.port)
+        except (OSError, RuntimeError) as e:
+            logger.error("no worker for session %s: %s", session_id, e)
+            writer.write((json.dumps({"session_id": session_id, "reply": None, "done": True,
+                                      "error": "unavailable"}) + "\n").encode())
+            await writer.drain()
+            writer.close()
+            return
+        worker.live += 1
+        worker.assigned += 1
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            worker_writer.write((json.dumps(first_line, ensure_ascii=False) + "\n").encode())
+            to_worker = asyncio.create_task(_relay(reader, worker_writer))
+            # The worker closes its side when the conversation ends
+            await _relay(worker_reader, writer)
+            to_worker.cancel()
+            await asyncio.gather(to_worker, return_exceptions=True)
+        finally:
+            worker.live -= 1
+            self._connections.discard(task)
+            worker_writer.close()
+            writer.close()
+
+    async def start_dispatcher(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info("dispatcher listening on %s:%d (%d workers)", host, server.sockets[0].getsockname()[1],
+                    self.size)
+        return server
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await self.start_dispatcher(host, port)
+        async with server:
+            await server.serve_forever()
+
+    def stats(self) -> dict:
+        return {
+            "workers": [w.stats() for w in self.workers],
+            "affinity_entries": len(self._affinity),
+            "rebalanced": self.rebalanced,
+            "reassigned": self.reassigned,
+        }
+
+
+async def _relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Copy bytes until reader hits EOF, then half-close writer"""
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve seller sessions from a pool of worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-sessions", type=int, default=500, help="live sessions per worker")
+    parser.add_argument("--session-store", default=DEFAULT_PATH, help="SQLite file shared by workers")
+    parser.add_argument("--session-ttl", type=float, default=24 * 3600, help="seconds before idle sessions are evicted")
+    parser.add_argument("--idle-timeout", type=float, default=600.0,
+                        help="seconds of seller silence before a session is suspended")
+    parser.add_argument("--stream-replies", action="store_true",
+                        help='send {"delta": ...} lines while SIA generates a reply')
+    parser.add_argument("--metrics-port", type=int, default=9108,
+                        help="Prometheus port base: worker i serves on metrics-port + 1 + i (0 disables it)")
+    args = parser.parse_args()
+    configure_logging()
+    pool = WorkerPool(args.workers, args.host, args.max_sessions, args.session_store, args.session_ttl,
+                      args.idle_timeout, args.stream_replies, metrics_port=args.metrics_port or None)
+    with pool:
+        try:
+            asyncio.run(pool.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass